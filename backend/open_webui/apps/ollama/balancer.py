@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from typing import Callable, Optional
+
+import aiohttp
+
+from open_webui.config import (
+    OLLAMA_BALANCER_EWMA_ALPHA,
+    OLLAMA_BALANCER_SPILL_THRESHOLD,
+    OLLAMA_BALANCER_STRATEGY,
+    OLLAMA_EJECTION_TIME,
+    OLLAMA_HEALTH_CHECK_INTERVAL,
+    OLLAMA_MAX_CONSECUTIVE_FAILURES,
+)
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.session_pool import SESSION_POOL
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
+
+
+class BackendState:
+    def __init__(self):
+        self.outstanding = 0
+        self.requests = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.loaded_models: set[str] = set()
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+
+class OllamaBalancer:
+    """
+    Picks an Ollama backend for a model out of the URLs that serve it.
+
+    Backends that failed OLLAMA_MAX_CONSECUTIVE_FAILURES times in a row (in
+    requests or health checks) are skipped for OLLAMA_EJECTION_TIME seconds,
+    and backends that already have the model loaded are preferred to avoid a
+    cold model swap (until each of them has OLLAMA_BALANCER_SPILL_THRESHOLD
+    requests in flight). The remaining candidates are ranked by the strategy:
+
+    - random: uniform choice
+    - least_outstanding: fewest requests in flight
+    - ewma: lowest moving average latency, scaled by requests in flight
+    - weighted: random, proportional to the "weight" in the URL's API config
+    - sticky: the same chat always maps to the same backend (rendezvous
+      hashing), falling back to least_outstanding without a chat id
+    """
+
+    STRATEGIES = ["random", "least_outstanding", "ewma", "weighted", "sticky"]
+
+    def __init__(
+        self,
+        strategy: str = "least_outstanding",
+        ewma_alpha: float = 0.3,
+        spill_threshold: int = 4,
+        max_failures: int = 3,
+        ejection_time: int = 30,
+        health_check_interval: int = 10,
+    ):
+        if strategy not in self.STRATEGIES:
+            log.warning(
+                f"Unknown Ollama balancer strategy {strategy}, using least_outstanding"
+            )
+            strategy = "least_outstanding"
+
+        self.strategy = strategy
+        self.ewma_alpha = ewma_alpha
+        self.spill_threshold = spill_threshold
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.health_check_interval = health_check_interval
+
+        self.backends: dict[str, BackendState] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def get_backend(self, url: str) -> BackendState:
+        backend = self.backends.get(url)
+        if backend is None:
+            backend = self.backends[url] = BackendState()
+        return backend
+
+    def select(
+        self,
+        urls: list[str],
+        model: str,
+        key: Optional[str] = None,
+        weights: Optional[dict[str, float]] = None,
+    ) -> str:
+        if len(urls) == 1:
+            return urls[0]
+
+        now = time.time()
+        # Fail open when every backend is ejected
+        candidates = [
+            url for url in urls if self.get_backend(url).is_available(now)
+        ] or list(urls)
+
+        loaded = [url for url in candidates if self.is_loaded(url, model)]
+        if loaded and any(
+            self.get_backend(url).outstanding < self.spill_threshold for url in loaded
+        ):
+            candidates = loaded
+
+        if len(candidates) == 1:
+            return candidates[0]
+
+        if self.strategy == "random":
+            return random.choice(candidates)
+        elif self.strategy == "weighted":
+            weights = weights or {}
+            return random.choices(
+                candidates,
+                weights=[max(weights.get(url, 1), 0) or 1e-9 for url in candidates],
+            )[0]
+        elif self.strategy == "sticky" and key:
+            return max(
+                candidates,
+                key=lambda url: hashlib.sha256(f"{key}:{url}".encode()).digest(),
+            )
+        elif self.strategy == "ewma":
+            return min(candidates, key=self._ewma_score)
+
+        return min(
+            candidates,
+            key=lambda url: (self.get_backend(url).outstanding, random.random()),
+        )
+
+    def _ewma_score(self, url: str) -> tuple[float, float]:
+        backend = self.get_backend(url)
+        # Backends without a measurement yet are tried first
+        latency = backend.ewma_latency or 0.0
+        return (latency * (backend.outstanding + 1), random.random())
+
+    def is_loaded(self, url: str, model: str) -> bool:
+        loaded_models = self.get_backend(url).loaded_models
+        # Prefixed model ids ("prefix.model") are loaded under the bare name
+        return model in loaded_models or model.split(".", 1)[-1] in loaded_models
+
+    def acquire(self, url: str):
+        backend = self.get_backend(url)
+        backend.outstanding += 1
+        backend.requests += 1
+
+    def release(self, url: str):
+        backend = self.get_backend(url)
+        backend.outstanding = max(0, backend.outstanding - 1)
+
+    def record_success(self, url: str, latency: Optional[float] = None):
+        backend = self.get_backend(url)
+        backend.consecutive_failures = 0
+        backend.ejected_until = 0.0
+
+        if latency is not None:
+            if backend.ewma_latency is None:
+                backend.ewma_latency = latency
+            else:
+                backend.ewma_latency = (
+                    self.ewma_alpha * latency
+                    + (1 - self.ewma_alpha) * backend.ewma_latency
+                )
+
+    def record_failure(self, url: str):
+        backend = self.get_backend(url)
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.max_failures:
+            if backend.is_available(time.time()):
+                log.warning(
+                    f"Ejecting Ollama backend {url} for {self.ejection_time}s after {backend.consecutive_failures} failures"
+                )
+            backend.ejected_until = time.time() + self.ejection_time
+
+    async def check_backend(self, url: str, key: Optional[str] = None):
+        headers = {"Authorization": f"Bearer {key}"} if key else {}
+        try:
+            session = SESSION_POOL.get_session(url)
+            async with session.get(
+                f"{url}/api/ps",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=5),
+            ) as r:
+                r.raise_for_status()
+                data = await r.json()
+
+            backend = self.get_backend(url)
+            backend.loaded_models = {
+                model.get("model") or model.get("name")
+                for model in data.get("models", [])
+            }
+            self.record_success(url)
+        except Exception as e:
+            log.debug(f"Ollama health check failed for {url}: {e}")
+            self.record_failure(url)
+
+    async def health_check_loop(
+        self, get_backends: Callable[[], list[tuple[str, Optional[str]]]]
+    ):
+        while True:
+            try:
+                backends = get_backends()
+                await asyncio.gather(
+                    *[self.check_backend(url, key) for url, key in backends]
+                )
+
+                # Forget URLs that were removed from the config
+                urls = {url for url, _ in backends}
+                for url in list(self.backends.keys()):
+                    if url not in urls:
+                        del self.backends[url]
+            except Exception as e:
+                log.exception(f"Ollama health check error: {e}")
+
+            await asyncio.sleep(self.health_check_interval)
+
+    def start(self, get_backends: Callable[[], list[tuple[str, Optional[str]]]]):
+        if self.health_check_interval > 0:
+            self.task = asyncio.create_task(self.health_check_loop(get_backends))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "strategy": self.strategy,
+            "backends": {
+                url: {
+                    "outstanding": backend.outstanding,
+                    "requests": backend.requests,
+                    "ewma_latency": backend.ewma_latency,
+                    "consecutive_failures": backend.consecutive_failures,
+                    "available": backend.is_available(now),
+                    "loaded_models": sorted(backend.loaded_models),
+                }
+                for url, backend in self.backends.items()
+            },
+        }
+
+
+OLLAMA_BALANCER = OllamaBalancer(
+    strategy=OLLAMA_BALANCER_STRATEGY,
+    ewma_alpha=OLLAMA_BALANCER_EWMA_ALPHA,
+    spill_threshold=OLLAMA_BALANCER_SPILL_THRESHOLD,
+    max_failures=OLLAMA_MAX_CONSECUTIVE_FAILURES,
+    ejection_time=OLLAMA_EJECTION_TIME,
+    health_check_interval=OLLAMA_HEALTH_CHECK_INTERVAL,
+)
@@ -2,7 +2,6 @@ import asyncio
 import json
 import logging
 import os
-import random
 import re
 import time
 from typing import Optional, Union
@@ -12,6 +11,7 @@ import aiohttp
 from aiocache import cached
 
 import requests
+from open_webui.apps.ollama.balancer import OLLAMA_BALANCER
 from open_webui.apps.webui.models.models import Models
 from open_webui.config import (
     CORS_ALLOW_ORIGIN,
@@ -44,8 +44,10 @@ from open_webui.utils.payload import (
     apply_model_params_to_body_openai,
     apply_model_system_prompt_to_body,
 )
+from open_webui.utils.model_registry import MODEL_REGISTRY
+from open_webui.utils.session_pool import SESSION_POOL, cleanup_response
 from open_webui.utils.utils import get_admin_user, get_verified_user
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import ACCESS_CONTROL_INDEX, has_access
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
@@ -72,11 +74,6 @@ app.state.config.OLLAMA_BASE_URLS = OLLAMA_BASE_URLS
 app.state.config.OLLAMA_API_CONFIGS = OLLAMA_API_CONFIGS
 
 
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
-
-
 @app.head("/")
 @app.get("/")
 async def get_status():
@@ -100,32 +97,34 @@ async def verify_connection(
         headers["Authorization"] = f"Bearer {key}"
 
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        try:
-            async with session.get(f"{url}/api/version", headers=headers) as r:
-                if r.status != 200:
-                    # Extract response error details if available
-                    error_detail = f"HTTP Error: {r.status}"
-                    res = await r.json()
-                    if "error" in res:
-                        error_detail = f"External Error: {res['error']}"
-                    raise Exception(error_detail)
+    session = SESSION_POOL.get_session(url)
+    try:
+        async with session.get(
+            f"{url}/api/version", headers=headers, timeout=timeout
+        ) as r:
+            if r.status != 200:
+                # Extract response error details if available
+                error_detail = f"HTTP Error: {r.status}"
+                res = await r.json()
+                if "error" in res:
+                    error_detail = f"External Error: {res['error']}"
+                raise Exception(error_detail)
 
-                response_data = await r.json()
-                return response_data
+            response_data = await r.json()
+            return response_data
 
-        except aiohttp.ClientError as e:
-            # ClientError covers all aiohttp requests issues
-            log.exception(f"Client error: {str(e)}")
-            # Handle aiohttp-specific connection issues, timeout etc.
-            raise HTTPException(
-                status_code=500, detail="Open WebUI: Server Connection Error"
-            )
-        except Exception as e:
-            log.exception(f"Unexpected error: {e}")
-            # Generic error handler in case parsing JSON or other steps fail
-            error_detail = f"Unexpected error: {str(e)}"
-            raise HTTPException(status_code=500, detail=error_detail)
+    except aiohttp.ClientError as e:
+        # ClientError covers all aiohttp requests issues
+        log.exception(f"Client error: {str(e)}")
+        # Handle aiohttp-specific connection issues, timeout etc.
+        raise HTTPException(
+            status_code=500, detail="Open WebUI: Server Connection Error"
+        )
+    except Exception as e:
+        log.exception(f"Unexpected error: {e}")
+        # Generic error handler in case parsing JSON or other steps fail
+        error_detail = f"Unexpected error: {str(e)}"
+        raise HTTPException(status_code=500, detail=error_detail)
 
 
 @app.get("/config")
@@ -156,6 +155,8 @@ async def update_config(form_data: OllamaConfigForm, user=Depends(get_admin_user
         if url not in config_urls:
             app.state.config.OLLAMA_API_CONFIGS.pop(url, None)
 
+    MODEL_REGISTRY.invalidate(base=True)
+
     return {
         "ENABLE_OLLAMA_API": app.state.config.ENABLE_OLLAMA_API,
         "OLLAMA_BASE_URLS": app.state.config.OLLAMA_BASE_URLS,
@@ -167,33 +168,59 @@ async def aiohttp_get(url, key=None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
     try:
         headers = {"Authorization": f"Bearer {key}"} if key else {}
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+        session = SESSION_POOL.get_session(url)
+        async with session.get(url, headers=headers, timeout=timeout) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
+def get_backend_url(url: str) -> Optional[str]:
+    for base_url in app.state.config.OLLAMA_BASE_URLS:
+        if url.startswith(base_url):
+            return base_url
+    return None
+
+
+def get_ollama_backends() -> list[tuple[str, Optional[str]]]:
+    # (url, key) of every enabled backend, for the balancer's health checks
+    if not app.state.config.ENABLE_OLLAMA_API:
+        return []
+
+    backends = []
+    for url in app.state.config.OLLAMA_BASE_URLS:
+        api_config = app.state.config.OLLAMA_API_CONFIGS.get(url, {})
+        if api_config.get("enable", True):
+            backends.append((url, api_config.get("key", None)))
+    return backends
+
+
+async def release_backend(backend_url: Optional[str]):
+    if backend_url:
+        OLLAMA_BALANCER.release(backend_url)
+
+
+async def cleanup_streaming_response(
+    response: Optional[aiohttp.ClientResponse], backend_url: Optional[str]
 ):
-    if response:
-        response.close()
-    if session:
-        await session.close()
+    await cleanup_response(response)
+    await release_backend(backend_url)
 
 
 async def post_streaming_url(
     url: str, payload: Union[str, bytes], stream: bool = True, content_type=None
 ):
     r = None
+    streaming = False
+
+    backend_url = get_backend_url(url)
+    if backend_url:
+        OLLAMA_BALANCER.acquire(backend_url)
+
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = SESSION_POOL.get_session(url)
 
         parsed_url = urlparse(url)
         base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
@@ -205,28 +232,43 @@ async def post_streaming_url(
         if key:
             headers["Authorization"] = f"Bearer {key}"
 
-        r = await session.post(
-            url,
-            data=payload,
-            headers=headers,
-        )
+        start = time.time()
+        try:
+            r = await session.post(
+                url,
+                data=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+            )
+        except aiohttp.ClientError:
+            if backend_url:
+                OLLAMA_BALANCER.record_failure(backend_url)
+            raise
+
+        if backend_url:
+            if r.status >= 500:
+                OLLAMA_BALANCER.record_failure(backend_url)
+            else:
+                # Time to response headers, i.e. to first token when streaming
+                OLLAMA_BALANCER.record_success(backend_url, time.time() - start)
         r.raise_for_status()
 
         if stream:
             response_headers = dict(r.headers)
             if content_type:
                 response_headers["Content-Type"] = content_type
+            streaming = True
             return StreamingResponse(
                 r.content,
                 status_code=r.status,
                 headers=response_headers,
                 background=BackgroundTask(
-                    cleanup_response, response=r, session=session
+                    cleanup_streaming_response, response=r, backend_url=backend_url
                 ),
             )
         else:
             res = await r.json()
-            await cleanup_response(r, session)
+            await cleanup_response(r)
             return res
 
     except Exception as e:
@@ -238,11 +280,15 @@ async def post_streaming_url(
                     error_detail = f"Ollama: {res['error']}"
             except Exception:
                 error_detail = f"Ollama: {e}"
+            await cleanup_response(r)
 
         raise HTTPException(
             status_code=r.status if r else 500,
             detail=error_detail,
         )
+    finally:
+        if not streaming:
+            await release_backend(backend_url)
 
 
 def merge_models_lists(model_lists):
@@ -361,14 +407,10 @@ async def get_ollama_tags(
 
     if user.role == "user":
         # Filter models based on user access control
-        filtered_models = []
-        for model in models.get("models", []):
-            model_info = Models.get_model_by_id(model["model"])
-            if model_info:
-                if user.id == model_info.user_id or has_access(
-                    user.id, type="read", access_control=model_info.access_control
-                ):
-                    filtered_models.append(model)
+        model_ids = ACCESS_CONTROL_INDEX.get_accessible_model_ids(user.id)
+        filtered_models = [
+            model for model in models.get("models", []) if model["model"] in model_ids
+        ]
         models["models"] = filtered_models
 
     return models
@@ -643,7 +685,7 @@ async def show_model_info(form_data: ModelNameForm, user=Depends(get_verified_us
             detail=ERROR_MESSAGES.MODEL_NOT_FOUND(form_data.name),
         )
 
-    url_idx = random.choice(models[form_data.name]["urls"])
+    url_idx = get_ollama_url_idx(models[form_data.name]["urls"], form_data.name)
     url = app.state.config.OLLAMA_BASE_URLS[url_idx]
     log.info(f"url: {url}")
 
@@ -735,7 +777,7 @@ async def generate_ollama_embeddings(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_ollama_url_idx(models[model]["urls"], model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -805,7 +847,7 @@ async def generate_ollama_batch_embeddings(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_ollama_url_idx(models[model]["urls"], model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -888,7 +930,7 @@ async def generate_completion(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_ollama_url_idx(models[model]["urls"], model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -921,19 +963,44 @@ class GenerateChatCompletionForm(BaseModel):
     template: Optional[str] = None
     stream: Optional[bool] = True
     keep_alive: Optional[Union[int, str]] = None
+    metadata: Optional[dict] = None
 
 
-async def get_ollama_url(url_idx: Optional[int], model: str):
+def get_ollama_url_idx(
+    url_idxs: list[int], model: str, key: Optional[str] = None
+) -> int:
+    urls = [app.state.config.OLLAMA_BASE_URLS[idx] for idx in url_idxs]
+    weights = {
+        url: app.state.config.OLLAMA_API_CONFIGS.get(url, {}).get("weight", 1)
+        for url in urls
+    }
+    url = OLLAMA_BALANCER.select(urls, model, key=key, weights=weights)
+    return url_idxs[urls.index(url)]
+
+
+async def get_ollama_url(url_idx: Optional[int], model: str, key: Optional[str] = None):
     if url_idx is None:
-        model_list = await get_all_models()
-        models = {model["model"]: model for model in model_list["models"]}
+        # The registry's snapshot knows which urls serve the model, the
+        # upstream servers are only asked for models it doesn't know yet or
+        # when the urls changed since the snapshot was taken
+        url_count = len(app.state.config.OLLAMA_BASE_URLS)
+        models = {
+            item["ollama"]["model"]: item["ollama"]
+            for item in await MODEL_REGISTRY.get_models()
+            if "ollama" in item
+            and all(idx < url_count for idx in item["ollama"].get("urls", []))
+        }
+
+        if model not in models:
+            model_list = await get_all_models()
+            models = {model["model"]: model for model in model_list["models"]}
 
         if model not in models:
             raise HTTPException(
                 status_code=400,
                 detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
             )
-        url_idx = random.choice(models[model]["urls"])
+        url_idx = get_ollama_url_idx(models[model]["urls"], model, key=key)
     url = app.state.config.OLLAMA_BASE_URLS[url_idx]
     return url
 
@@ -952,7 +1019,7 @@ async def generate_chat_completion(
         del payload["metadata"]
 
     model_id = payload["model"]
-    model_info = Models.get_model_by_id(model_id)
+    model_info = await Models.get_model_by_id_async(model_id)
 
     if model_info:
         if model_info.base_model_id:
@@ -991,7 +1058,9 @@ async def generate_chat_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url = await get_ollama_url(url_idx, payload["model"])
+    url = await get_ollama_url(
+        url_idx, payload["model"], key=(form_data.metadata or {}).get("chat_id")
+    )
     log.info(f"url: {url}")
     log.debug(f"generate_chat_completion() - 2.payload = {payload}")
 
@@ -1055,7 +1124,7 @@ async def generate_openai_chat_completion(
     if ":" not in model_id:
         model_id = f"{model_id}:latest"
 
-    model_info = Models.get_model_by_id(model_id)
+    model_info = await Models.get_model_by_id_async(model_id)
     if model_info:
         if model_info.base_model_id:
             payload["model"] = model_info.base_model_id
@@ -1088,7 +1157,11 @@ async def generate_openai_chat_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url = await get_ollama_url(url_idx, payload["model"])
+    url = await get_ollama_url(
+        url_idx,
+        payload["model"],
+        key=(form_data.get("metadata") or {}).get("chat_id"),
+    )
     log.info(f"url: {url}")
 
     api_config = app.state.config.OLLAMA_API_CONFIGS.get(url, {})
@@ -1158,14 +1231,8 @@ async def get_openai_models(
 
     if user.role == "user":
         # Filter models based on user access control
-        filtered_models = []
-        for model in models:
-            model_info = Models.get_model_by_id(model["id"])
-            if model_info:
-                if user.id == model_info.user_id or has_access(
-                    user.id, type="read", access_control=model_info.access_control
-                ):
-                    filtered_models.append(model)
+        model_ids = ACCESS_CONTROL_INDEX.get_accessible_model_ids(user.id)
+        filtered_models = [model for model in models if model["id"] in model_ids]
         models = filtered_models
 
     return {
@@ -0,0 +1,261 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from open_webui.apps.retrieval.vector.main import GetResult
+from open_webui.config import RAG_BM25_INDEX_CACHE_SIZE, RAG_BM25_INDEX_CACHE_TTL
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def default_preprocessing_func(text: str) -> list[str]:
+    # Same tokenization as langchain's BM25Retriever
+    return text.split()
+
+
+class BM25Index:
+    """
+    Incrementally maintained Okapi BM25 index over the chunks of one collection.
+
+    Scoring matches rank_bm25.BM25Okapi (the backend of langchain's
+    BM25Retriever), but documents can be added and removed without
+    re-tokenizing the whole collection.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        self.lock = threading.RLock()
+
+        self.documents: dict[str, tuple[str, Any]] = {}
+        self.term_freqs: dict[str, dict[str, int]] = {}
+        self.doc_lens: dict[str, int] = {}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.total_len = 0
+
+        self._idf: Optional[dict[str, float]] = None
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[Any]):
+        with self.lock:
+            for id, text, metadata in zip(ids, texts, metadatas):
+                if id in self.documents:
+                    self._remove(id)
+
+                tokens = default_preprocessing_func(text or "")
+                freqs: dict[str, int] = {}
+                for token in tokens:
+                    freqs[token] = freqs.get(token, 0) + 1
+
+                self.documents[id] = (text, metadata)
+                self.term_freqs[id] = freqs
+                self.doc_lens[id] = len(tokens)
+                self.total_len += len(tokens)
+
+                for token, freq in freqs.items():
+                    self.postings.setdefault(token, {})[id] = freq
+
+            self._idf = None
+
+    def remove(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        with self.lock:
+            if ids is None:
+                ids = []
+            ids = list(ids)
+
+            if filter:
+                ids.extend(
+                    id
+                    for id, (_, metadata) in self.documents.items()
+                    if all(
+                        str((metadata or {}).get(key)) == str(value)
+                        for key, value in filter.items()
+                    )
+                )
+
+            for id in ids:
+                if id in self.documents:
+                    self._remove(id)
+
+            self._idf = None
+
+    def _remove(self, id: str):
+        for token in self.term_freqs.pop(id):
+            posting = self.postings[token]
+            posting.pop(id, None)
+            if not posting:
+                del self.postings[token]
+
+        self.total_len -= self.doc_lens.pop(id)
+        del self.documents[id]
+
+    def _get_idf(self) -> dict[str, float]:
+        if self._idf is None:
+            corpus_size = len(self.documents)
+            idf = {}
+            negative_idfs = []
+            idf_sum = 0.0
+
+            for token, posting in self.postings.items():
+                value = math.log(corpus_size - len(posting) + 0.5) - math.log(
+                    len(posting) + 0.5
+                )
+                idf[token] = value
+                idf_sum += value
+                if value < 0:
+                    negative_idfs.append(token)
+
+            eps = self.epsilon * (idf_sum / len(idf)) if idf else 0.0
+            for token in negative_idfs:
+                idf[token] = eps
+
+            self._idf = idf
+        return self._idf
+
+    def search(self, query: str, k: int) -> list[Document]:
+        with self.lock:
+            if not self.documents:
+                return []
+
+            idf = self._get_idf()
+            avgdl = self.total_len / len(self.documents)
+
+            scores: dict[str, float] = {}
+            for token in default_preprocessing_func(query):
+                posting = self.postings.get(token)
+                if not posting:
+                    continue
+
+                token_idf = idf[token]
+                for id, freq in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lens[id] / avgdl)
+                    scores[id] = scores.get(id, 0.0) + token_idf * (
+                        freq * (self.k1 + 1) / (freq + norm)
+                    )
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [
+                Document(
+                    page_content=self.documents[id][0],
+                    metadata=dict(self.documents[id][1] or {}),
+                )
+                for id, _ in top
+            ]
+
+
+class BM25IndexCache:
+    """
+    Process-wide LRU of BM25 indexes keyed by collection name.
+
+    Indexes are built lazily on the first hybrid search against a collection and
+    are then kept up to date from the write paths (save_docs_to_vector_db and the
+    VECTOR_DB_CLIENT delete calls). The TTL bounds staleness for writes made by
+    other workers, which this process never sees.
+    """
+
+    def __init__(self, maxsize: int = 32, ttl: int = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.indexes: OrderedDict[str, tuple[BM25Index, float]] = OrderedDict()
+
+    def _get(self, collection_name: str) -> Optional[BM25Index]:
+        entry = self.indexes.get(collection_name)
+        if entry is None:
+            return None
+
+        index, created_at = entry
+        if self.ttl and time.time() - created_at > self.ttl:
+            del self.indexes[collection_name]
+            return None
+
+        self.indexes.move_to_end(collection_name)
+        return index
+
+    def get(
+        self,
+        collection_name: str,
+        loader: Callable[[str], Optional[GetResult]],
+    ) -> Optional[BM25Index]:
+        with self.lock:
+            index = self._get(collection_name)
+        if index is not None:
+            return index
+
+        result = loader(collection_name)
+        if result is None:
+            return None
+
+        index = BM25Index()
+        index.add(result.ids[0], result.documents[0], result.metadatas[0])
+        log.debug(f"bm25: built index for {collection_name} ({len(index)} chunks)")
+
+        if self.maxsize > 0:
+            with self.lock:
+                self.indexes[collection_name] = (index, time.time())
+                self.indexes.move_to_end(collection_name)
+                while len(self.indexes) > self.maxsize:
+                    self.indexes.popitem(last=False)
+        return index
+
+    def add(self, collection_name: str, items: list[dict]):
+        # Only indexes that are already loaded are updated, the rest are built
+        # from the vector DB (including these items) on first use.
+        with self.lock:
+            index = self._get(collection_name)
+        if index is not None:
+            index.add(
+                [item["id"] for item in items],
+                [item["text"] for item in items],
+                [item["metadata"] for item in items],
+            )
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        with self.lock:
+            index = self._get(collection_name)
+        if index is not None:
+            index.remove(ids=ids, filter=filter)
+
+    def delete_collection(self, collection_name: str):
+        with self.lock:
+            self.indexes.pop(collection_name, None)
+
+    def reset(self):
+        with self.lock:
+            self.indexes.clear()
+
+
+BM25_INDEX_CACHE = BM25IndexCache(
+    maxsize=RAG_BM25_INDEX_CACHE_SIZE, ttl=RAG_BM25_INDEX_CACHE_TTL
+)
+
+
+class BM25IndexRetriever(BaseRetriever):
+    index: Any
+    k: int
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        return self.index.search(query, self.k)
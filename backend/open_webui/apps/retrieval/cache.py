@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from open_webui.apps.webui.models.embeddings import ChunkEmbeddings
+from open_webui.config import (
+    ENABLE_RAG_CHUNK_EMBEDDING_STORE,
+    RAG_EMBEDDING_CACHE_REDIS_URL,
+    RAG_EMBEDDING_CACHE_SIZE,
+    RAG_EMBEDDING_CACHE_TTL,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class EmbeddingCache:
+    """
+    Embedding vectors keyed by (engine, model, sha256(text)).
+
+    Entries live in a size-bounded in-process LRU and, when a Redis URL is
+    configured, are shared with every other worker through Redis with a TTL.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: int = 3600,
+        redis_url: Optional[str] = None,
+        prefix: str = "open-webui:embedding",
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, tuple[list[float], float]] = OrderedDict()
+
+        self.redis = None
+        if redis_url:
+            import redis
+
+            self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 or self.redis is not None
+
+    def key(self, engine: str, model: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{engine}:{model}:{digest}"
+
+    def _get_local(self, key: str) -> Optional[list[float]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        vector, created_at = entry
+        if self.ttl and time.time() - created_at > self.ttl:
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return vector
+
+    def _set_local(self, key: str, vector: list[float]):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = (vector, time.time())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> list[Optional[list[float]]]:
+        with self.lock:
+            vectors = [self._get_local(key) for key in keys]
+
+        missing = [idx for idx, vector in enumerate(vectors) if vector is None]
+        if missing and self.redis is not None:
+            try:
+                values = self.redis.mget(
+                    [f"{self.prefix}:{keys[idx]}" for idx in missing]
+                )
+                with self.lock:
+                    for idx, value in zip(missing, values):
+                        if value is not None:
+                            vectors[idx] = json.loads(value)
+                            self._set_local(keys[idx], vectors[idx])
+            except Exception as e:
+                log.warning(f"Embedding cache: redis lookup failed: {e}")
+
+        with self.lock:
+            hits = sum(1 for vector in vectors if vector is not None)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def set_many(self, items: dict[str, list[float]]):
+        with self.lock:
+            for key, vector in items.items():
+                self._set_local(key, vector)
+
+        if items and self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                for key, vector in items.items():
+                    pipe.set(
+                        f"{self.prefix}:{key}",
+                        json.dumps(vector),
+                        ex=self.ttl if self.ttl else None,
+                    )
+                pipe.execute()
+            except Exception as e:
+                log.warning(f"Embedding cache: redis write failed: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "redis": self.redis is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def get_cached_embedding_function(
+    embedding_function, engine: str, model: str, cache: EmbeddingCache
+):
+    if not cache.enabled:
+        return embedding_function
+
+    def cached_embedding_function(query):
+        texts = query if isinstance(query, list) else [query]
+        keys = [cache.key(engine, model, text) for text in texts]
+        vectors = cache.get_many(keys)
+
+        # Embed each distinct missing text once, in a single batched call
+        missing = {}
+        for idx, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[idx], texts[idx])
+
+        if missing:
+            embeddings = embedding_function(list(missing.values()))
+            if embeddings is None:
+                return None
+
+            new_items = dict(zip(missing.keys(), embeddings))
+            cache.set_many(new_items)
+            vectors = [
+                vector if vector is not None else new_items[key]
+                for key, vector in zip(keys, vectors)
+            ]
+
+        return vectors if isinstance(query, list) else vectors[0]
+
+    cached_embedding_function.embedding_cache = cache
+    return cached_embedding_function
+
+
+EMBEDDING_CACHE = EmbeddingCache(
+    maxsize=RAG_EMBEDDING_CACHE_SIZE,
+    ttl=RAG_EMBEDDING_CACHE_TTL,
+    redis_url=RAG_EMBEDDING_CACHE_REDIS_URL,
+)
+
+
+def get_chunk_embeddings(
+    texts: list[str], embedding_function, engine: str, model: str
+) -> list[list[float]]:
+    """
+    Embed document chunks, reusing vectors already stored for identical chunk
+    text under the same engine and model so re-ingesting a file (or adding it to
+    another knowledge base) only embeds chunks that actually changed.
+    """
+    if not ENABLE_RAG_CHUNK_EMBEDDING_STORE:
+        return embedding_function(texts)
+
+    keys = [
+        hashlib.sha256(f"{engine}\0{model}\0{text}".encode("utf-8")).hexdigest()
+        for text in texts
+    ]
+    vectors = ChunkEmbeddings.get_vectors_by_ids(list(set(keys)))
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors:
+            missing.setdefault(key, text)
+
+    log.info(
+        f"chunk embeddings: reusing {len(texts) - len(missing)} of {len(texts)}, "
+        f"embedding {len(missing)}"
+    )
+
+    if missing:
+        embeddings = embedding_function(list(missing.values()))
+        new_vectors = dict(zip(missing.keys(), embeddings))
+        ChunkEmbeddings.insert_new_vectors(model, new_vectors)
+        vectors.update(new_vectors)
+
+    return [vectors[key] for key in keys]
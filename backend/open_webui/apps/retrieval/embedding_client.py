@@ -0,0 +1,197 @@
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from open_webui.config import (
+    RAG_EMBEDDING_MAX_CONCURRENCY,
+    RAG_EMBEDDING_MAX_RETRIES,
+    RAG_EMBEDDING_REQUEST_TIMEOUT,
+    RAG_EMBEDDING_RETRY_BACKOFF,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class EmbeddingRequestTooLarge(Exception):
+    pass
+
+
+class RemoteEmbeddingClient:
+    """
+    Pooled client for the Ollama and OpenAI embedding APIs.
+
+    Connections are kept alive in a shared session, batches of a request are
+    sent concurrently (spread round-robin over every configured base URL), and
+    throttled or failed requests are retried with exponential backoff. Batches
+    rejected as too large are split in half and the smaller size is remembered
+    per endpoint.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        timeout: int = 300,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_concurrency,
+            pool_maxsize=self.max_concurrency,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="embedding"
+        )
+
+        self.lock = threading.Lock()
+        self.batch_sizes: dict[tuple[str, str], int] = {}
+        self.rejected_sizes: dict[tuple[str, str], int] = {}
+        self.url_cycle = itertools.count()
+
+    def post(self, engine: str, url: str, model: str, texts: list[str], key: str):
+        if engine == "ollama":
+            endpoint = f"{url}/api/embed"
+        else:
+            endpoint = f"{url}/embeddings"
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                r = self.session.post(
+                    endpoint,
+                    headers={
+                        "Content-Type": "application/json",
+                        "Authorization": f"Bearer {key}",
+                    },
+                    json={"input": texts, "model": model},
+                    timeout=self.timeout,
+                )
+
+                if r.status_code == 413:
+                    raise EmbeddingRequestTooLarge()
+
+                if r.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    delay = self.retry_backoff * 2**attempt
+                    retry_after = r.headers.get("Retry-After")
+                    if retry_after and retry_after.isdigit():
+                        delay = max(delay, int(retry_after))
+
+                    log.warning(
+                        f"Embedding request to {url} returned {r.status_code}, retrying in {delay}s"
+                    )
+                    time.sleep(delay)
+                    continue
+
+                r.raise_for_status()
+                data = r.json()
+            except requests.exceptions.ConnectionError as e:
+                if attempt >= self.max_retries:
+                    raise e
+                log.warning(f"Embedding request to {url} failed: {e}, retrying")
+                time.sleep(self.retry_backoff * 2**attempt)
+                continue
+
+            if engine == "ollama":
+                if "embeddings" in data:
+                    return data["embeddings"]
+            elif "data" in data:
+                return [elem["embedding"] for elem in data["data"]]
+            raise Exception("Something went wrong :/")
+
+    def embed_batch(
+        self, engine: str, url: str, model: str, texts: list[str], key: str
+    ) -> list[list[float]]:
+        try:
+            embeddings = self.post(engine, url, model, texts, key)
+            self._grow_batch_size(engine, url)
+            return embeddings
+        except (EmbeddingRequestTooLarge, requests.exceptions.Timeout) as e:
+            if len(texts) == 1:
+                raise e
+
+            half = len(texts) // 2
+            self._shrink_batch_size(engine, url, len(texts), half)
+            log.info(f"Embedding batch of {len(texts)} too large for {url}, splitting")
+            return self.embed_batch(
+                engine, url, model, texts[:half], key
+            ) + self.embed_batch(engine, url, model, texts[half:], key)
+
+    def embed(
+        self,
+        engine: str,
+        model: str,
+        texts: list[str],
+        urls: list[str],
+        key: str = "",
+        batch_size: int = 1,
+    ) -> list[list[float]]:
+        batch_size = max(1, batch_size)
+
+        # Plan the batches up front so each URL gets its own adapted size
+        batches = []
+        i = 0
+        while i < len(texts):
+            url = urls[next(self.url_cycle) % len(urls)]
+            size = self._get_batch_size(engine, url, batch_size)
+            batches.append((url, texts[i : i + size]))
+            i += size
+
+        if len(batches) == 1:
+            url, batch = batches[0]
+            return self.embed_batch(engine, url, model, batch, key)
+
+        futures = [
+            self.executor.submit(self.embed_batch, engine, url, model, batch, key)
+            for url, batch in batches
+        ]
+
+        embeddings = []
+        for future in futures:
+            embeddings.extend(future.result())
+        return embeddings
+
+    def _get_batch_size(self, engine: str, url: str, batch_size: int) -> int:
+        with self.lock:
+            return min(self.batch_sizes.get((engine, url), batch_size), batch_size)
+
+    def _shrink_batch_size(self, engine: str, url: str, rejected: int, size: int):
+        with self.lock:
+            key = (engine, url)
+            self.rejected_sizes[key] = min(
+                self.rejected_sizes.get(key, rejected), rejected
+            )
+            self.batch_sizes[key] = max(1, min(self.batch_sizes.get(key, size), size))
+
+    def _grow_batch_size(self, engine: str, url: str):
+        # Only endpoints that rejected a batch are tracked; they creep back
+        # up towards, but never reach, the smallest size that was rejected
+        with self.lock:
+            key = (engine, url)
+            size = self.batch_sizes.get(key)
+            if size is not None and size + 1 < self.rejected_sizes[key]:
+                self.batch_sizes[key] = size + 1
+
+
+EMBEDDING_CLIENT = RemoteEmbeddingClient(
+    max_concurrency=RAG_EMBEDDING_MAX_CONCURRENCY,
+    max_retries=RAG_EMBEDDING_MAX_RETRIES,
+    retry_backoff=RAG_EMBEDDING_RETRY_BACKOFF,
+    timeout=RAG_EMBEDDING_REQUEST_TIMEOUT,
+)
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from open_webui.apps.retrieval.main import (
+    ProcessFileForm,
+    ingestion_progress,
+    process_file,
+)
+from open_webui.apps.socket.main import USER_POOL, sio
+from open_webui.apps.webui.models.jobs import IngestionJobModel, IngestionJobs
+from open_webui.config import (
+    RAG_INGESTION_JOB_TIMEOUT,
+    RAG_INGESTION_MAX_ATTEMPTS,
+    RAG_INGESTION_RETRY_BACKOFF,
+    RAG_INGESTION_WORKERS,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class IngestionWorkerPool:
+    """
+    Runs queued ingestion jobs (load, split, embed, insert through process_file)
+    in the background. Jobs are persisted in the ingestion_job table, so every
+    worker process polls the same queue and jobs survive restarts; progress is
+    pushed to the owner's sockets as "ingestion-events".
+
+    A running job touches its updated_at at every stage and embedded batch, only
+    jobs that stopped making progress for job_timeout seconds are requeued.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        max_attempts: int,
+        retry_backoff: int,
+        job_timeout: int,
+        poll_interval: float = 2.0,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.tasks: list[asyncio.Task] = []
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="ingestion"
+        )
+        self.tasks = [
+            asyncio.create_task(self.worker()) for _ in range(self.concurrency)
+        ]
+        log.info(f"Started {self.concurrency} ingestion workers")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def notify(self):
+        # Safe to call from the threadpool that runs sync endpoints
+        if self.loop and self.wakeup:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def enqueue(
+        self, user_id: str, file_id: str, collection_name: Optional[str] = None
+    ) -> Optional[IngestionJobModel]:
+        job = IngestionJobs.insert_new_job(user_id, file_id, collection_name)
+        if job:
+            self.notify()
+        return job
+
+    async def emit(self, job: IngestionJobModel, **progress):
+        data = {
+            "job_id": job.id,
+            "file_id": job.file_id,
+            "collection_name": job.collection_name,
+            "status": job.status,
+            "attempts": job.attempts,
+            "error": job.error,
+            **progress,
+        }
+        for sid in USER_POOL.get(job.user_id, []):
+            await sio.emit("ingestion-events", data, to=sid)
+
+    async def run_in_executor(self, func, *args):
+        return await self.loop.run_in_executor(self.executor, func, *args)
+
+    def run_job(self, job: IngestionJobModel):
+        # Runs in the executor, reports back to the loop from process_file
+        def progress(stage: str, chunks: int = 0):
+            IngestionJobs.touch_job_by_id(job.id)
+            asyncio.run_coroutine_threadsafe(
+                self.emit(job, stage=stage, chunks=chunks), self.loop
+            )
+
+        token = ingestion_progress.set(progress)
+        try:
+            return process_file(
+                ProcessFileForm(
+                    file_id=job.file_id, collection_name=job.collection_name
+                )
+            )
+        finally:
+            ingestion_progress.reset(token)
+
+    async def worker(self):
+        while True:
+            try:
+                await self.run_in_executor(
+                    IngestionJobs.requeue_stale_jobs,
+                    self.job_timeout,
+                    self.max_attempts,
+                )
+                job = await self.run_in_executor(IngestionJobs.claim_next_job)
+                if job is None:
+                    self.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(
+                            self.wakeup.wait(), timeout=self.poll_interval
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self.process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.exception(f"Ingestion worker error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def process(self, job: IngestionJobModel):
+        log.info(f"Processing ingestion job {job.id} (attempt {job.attempts})")
+        await self.emit(job)
+
+        try:
+            await self.run_in_executor(self.run_job, job)
+            job = await self.run_in_executor(
+                IngestionJobs.update_job_status_by_id, job.id, "completed"
+            )
+        except Exception as e:
+            error = str(e.detail) if hasattr(e, "detail") else str(e)
+            log.warning(f"Ingestion job {job.id} failed: {error}")
+
+            if job.attempts < self.max_attempts:
+                # Exponential backoff: base, 2 * base, 4 * base, ...
+                run_at = int(time.time()) + self.retry_backoff * 2 ** (job.attempts - 1)
+                job = await self.run_in_executor(
+                    IngestionJobs.update_job_status_by_id,
+                    job.id,
+                    "pending",
+                    error,
+                    run_at,
+                )
+            else:
+                job = await self.run_in_executor(
+                    IngestionJobs.update_job_status_by_id, job.id, "failed", error
+                )
+
+        if job:
+            await self.emit(job)
+
+
+INGESTION_WORKERS = IngestionWorkerPool(
+    concurrency=RAG_INGESTION_WORKERS,
+    max_attempts=RAG_INGESTION_MAX_ATTEMPTS,
+    retry_backoff=RAG_INGESTION_RETRY_BACKOFF,
+    job_timeout=RAG_INGESTION_JOB_TIMEOUT,
+)
@@ -1,5 +1,6 @@
 # TODO: Merge this with the webui_app and make it a single app
 
+import itertools
 import json
 import logging
 import mimetypes
@@ -7,9 +8,11 @@ import os
 import shutil
 
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
-from typing import Iterator, Optional, Sequence, Union
+from typing import Callable, Iterator, Optional, Sequence, Union
 
 from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
@@ -20,6 +23,8 @@ import tiktoken
 from open_webui.storage.provider import Storage
 from open_webui.apps.webui.models.knowledge import Knowledges
 from open_webui.apps.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.apps.retrieval.bm25 import BM25_INDEX_CACHE
+from open_webui.apps.retrieval.cache import EMBEDDING_CACHE, get_chunk_embeddings
 
 # Document loaders
 from open_webui.apps.retrieval.loaders.main import Loader
@@ -43,6 +48,7 @@ from open_webui.apps.retrieval.web.bing import search_bing
 
 
 from open_webui.apps.retrieval.utils import (
+    RETRIEVAL_LIMITER,
     get_embedding_function,
     get_model_path,
     query_collection,
@@ -51,6 +57,7 @@ from open_webui.apps.retrieval.utils import (
     query_doc_with_hybrid_search,
 )
 
+from open_webui.apps.webui.models.embeddings import ChunkEmbeddings
 from open_webui.apps.webui.models.files import Files
 from open_webui.config import (
     BRAVE_SEARCH_API_KEY,
@@ -63,6 +70,7 @@ from open_webui.config import (
     CORS_ALLOW_ORIGIN,
     ENABLE_RAG_HYBRID_SEARCH,
     ENABLE_RAG_LOCAL_WEB_FETCH,
+    ENABLE_RAG_PIPELINED_INGESTION,
     ENABLE_RAG_WEB_LOADER_SSL_VERIFICATION,
     ENABLE_RAG_WEB_SEARCH,
     ENV,
@@ -76,6 +84,7 @@ from open_webui.config import (
     RAG_EMBEDDING_BATCH_SIZE,
     RAG_FILE_MAX_COUNT,
     RAG_FILE_MAX_SIZE,
+    RAG_INGESTION_PIPELINE_BATCH_SIZE,
     RAG_OPENAI_API_BASE_URL,
     RAG_OPENAI_API_KEY,
     RAG_OLLAMA_BASE_URL,
@@ -129,6 +138,20 @@ from langchain_core.documents import Document
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
 
+# Set by the ingestion workers to hear about each stage and batch of the file
+# they are processing, process_file is also a plain endpoint so it's not an
+# argument.
+ingestion_progress: ContextVar[Optional[Callable]] = ContextVar(
+    "ingestion_progress", default=None
+)
+
+
+def report_progress(stage: str, chunks: int = 0):
+    progress = ingestion_progress.get()
+    if progress is not None:
+        progress(stage, chunks)
+
+
 app = FastAPI(
     docs_url="/docs" if ENV == "dev" else None,
     openapi_url="/openapi.json" if ENV == "dev" else None,
@@ -278,6 +301,7 @@ app.state.EMBEDDING_FUNCTION = get_embedding_function(
         else app.state.config.OLLAMA_API_KEY
     ),
     app.state.config.RAG_EMBEDDING_BATCH_SIZE,
+    embedding_cache=EMBEDDING_CACHE,
 )
 
 app.add_middleware(
@@ -398,6 +422,7 @@ async def update_embedding_config(
                 else app.state.config.OLLAMA_API_KEY
             ),
             app.state.config.RAG_EMBEDDING_BATCH_SIZE,
+            embedding_cache=EMBEDDING_CACHE,
         )
 
         return {
@@ -765,6 +790,7 @@ def save_docs_to_vector_db(
                 log.info(f"Document with hash {metadata['hash']} already exists")
                 raise ValueError(ERROR_MESSAGES.DUPLICATE_CONTENT)
 
+    text_splitter = None
     if split:
         if app.state.config.TEXT_SPLITTER in ["", "character"]:
             text_splitter = RecursiveCharacterTextSplitter(
@@ -787,32 +813,20 @@ def save_docs_to_vector_db(
         else:
             raise ValueError(ERROR_MESSAGES.DEFAULT("Invalid text splitter"))
 
-        docs = text_splitter.split_documents(docs)
-
-    if len(docs) == 0:
-        raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
-
-    texts = [doc.page_content for doc in docs]
-    metadatas = [
-        {
-            **doc.metadata,
-            **(metadata if metadata else {}),
-            "embedding_config": json.dumps(
-                {
-                    "engine": app.state.config.RAG_EMBEDDING_ENGINE,
-                    "model": app.state.config.RAG_EMBEDDING_MODEL,
-                }
-            ),
-        }
-        for doc in docs
-    ]
+    if ENABLE_RAG_PIPELINED_INGESTION:
+        batches = _get_chunk_batches(
+            docs, text_splitter, RAG_INGESTION_PIPELINE_BATCH_SIZE
+        )
+        first_batch = next(batches, None)
+        if first_batch is None:
+            raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+        batches = itertools.chain([first_batch], batches)
+    else:
+        if text_splitter:
+            docs = text_splitter.split_documents(docs)
 
-    # ChromaDB does not like datetime formats
-    # for meta-data so convert them to string.
-    for metadata in metadatas:
-        for key, value in metadata.items():
-            if isinstance(value, datetime):
-                metadata[key] = str(value)
+        if len(docs) == 0:
+            raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
 
     try:
         if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
@@ -820,6 +834,7 @@ def save_docs_to_vector_db(
 
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+                BM25_INDEX_CACHE.delete_collection(collection_name)
                 log.info(f"deleting existing collection {collection_name}")
             elif add is False:
                 log.info(
@@ -845,24 +860,15 @@ def save_docs_to_vector_db(
             app.state.config.RAG_EMBEDDING_BATCH_SIZE,
         )
 
-        embeddings = embedding_function(
-            list(map(lambda x: x.replace("\n", " "), texts))
-        )
-
-        items = [
-            {
-                "id": str(uuid.uuid4()),
-                "text": text,
-                "vector": embeddings[idx],
-                "metadata": metadatas[idx],
-            }
-            for idx, text in enumerate(texts)
-        ]
-
-        VECTOR_DB_CLIENT.insert(
-            collection_name=collection_name,
-            items=items,
-        )
+        if ENABLE_RAG_PIPELINED_INGESTION:
+            _insert_chunk_batches(
+                collection_name, batches, metadata, embedding_function
+            )
+        else:
+            report_progress("embedding")
+            items = _get_vector_db_items(docs, metadata, embedding_function)
+            _insert_items(collection_name, items)
+            report_progress("embedding", len(items))
 
         return True
     except Exception as e:
@@ -870,6 +876,115 @@ def save_docs_to_vector_db(
         return False
 
 
+def _get_chunk_batches(
+    docs, text_splitter, batch_size: int
+) -> Iterator[list[Document]]:
+    # Documents are split one at a time so chunks are produced incrementally
+    batch = []
+    for doc in docs:
+        chunks = text_splitter.split_documents([doc]) if text_splitter else [doc]
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+def _get_vector_db_items(
+    docs: list[Document], metadata: Optional[dict], embedding_function
+) -> list[dict]:
+    texts = [doc.page_content for doc in docs]
+    metadatas = [
+        {
+            **doc.metadata,
+            **(metadata if metadata else {}),
+            "embedding_config": json.dumps(
+                {
+                    "engine": app.state.config.RAG_EMBEDDING_ENGINE,
+                    "model": app.state.config.RAG_EMBEDDING_MODEL,
+                }
+            ),
+        }
+        for doc in docs
+    ]
+
+    # ChromaDB does not like datetime formats
+    # for meta-data so convert them to string.
+    for item_metadata in metadatas:
+        for key, value in item_metadata.items():
+            if isinstance(value, datetime):
+                item_metadata[key] = str(value)
+
+    embeddings = get_chunk_embeddings(
+        list(map(lambda x: x.replace("\n", " "), texts)),
+        embedding_function,
+        app.state.config.RAG_EMBEDDING_ENGINE,
+        app.state.config.RAG_EMBEDDING_MODEL,
+    )
+
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "text": text,
+            "vector": embeddings[idx],
+            "metadata": metadatas[idx],
+        }
+        for idx, text in enumerate(texts)
+    ]
+
+
+def _insert_items(collection_name: str, items: list[dict]):
+    VECTOR_DB_CLIENT.insert(
+        collection_name=collection_name,
+        items=items,
+    )
+    BM25_INDEX_CACHE.add(collection_name, items)
+
+
+def _insert_chunk_batches(
+    collection_name: str,
+    batches: Iterator[list[Document]],
+    metadata: Optional[dict],
+    embedding_function,
+):
+    # Batch k + 1 is embedded while batch k is written to the vector db, so at
+    # most two batches of chunks and vectors are held in memory at once.
+    inserted_ids = []
+    pending = None
+
+    report_progress("embedding")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        try:
+            for batch in batches:
+                items = _get_vector_db_items(batch, metadata, embedding_function)
+
+                if pending:
+                    pending.result()
+                pending = executor.submit(_insert_items, collection_name, items)
+                inserted_ids.extend(item["id"] for item in items)
+                report_progress("embedding", len(inserted_ids))
+
+            if pending:
+                pending.result()
+        except Exception:
+            # Don't leave a partially ingested document behind
+            if pending:
+                pending.exception()
+            if inserted_ids:
+                try:
+                    VECTOR_DB_CLIENT.delete(
+                        collection_name=collection_name, ids=inserted_ids
+                    )
+                    BM25_INDEX_CACHE.delete(collection_name, ids=inserted_ids)
+                except Exception as e:
+                    log.warning(f"Failed to remove partially inserted chunks: {e}")
+            raise
+
+
 class ProcessFileForm(BaseModel):
     file_id: str
     content: Optional[str] = None
@@ -894,6 +1009,7 @@ def process_file(
             # Usage: /files/{file_id}/data/content/update
 
             VECTOR_DB_CLIENT.delete_collection(collection_name=f"file-{file.id}")
+            BM25_INDEX_CACHE.delete_collection(f"file-{file.id}")
 
             docs = [
                 Document(
@@ -945,16 +1061,13 @@ def process_file(
             # Usage: /files/
             file_path = file.path
             if file_path:
+                report_progress("loading")
                 file_path = Storage.get_file(file_path)
                 loader = Loader(
                     engine=app.state.config.CONTENT_EXTRACTION_ENGINE,
                     TIKA_SERVER_URL=app.state.config.TIKA_SERVER_URL,
                     PDF_EXTRACT_IMAGES=app.state.config.PDF_EXTRACT_IMAGES,
                 )
-                docs = loader.load(
-                    file.filename, file.meta.get("content_type"), file_path
-                )
-
                 docs = [
                     Document(
                         page_content=doc.page_content,
@@ -966,7 +1079,9 @@ def process_file(
                             "source": file.filename,
                         },
                     )
-                    for doc in docs
+                    for doc in loader.lazy_load(
+                        file.filename, file.meta.get("content_type"), file_path
+                    )
                 ]
             else:
                 docs = [
@@ -1415,6 +1530,15 @@ def query_collection_handler(
         )
 
 
+@app.get("/query/stats")
+async def get_query_stats(user=Depends(get_admin_user)):
+    return {
+        "status": True,
+        "retrieval": RETRIEVAL_LIMITER.stats(),
+        "embedding_cache": EMBEDDING_CACHE.stats(),
+    }
+
+
 ####################################
 #
 # Vector DB operations
@@ -1438,6 +1562,7 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
                 collection_name=form_data.collection_name,
                 metadata={"hash": hash},
             )
+            BM25_INDEX_CACHE.delete(form_data.collection_name, filter={"hash": hash})
             return {"status": True}
         else:
             return {"status": False}
@@ -1449,6 +1574,8 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
 @app.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user)):
     VECTOR_DB_CLIENT.reset()
+    BM25_INDEX_CACHE.reset()
+    ChunkEmbeddings.delete_all_chunk_embeddings()
     Knowledges.delete_all_knowledge()
 
 
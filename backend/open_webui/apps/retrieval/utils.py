@@ -1,17 +1,30 @@
 import logging
 import os
+import threading
+import time
 import uuid
 from typing import Optional, Union
 
 import asyncio
 import requests
+from concurrent.futures import ThreadPoolExecutor
 
 from huggingface_hub import snapshot_download
 from langchain.retrievers import ContextualCompressionRetriever, EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 
+from open_webui.apps.retrieval.bm25 import BM25_INDEX_CACHE, BM25IndexRetriever
+from open_webui.apps.retrieval.embedding_client import EMBEDDING_CLIENT
+from open_webui.apps.retrieval.cache import (
+    EmbeddingCache,
+    get_cached_embedding_function,
+)
 from open_webui.apps.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.config import (
+    RAG_RETRIEVAL_CONCURRENT_REQUESTS,
+    RAG_RETRIEVAL_MAX_CONCURRENCY,
+    VECTOR_DB,
+)
 from open_webui.utils.misc import get_last_user_message
 
 from open_webui.env import SRC_LOG_LEVELS
@@ -86,13 +99,14 @@ def query_doc_with_hybrid_search(
     r: float,
 ) -> dict:
     try:
-        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
-
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=result.documents[0],
-            metadatas=result.metadatas[0],
+        bm25_index = BM25_INDEX_CACHE.get(
+            collection_name,
+            lambda name: VECTOR_DB_CLIENT.get(collection_name=name),
         )
-        bm25_retriever.k = k
+        if bm25_index is None:
+            raise Exception(f"Collection {collection_name} not found")
+
+        bm25_retriever = BM25IndexRetriever(index=bm25_index, k=k)
 
         vector_search_retriever = VectorSearchRetriever(
             collection_name=collection_name,
@@ -173,29 +187,117 @@ def merge_and_sort_query_results(
     return result
 
 
+# Backends whose search() answers every vector in a single round trip
+MULTI_VECTOR_SEARCH_DBS = ["chroma", "pgvector", "milvus"]
+
+
+# Shared by all retrievals of the worker, RETRIEVAL_LIMITER bounds how many run
+RETRIEVAL_LOOKUP_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(1, RAG_RETRIEVAL_CONCURRENT_REQUESTS),
+    thread_name_prefix="retrieval-lookup",
+)
+retrieval_lookup_thread = threading.local()
+
+
+def run_concurrently(tasks: list):
+    # Run zero-argument callables on the shared lookup pool, keeping their order.
+    # Exceptions are returned in place of the result instead of being raised.
+    # Only one level fans out: tasks started from a pool thread (files ->
+    # collections -> queries) run inline, so they can't wait on a full pool.
+    def run(task):
+        try:
+            return task()
+        except Exception as e:
+            return e
+
+    def run_in_pool(task):
+        retrieval_lookup_thread.active = True
+        try:
+            return run(task)
+        finally:
+            retrieval_lookup_thread.active = False
+
+    if (
+        len(tasks) <= 1
+        or RAG_RETRIEVAL_CONCURRENT_REQUESTS <= 1
+        or getattr(retrieval_lookup_thread, "active", False)
+    ):
+        return [run(task) for task in tasks]
+
+    return list(RETRIEVAL_LOOKUP_EXECUTOR.map(run_in_pool, tasks))
+
+
+def query_doc_with_embeddings(
+    collection_name: str,
+    query_embeddings: list[list[float]],
+    k: int,
+) -> list[dict]:
+    if VECTOR_DB in MULTI_VECTOR_SEARCH_DBS:
+        result = VECTOR_DB_CLIENT.search(
+            collection_name=collection_name,
+            vectors=query_embeddings,
+            limit=k,
+        )
+        if result is None:
+            return []
+
+        result = result.model_dump()
+        return [
+            {
+                "distances": [result["distances"][idx]],
+                "documents": [result["documents"][idx]],
+                "metadatas": [result["metadatas"][idx]],
+            }
+            for idx in range(len(result["ids"]))
+        ]
+    else:
+        results = []
+        for query_embedding in query_embeddings:
+            result = query_doc(
+                collection_name=collection_name,
+                k=k,
+                query_embedding=query_embedding,
+            )
+            if result is not None:
+                results.append(result.model_dump())
+        return results
+
+
 def query_collection(
     collection_names: list[str],
     queries: list[str],
     embedding_function,
     k: int,
+    query_embeddings: Optional[list[list[float]]] = None,
 ) -> dict:
+    if query_embeddings is None:
+        # Embed every query in one batched call
+        query_embeddings = embedding_function(queries)
+
+    collection_names = [
+        collection_name for collection_name in collection_names if collection_name
+    ]
+
     results = []
-    for query in queries:
-        query_embedding = embedding_function(query)
-        for collection_name in collection_names:
-            if collection_name:
-                try:
-                    result = query_doc(
-                        collection_name=collection_name,
-                        k=k,
-                        query_embedding=query_embedding,
-                    )
-                    if result is not None:
-                        results.append(result.model_dump())
-                except Exception as e:
-                    log.exception(f"Error when querying the collection: {e}")
-            else:
-                pass
+    for collection_name, result in zip(
+        collection_names,
+        run_concurrently(
+            [
+                lambda collection_name=collection_name: query_doc_with_embeddings(
+                    collection_name=collection_name,
+                    query_embeddings=query_embeddings,
+                    k=k,
+                )
+                for collection_name in collection_names
+            ]
+        ),
+    ):
+        if isinstance(result, Exception):
+            log.exception(
+                f"Error when querying the collection {collection_name}: {result}"
+            )
+        else:
+            results.extend(result)
 
     return merge_and_sort_query_results(results, k=k)
 
@@ -208,25 +310,34 @@ def query_collection_with_hybrid_search(
     reranking_function,
     r: float,
 ) -> dict:
+    # Embed all queries up front in one batch so the concurrent lookups below
+    # are served from the embedding cache, pointless without one
+    if getattr(embedding_function, "embedding_cache", None) is not None:
+        embedding_function(queries)
+
+    tasks = [
+        lambda collection_name=collection_name, query=query: query_doc_with_hybrid_search(
+            collection_name=collection_name,
+            query=query,
+            embedding_function=embedding_function,
+            k=k,
+            reranking_function=reranking_function,
+            r=r,
+        )
+        for collection_name in collection_names
+        for query in queries
+    ]
+
     results = []
     error = False
-    for collection_name in collection_names:
-        try:
-            for query in queries:
-                result = query_doc_with_hybrid_search(
-                    collection_name=collection_name,
-                    query=query,
-                    embedding_function=embedding_function,
-                    k=k,
-                    reranking_function=reranking_function,
-                    r=r,
-                )
-                results.append(result)
-        except Exception as e:
+    for result in run_concurrently(tasks):
+        if isinstance(result, Exception):
             log.exception(
-                "Error when querying the collection with " f"hybrid_search: {e}"
+                "Error when querying the collection with " f"hybrid_search: {result}"
             )
             error = True
+        else:
+            results.append(result)
 
     if error:
         raise Exception(
@@ -243,28 +354,42 @@ def get_embedding_function(
     url,
     key,
     embedding_batch_size,
+    embedding_cache: Optional[EmbeddingCache] = None,
 ):
     if embedding_engine == "":
-        return lambda query: embedding_function.encode(query).tolist()
+        func = lambda query: embedding_function.encode(query).tolist()
     elif embedding_engine in ["ollama", "openai"]:
-        func = lambda query: generate_embeddings(
-            engine=embedding_engine,
-            model=embedding_model,
-            text=query,
-            url=url,
-            key=key,
-        )
+        # Several ";" separated Ollama URLs share the embedding load
+        urls = [u.strip() for u in url.split(";") if u.strip()] or [url]
 
-        def generate_multiple(query, func):
+        def generate_multiple(query):
             if isinstance(query, list):
-                embeddings = []
-                for i in range(0, len(query), embedding_batch_size):
-                    embeddings.extend(func(query[i : i + embedding_batch_size]))
-                return embeddings
+                return EMBEDDING_CLIENT.embed(
+                    engine=embedding_engine,
+                    model=embedding_model,
+                    texts=query,
+                    urls=urls,
+                    key=key,
+                    batch_size=embedding_batch_size,
+                )
             else:
-                return func(query)
+                return generate_embeddings(
+                    engine=embedding_engine,
+                    model=embedding_model,
+                    text=query,
+                    url=urls[0],
+                    key=key,
+                )
 
-        return lambda query: generate_multiple(query, func)
+        func = generate_multiple
+    else:
+        return None
+
+    if embedding_cache is not None:
+        return get_cached_embedding_function(
+            func, embedding_engine, embedding_model, embedding_cache
+        )
+    return func
 
 
 def get_sources_from_files(
@@ -278,8 +403,50 @@ def get_sources_from_files(
 ):
     log.debug(f"files: {files} {queries} {embedding_function} {reranking_function}")
 
+    # Embedded at most once and shared by every file that falls back to (or
+    # uses) plain vector search
+    query_embeddings = None
+    query_embeddings_lock = threading.Lock()
+
+    def get_query_embeddings():
+        nonlocal query_embeddings
+        with query_embeddings_lock:
+            if query_embeddings is None:
+                query_embeddings = embedding_function(queries)
+            return query_embeddings
+
+    def retrieve(collection_names):
+        context = None
+        if hybrid_search:
+            try:
+                context = query_collection_with_hybrid_search(
+                    collection_names=collection_names,
+                    queries=queries,
+                    embedding_function=embedding_function,
+                    k=k,
+                    reranking_function=reranking_function,
+                    r=r,
+                )
+            except Exception as e:
+                log.debug(
+                    "Error when using hybrid search, using"
+                    " non hybrid search as fallback."
+                )
+
+        if (not hybrid_search) or (context is None):
+            context = query_collection(
+                collection_names=collection_names,
+                queries=queries,
+                embedding_function=embedding_function,
+                k=k,
+                query_embeddings=get_query_embeddings(),
+            )
+        return context
+
+    # Plan every lookup first, then run them together on the retrieval pool
     extracted_collections = []
-    relevant_contexts = []
+    planned_files = []
+    tasks = []
 
     for file in files:
         if file.get("context") == "full":
@@ -309,39 +476,30 @@ def get_sources_from_files(
                 log.debug(f"skipping {file} as it has already been extracted")
                 continue
 
-            try:
-                context = None
-                if file.get("type") == "text":
-                    context = file["content"]
-                else:
-                    if hybrid_search:
-                        try:
-                            context = query_collection_with_hybrid_search(
-                                collection_names=collection_names,
-                                queries=queries,
-                                embedding_function=embedding_function,
-                                k=k,
-                                reranking_function=reranking_function,
-                                r=r,
-                            )
-                        except Exception as e:
-                            log.debug(
-                                "Error when using hybrid search, using"
-                                " non hybrid search as fallback."
-                            )
-
-                    if (not hybrid_search) or (context is None):
-                        context = query_collection(
-                            collection_names=collection_names,
-                            queries=queries,
-                            embedding_function=embedding_function,
-                            k=k,
-                        )
-            except Exception as e:
-                log.exception(e)
+            if file.get("type") == "text":
+                context = file["content"]
+            else:
+                tasks.append(
+                    (
+                        len(planned_files),
+                        lambda collection_names=list(collection_names): retrieve(
+                            collection_names
+                        ),
+                    )
+                )
 
             extracted_collections.extend(collection_names)
 
+        planned_files.append([file, context])
+
+    for (idx, _), context in zip(tasks, run_concurrently([task for _, task in tasks])):
+        if isinstance(context, Exception):
+            log.exception(context)
+        else:
+            planned_files[idx][1] = context
+
+    relevant_contexts = []
+    for file, context in planned_files:
         if context:
             if "data" in file:
                 del file["data"]
@@ -367,6 +525,94 @@ def get_sources_from_files(
     return sources
 
 
+class RetrievalLimiter:
+    """
+    Runs blocking retrieval work (embedding, reranking, vector DB I/O) on a
+    dedicated thread pool so the event loop keeps serving streams, and caps how
+    many retrievals a worker runs at once. Callers beyond the cap wait in line;
+    stats() reports the queue depth and timings.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="retrieval"
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_time = 0.0
+        self.total_run_time = 0.0
+
+    async def run(self, func, *args, **kwargs):
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_time += started_at - queued_at
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.executor, lambda: func(*args, **kwargs)
+            )
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.total_run_time += time.perf_counter() - started_at
+            self.semaphore.release()
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_time": self.total_wait_time / finished if finished else 0.0,
+            "avg_run_time": self.total_run_time / finished if finished else 0.0,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+RETRIEVAL_LIMITER = RetrievalLimiter(RAG_RETRIEVAL_MAX_CONCURRENCY)
+
+
+async def get_sources_from_files_async(
+    files,
+    queries,
+    embedding_function,
+    k,
+    reranking_function,
+    r,
+    hybrid_search,
+):
+    return await RETRIEVAL_LIMITER.run(
+        get_sources_from_files,
+        files=files,
+        queries=queries,
+        embedding_function=embedding_function,
+        k=k,
+        reranking_function=reranking_function,
+        r=r,
+        hybrid_search=hybrid_search,
+    )
+
+
 def get_model_path(model: str, update_model: bool = False):
     # Construct huggingface_hub kwargs with local_files_only to return the snapshot path
     cache_dir = os.getenv("SENTENCE_TRANSFORMERS_HOME")
@@ -409,20 +655,7 @@ def generate_openai_batch_embeddings(
     model: str, texts: list[str], url: str = "https://api.openai.com/v1", key: str = ""
 ) -> Optional[list[list[float]]]:
     try:
-        r = requests.post(
-            f"{url}/embeddings",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {key}",
-            },
-            json={"input": texts, "model": model},
-        )
-        r.raise_for_status()
-        data = r.json()
-        if "data" in data:
-            return [elem["embedding"] for elem in data["data"]]
-        else:
-            raise "Something went wrong :/"
+        return EMBEDDING_CLIENT.post("openai", url, model, texts, key)
     except Exception as e:
         print(e)
         return None
@@ -432,21 +665,7 @@ def generate_ollama_batch_embeddings(
     model: str, texts: list[str], url: str, key: str = ""
 ) -> Optional[list[list[float]]]:
     try:
-        r = requests.post(
-            f"{url}/api/embed",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {key}",
-            },
-            json={"input": texts, "model": model},
-        )
-        r.raise_for_status()
-        data = r.json()
-
-        if "embeddings" in data:
-            return data["embeddings"]
-        else:
-            raise "Something went wrong :/"
+        return EMBEDDING_CLIENT.post("ollama", url, model, texts, key)
     except Exception as e:
         print(e)
         return None
@@ -1,11 +1,18 @@
+import asyncio
+import functools
 import json
 import logging
-from contextlib import contextmanager
+import shlex
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from typing import Any, Optional
 
 from open_webui.apps.webui.internal.wrappers import register_connection
 from open_webui.env import (
     OPEN_WEBUI_DIR,
+    DATABASE_ASYNC_URL,
     DATABASE_URL,
     SRC_LOG_LEVELS,
     DATABASE_POOL_MAX_OVERFLOW,
@@ -14,10 +21,12 @@ from open_webui.env import (
     DATABASE_POOL_TIMEOUT,
 )
 from peewee_migrate import Router
-from sqlalchemy import Dialect, create_engine, types
+from sqlalchemy import Dialect, create_engine, event, exc, make_url, types
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session as SQLAlchemySession
 from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.pool import QueuePool, NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, NullPool
 from sqlalchemy.sql.type_api import _T
 from typing_extensions import Self
 
@@ -74,6 +83,108 @@ def handle_peewee_migration(DATABASE_URL):
 handle_peewee_migration(DATABASE_URL)
 
 
+class PoolMetrics:
+    """
+    Connection pool usage of an engine, to size DATABASE_POOL_SIZE from data:
+    checkouts, connections in use (current and peak), time spent waiting for
+    a free connection and checkouts that timed out.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.pool = None
+
+    def register(self, engine):
+        self.pool = engine.pool
+        event.listen(engine, "connect", self.on_connect)
+        event.listen(engine, "checkout", self.on_checkout)
+        event.listen(engine, "checkin", self.on_checkin)
+        event.listen(engine, "invalidate", self.on_invalidate)
+
+    def on_connect(self, *args):
+        with self.lock:
+            self.connects += 1
+
+    def on_checkout(self, *args):
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, *args):
+        with self.lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def on_invalidate(self, *args):
+        with self.lock:
+            self.invalidations += 1
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self.lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def stats(self) -> dict:
+        stats = {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_avg": self.wait_total / self.wait_count if self.wait_count else 0.0,
+            "wait_max": self.wait_max,
+        }
+        if isinstance(self.pool, QueuePool):
+            stats["pool_size"] = self.pool.size()
+            stats["overflow"] = self.pool.overflow()
+        return stats
+
+
+class InstrumentedPoolMixin:
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.record_wait(time.perf_counter() - start, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+DB_POOL_METRICS = {"sync": PoolMetrics(), "async": PoolMetrics()}
+
+
 SQLALCHEMY_DATABASE_URL = DATABASE_URL
 if "sqlite" in SQLALCHEMY_DATABASE_URL:
     engine = create_engine(
@@ -88,22 +199,53 @@ else:
             pool_timeout=DATABASE_POOL_TIMEOUT,
             pool_recycle=DATABASE_POOL_RECYCLE,
             pool_pre_ping=True,
-            poolclass=QueuePool,
+            poolclass=InstrumentedQueuePool,
         )
     else:
         engine = create_engine(
             SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, poolclass=NullPool
         )
 
+if isinstance(engine.pool, InstrumentedPoolMixin):
+    engine.pool.metrics = DB_POOL_METRICS["sync"]
+DB_POOL_METRICS["sync"].register(engine)
+
+
+class UnitOfWorkSession(SQLAlchemySession):
+    """
+    Session shared by the table methods called inside a unit_of_work block:
+    their commits only flush, and the block commits once at the end.
+    """
+
+    def commit(self):
+        self.flush()
+
 
 SessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=engine, expire_on_commit=False
 )
+UnitOfWorkSessionLocal = sessionmaker(
+    class_=UnitOfWorkSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    expire_on_commit=False,
+)
 Base = declarative_base()
 Session = scoped_session(SessionLocal)
 
+current_unit_of_work: ContextVar[Optional[UnitOfWorkSession]] = ContextVar(
+    "current_unit_of_work", default=None
+)
+
 
 def get_session():
+    db = current_unit_of_work.get()
+    if db is not None:
+        # The unit of work owns (and closes) the session
+        yield db
+        return
+
     db = SessionLocal()
     try:
         yield db
@@ -112,3 +254,169 @@ def get_session():
 
 
 get_db = contextmanager(get_session)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Runs the table methods called inside the block on one session and one
+    connection, and commits their writes together (or none of them) when the
+    block exits. Nested blocks join the outer one.
+
+    The async table methods use their own sessions and don't see the block's
+    writes before it commits.
+    """
+    if current_unit_of_work.get() is not None:
+        yield current_unit_of_work.get()
+        return
+
+    db = UnitOfWorkSessionLocal()
+    token = current_unit_of_work.set(db)
+    try:
+        yield db
+        SQLAlchemySession.commit(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        current_unit_of_work.reset(token)
+        db.close()
+
+
+# Async engine for the table methods awaited from async endpoints, so a slow
+# query doesn't hold up the event loop. The sync engine above stays in use for
+# migrations and the remaining table methods.
+def get_asyncpg_connect_args(query: dict) -> Optional[tuple[dict, dict]]:
+    # Translates the psycopg2 (libpq) parameters of a postgres url for asyncpg:
+    # returns the parameters to keep in the url and the extra connect_args, or
+    # None if there's one asyncpg can't take.
+    params = {}
+    connect_args = {}
+    server_settings = {}
+
+    for key, value in query.items():
+        if isinstance(value, tuple):
+            value = value[-1]
+
+        if key == "sslmode":
+            params["ssl"] = value
+        elif key == "target_session_attrs":
+            params[key] = value
+        elif key == "connect_timeout":
+            connect_args["timeout"] = float(value)
+        elif key == "application_name":
+            server_settings[key] = value
+        elif key == "options":
+            # e.g. "-c search_path=app -c statement_timeout=5000"
+            tokens = iter(shlex.split(value))
+            for token in tokens:
+                if token == "-c":
+                    token = next(tokens, "")
+                elif token.startswith("-c") or token.startswith("--"):
+                    token = token[2:]
+                else:
+                    return None
+
+                if "=" not in token:
+                    return None
+                name, setting = token.split("=", 1)
+                server_settings[name.replace("-", "_")] = setting
+        else:
+            # sslrootcert, sslcert, keepalives, ... only psycopg2 understands
+            return None
+
+    if server_settings:
+        connect_args["server_settings"] = server_settings
+    return params, connect_args
+
+
+def get_async_database_url(url: str) -> tuple[Optional[str], dict]:
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1), {}
+    elif url.startswith("postgresql://"):
+        async_url = make_url(url).set(drivername="postgresql+asyncpg")
+        translated = get_asyncpg_connect_args(dict(async_url.query))
+        if translated is None:
+            log.warning(
+                "The database url has parameters asyncpg doesn't support, async "
+                "table methods will run in threads (set DATABASE_ASYNC_URL to "
+                "use the async engine)"
+            )
+            return None, {}
+
+        params, connect_args = translated
+        async_url = async_url.set(query=params)
+        return async_url.render_as_string(hide_password=False), connect_args
+    elif url.startswith("mysql://") or url.startswith("mysql+pymysql://"):
+        return "mysql+aiomysql://" + url.split("://", 1)[1], {}
+    return None, {}
+
+
+if DATABASE_ASYNC_URL:
+    SQLALCHEMY_ASYNC_DATABASE_URL, ASYNC_CONNECT_ARGS = DATABASE_ASYNC_URL, {}
+else:
+    SQLALCHEMY_ASYNC_DATABASE_URL, ASYNC_CONNECT_ARGS = get_async_database_url(
+        SQLALCHEMY_DATABASE_URL
+    )
+
+async_engine = None
+try:
+    if SQLALCHEMY_ASYNC_DATABASE_URL is None:
+        pass
+    elif "sqlite" in SQLALCHEMY_ASYNC_DATABASE_URL:
+        async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL)
+    elif DATABASE_POOL_SIZE > 0:
+        async_engine = create_async_engine(
+            SQLALCHEMY_ASYNC_DATABASE_URL,
+            pool_size=DATABASE_POOL_SIZE,
+            max_overflow=DATABASE_POOL_MAX_OVERFLOW,
+            pool_timeout=DATABASE_POOL_TIMEOUT,
+            pool_recycle=DATABASE_POOL_RECYCLE,
+            pool_pre_ping=True,
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            connect_args=ASYNC_CONNECT_ARGS,
+        )
+    else:
+        async_engine = create_async_engine(
+            SQLALCHEMY_ASYNC_DATABASE_URL,
+            pool_pre_ping=True,
+            poolclass=NullPool,
+            connect_args=ASYNC_CONNECT_ARGS,
+        )
+except ImportError as e:
+    log.warning(
+        f"No async driver for the database ({e}), async table methods will run in threads"
+    )
+
+if async_engine is not None:
+    if isinstance(async_engine.pool, InstrumentedPoolMixin):
+        async_engine.pool.metrics = DB_POOL_METRICS["async"]
+    DB_POOL_METRICS["async"].register(async_engine.sync_engine)
+
+AsyncSessionLocal = (
+    async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine
+    else None
+)
+
+
+@asynccontextmanager
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def async_db_method(method):
+    """
+    Marks the async variant "<name>_async" of a table method. Without an async
+    engine it falls back to running the sync method "<name>" in a thread.
+    """
+    sync_name = method.__name__.removesuffix("_async")
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if async_engine is None:
+            return await asyncio.to_thread(getattr(self, sync_name), *args, **kwargs)
+        return await method(self, *args, **kwargs)
+
+    return wrapper
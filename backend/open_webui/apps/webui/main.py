@@ -1,3 +1,4 @@
+import asyncio
 import inspect
 import json
 import logging
@@ -77,6 +78,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from open_webui.utils.filter_chain import FILTER_CHAINS
+from open_webui.utils.function_executor import FUNCTION_EXECUTOR
 from open_webui.utils.misc import (
     openai_chat_chunk_message_template,
     openai_chat_completion_message_template,
@@ -153,6 +156,7 @@ app.state.config.LDAP_CIPHERS = LDAP_CIPHERS
 
 app.state.TOOLS = {}
 app.state.FUNCTIONS = {}
+FILTER_CHAINS.modules = app.state.FUNCTIONS
 
 app.add_middleware(
     CORSMiddleware,
@@ -238,26 +242,29 @@ async def get_all_models():
     return models
 
 
-def get_function_module(pipe_id: str):
+async def get_function_module(pipe_id: str):
     # Check if function is already loaded
     if pipe_id not in app.state.FUNCTIONS:
-        function_module, _, _ = load_function_module_by_id(pipe_id)
+        # In a thread, loading may install the requirements of the function
+        function_module, _, _ = await asyncio.to_thread(
+            load_function_module_by_id, pipe_id
+        )
         app.state.FUNCTIONS[pipe_id] = function_module
     else:
         function_module = app.state.FUNCTIONS[pipe_id]
 
     if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-        valves = Functions.get_function_valves_by_id(pipe_id)
+        valves = await Functions.get_function_valves_by_id_async(pipe_id)
         function_module.valves = function_module.Valves(**(valves if valves else {}))
     return function_module
 
 
 async def get_pipe_models():
-    pipes = Functions.get_functions_by_type("pipe", active_only=True)
+    pipes = await Functions.get_functions_by_type_async("pipe", active_only=True)
     pipe_models = []
 
     for pipe in pipes:
-        function_module = get_function_module(pipe.id)
+        function_module = await get_function_module(pipe.id)
 
         # Check if function is a manifold
         if hasattr(function_module, "pipes"):
@@ -318,18 +325,19 @@ async def get_pipe_models():
     return pipe_models
 
 
-async def execute_pipe(pipe, params):
-    if inspect.iscoroutinefunction(pipe):
-        return await pipe(**params)
-    else:
-        return pipe(**params)
+async def execute_pipe(pipe_id, pipe, params):
+    return await FUNCTION_EXECUTOR.call(pipe_id, pipe, **params)
 
 
-async def get_message_content(res: str | Generator | AsyncGenerator) -> str:
+async def get_message_content(
+    pipe_id: str, res: str | Generator | AsyncGenerator
+) -> str:
     if isinstance(res, str):
         return res
     if isinstance(res, Generator):
-        return "".join(map(str, res))
+        return "".join(
+            [str(stream) async for stream in FUNCTION_EXECUTOR.iterate(pipe_id, res)]
+        )
     if isinstance(res, AsyncGenerator):
         return "".join([str(stream) async for stream in res])
 
@@ -386,7 +394,7 @@ def get_function_params(function_module, form_data, user, extra_params=None):
 
 async def generate_function_chat_completion(form_data, user, models: dict = {}):
     model_id = form_data.get("model")
-    model_info = Models.get_model_by_id(model_id)
+    model_info = await Models.get_model_by_id_async(model_id)
 
     metadata = form_data.pop("metadata", {})
 
@@ -422,7 +430,8 @@ async def generate_function_chat_completion(form_data, user, models: dict = {}):
         },
         "__metadata__": metadata,
     }
-    extra_params["__tools__"] = get_tools(
+    extra_params["__tools__"] = await asyncio.to_thread(
+        get_tools,
         app,
         tool_ids,
         user,
@@ -443,7 +452,7 @@ async def generate_function_chat_completion(form_data, user, models: dict = {}):
         form_data = apply_model_system_prompt_to_body(params, form_data, user)
 
     pipe_id = get_pipe_id(form_data)
-    function_module = get_function_module(pipe_id)
+    function_module = await get_function_module(pipe_id)
 
     pipe = function_module.pipe
     params = get_function_params(function_module, form_data, user, extra_params)
@@ -452,7 +461,7 @@ async def generate_function_chat_completion(form_data, user, models: dict = {}):
 
         async def stream_content():
             try:
-                res = await execute_pipe(pipe, params)
+                res = await execute_pipe(pipe_id, pipe, params)
 
                 # Directly return if the response is a StreamingResponse
                 if isinstance(res, StreamingResponse):
@@ -473,7 +482,7 @@ async def generate_function_chat_completion(form_data, user, models: dict = {}):
                 yield f"data: {json.dumps(message)}\n\n"
 
             if isinstance(res, Iterator):
-                for line in res:
+                async for line in FUNCTION_EXECUTOR.iterate(pipe_id, res):
                     yield process_line(form_data, line)
 
             if isinstance(res, AsyncGenerator):
@@ -491,7 +500,7 @@ async def generate_function_chat_completion(form_data, user, models: dict = {}):
         return StreamingResponse(stream_content(), media_type="text/event-stream")
     else:
         try:
-            res = await execute_pipe(pipe, params)
+            res = await execute_pipe(pipe_id, pipe, params)
 
         except Exception as e:
             log.error(f"Error: {e}")
@@ -502,5 +511,5 @@ async def generate_function_chat_completion(form_data, user, models: dict = {}):
         if isinstance(res, BaseModel):
             return res.model_dump()
 
-        message = await get_message_content(res)
+        message = await get_message_content(pipe_id, res)
         return openai_chat_completion_message_template(form_data["model"], message)
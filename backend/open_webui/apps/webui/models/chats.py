@@ -3,13 +3,20 @@ import time
 import uuid
 from typing import Optional
 
-from open_webui.apps.webui.internal.db import Base, get_db
+from open_webui.apps.webui.internal.db import (
+    Base,
+    async_db_method,
+    get_async_db,
+    get_db,
+)
 from open_webui.apps.webui.models.tags import TagModel, Tag, Tags
+from open_webui.utils.chat_search import CHAT_SEARCH_INDEX, get_search_terms
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import BigInteger, Boolean, Column, Float, Index, String, Text, JSON
+from sqlalchemy import or_, func, inspect, select, and_, text
+from sqlalchemy.orm import foreign, lazyload, relationship
 from sqlalchemy.sql import exists
 
 ####################
@@ -17,13 +24,79 @@ from sqlalchemy.sql import exists
 ####################
 
 
+class ChatMessage(Base):
+    __tablename__ = "chat_message"
+
+    chat_id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True)
+    parent_id = Column(String, nullable=True)
+    role = Column(String, nullable=True)
+    content = Column(Text, nullable=True)
+
+    # The message as sent by the client, history.messages[id] of the chat
+    data = Column(JSON)
+    position = Column(BigInteger)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (
+        Index("chat_message_chat_id_position_idx", "chat_id", "position"),
+    )
+
+    def set_data(self, data: dict):
+        content = data.get("content")
+        self.parent_id = data.get("parentId")
+        self.role = data.get("role")
+        self.content = (
+            content
+            if isinstance(content, str) or content is None
+            else json.dumps(content)
+        )
+        self.data = data
+        self.updated_at = int(time.time())
+
+
+def get_message_list(messages: dict, message_id: Optional[str]) -> list[dict]:
+    # The branch shown in the UI: from the root down to the current message
+    message_list = []
+    while message_id in messages:
+        message = messages[message_id]
+        if any(m is message for m in message_list):
+            break
+        message_list.append(message)
+        message_id = message.get("parentId")
+    return message_list[::-1]
+
+
+class ChatTag(Base):
+    __tablename__ = "chat_tag"
+
+    chat_id = Column(String, primary_key=True)
+    tag_id = Column(String, primary_key=True)
+    user_id = Column(String)
+    created_at = Column(BigInteger)
+
+    __table_args__ = (Index("chat_tag_user_id_tag_id_idx", "user_id", "tag_id"),)
+
+
 class Chat(Base):
     __tablename__ = "chat"
 
     id = Column(String, primary_key=True)
     user_id = Column(String)
     title = Column(Text)
-    chat = Column(JSON)
+
+    # The chat document without history.messages and messages, which live in
+    # chat_message so that a turn only writes the messages that changed
+    envelope = Column("chat", JSON)
+    messages = relationship(
+        ChatMessage,
+        primaryjoin=lambda: Chat.id == foreign(ChatMessage.chat_id),
+        order_by=ChatMessage.position,
+        lazy="selectin",
+        cascade="all, delete-orphan",
+    )
 
     created_at = Column(BigInteger)
     updated_at = Column(BigInteger)
@@ -35,6 +108,59 @@ class Chat(Base):
     meta = Column(JSON, server_default="{}")
     folder_id = Column(Text, nullable=True)
 
+    @property
+    def chat(self) -> dict:
+        chat = dict(self.envelope or {})
+        history = chat.get("history")
+        if not isinstance(history, dict) or "messages" in history:
+            return chat
+
+        messages = {message.id: message.data for message in self.messages}
+        chat["history"] = {**history, "messages": messages}
+        chat["messages"] = get_message_list(messages, history.get("currentId"))
+        return chat
+
+    @chat.setter
+    def chat(self, chat: dict):
+        history = chat.get("history")
+        if not isinstance(history, dict) or not isinstance(
+            history.get("messages"), dict
+        ):
+            self.envelope = chat
+            self.messages = []
+            return
+
+        self.envelope = {
+            **{key: value for key, value in chat.items() if key != "messages"},
+            "history": {
+                key: value for key, value in history.items() if key != "messages"
+            },
+        }
+
+        # Only new and changed messages are written, removed ones are deleted
+        existing = {message.id: message for message in self.messages}
+        position = max((message.position for message in self.messages), default=-1)
+
+        messages = []
+        for id, data in history["messages"].items():
+            message = existing.get(id)
+            if message is None:
+                position += 1
+                timestamp = data.get("timestamp")
+                message = ChatMessage(
+                    id=id,
+                    position=position,
+                    created_at=(
+                        timestamp if isinstance(timestamp, int) else int(time.time())
+                    ),
+                )
+                message.set_data(data)
+            elif message.data != data:
+                message.set_data(data)
+            messages.append(message)
+
+        self.messages = messages
+
 
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -79,6 +205,10 @@ class ChatTitleForm(BaseModel):
     title: str
 
 
+class ChatMessageForm(BaseModel):
+    message: dict
+
+
 class ChatResponse(BaseModel):
     id: str
     user_id: str
@@ -101,6 +231,24 @@ class ChatTitleIdResponse(BaseModel):
 
 
 class ChatTable:
+    def __init__(self):
+        self.search_backend: Optional[str] = None
+
+    def get_search_backend(self, db) -> str:
+        # Set up by the migrations when the database supports it
+        if self.search_backend is None:
+            dialect_name = db.bind.dialect.name
+            inspector = inspect(db.bind)
+            if dialect_name == "sqlite" and inspector.has_table("chat_fts"):
+                self.search_backend = "fts5"
+            elif dialect_name == "postgresql" and "content_tsv" in {
+                column["name"] for column in inspector.get_columns("chat_message")
+            }:
+                self.search_backend = "tsvector"
+            else:
+                self.search_backend = "python"
+        return self.search_backend
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -122,6 +270,7 @@ class ChatTable:
             result = Chat(**chat.model_dump())
             db.add(result)
             db.commit()
+            CHAT_SEARCH_INDEX.invalidate(user_id)
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
 
@@ -150,7 +299,9 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            self._add_chat_tags(db, result, (form_data.meta or {}).get("tags", []))
             db.commit()
+            CHAT_SEARCH_INDEX.invalidate(user_id)
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
 
@@ -162,12 +313,174 @@ class ChatTable:
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
                 db.commit()
+                CHAT_SEARCH_INDEX.invalidate(chat_item.user_id)
                 db.refresh(chat_item)
 
                 return ChatModel.model_validate(chat_item)
         except Exception:
             return None
 
+    @async_db_method
+    async def update_chat_by_id_async(self, id: str, chat: dict) -> Optional[ChatModel]:
+        try:
+            async with get_async_db() as db:
+                chat_item = await db.get(Chat, id)
+                chat_item.chat = chat
+                chat_item.title = chat["title"] if "title" in chat else "New Chat"
+                chat_item.updated_at = int(time.time())
+                await db.commit()
+                CHAT_SEARCH_INDEX.invalidate(chat_item.user_id)
+                await db.refresh(chat_item)
+
+                return ChatModel.model_validate(chat_item)
+        except Exception:
+            return None
+
+    def get_messages_by_chat_id_and_user_id(
+        self,
+        chat_id: str,
+        user_id: str,
+        skip: int = 0,
+        limit: Optional[int] = None,
+    ) -> Optional[list[dict]]:
+        with get_db() as db:
+            if not db.query(
+                exists().where(Chat.id == chat_id, Chat.user_id == user_id)
+            ).scalar():
+                return None
+
+            query = (
+                db.query(ChatMessage.data)
+                .filter_by(chat_id=chat_id)
+                .order_by(ChatMessage.position)
+            )
+            if skip:
+                query = query.offset(skip)
+            if limit:
+                query = query.limit(limit)
+
+            return [message[0] for message in query.all()]
+
+    def append_message_by_chat_id_and_user_id(
+        self, chat_id: str, user_id: str, message: dict
+    ) -> Optional[dict]:
+        try:
+            with get_db() as db:
+                chat = (
+                    db.query(Chat)
+                    .options(lazyload(Chat.messages))
+                    .filter_by(id=chat_id, user_id=user_id)
+                    .first()
+                )
+                if chat is None:
+                    return None
+
+                history = (chat.envelope or {}).get("history")
+                if isinstance(history, dict) and "messages" in history:
+                    # Not split into chat_message rows yet
+                    history = chat.chat["history"]
+                    chat.chat = {
+                        **chat.chat,
+                        "history": {
+                            **history,
+                            "messages": {**history["messages"], message["id"]: message},
+                            "currentId": message["id"],
+                        },
+                    }
+                    chat.updated_at = int(time.time())
+                    db.commit()
+                    CHAT_SEARCH_INDEX.invalidate(user_id)
+                    return message
+
+                parent_id = message.get("parentId")
+                parent = (
+                    db.get(ChatMessage, (chat_id, parent_id)) if parent_id else None
+                )
+                if parent is not None and message["id"] not in parent.data.get(
+                    "childrenIds", []
+                ):
+                    parent.set_data(
+                        {
+                            **parent.data,
+                            "childrenIds": [
+                                *parent.data.get("childrenIds", []),
+                                message["id"],
+                            ],
+                        }
+                    )
+
+                item = db.get(ChatMessage, (chat_id, message["id"]))
+                if item is None:
+                    position = (
+                        db.query(func.max(ChatMessage.position))
+                        .filter_by(chat_id=chat_id)
+                        .scalar()
+                    )
+                    timestamp = message.get("timestamp")
+                    item = ChatMessage(
+                        chat_id=chat_id,
+                        id=message["id"],
+                        position=0 if position is None else position + 1,
+                        created_at=(
+                            timestamp
+                            if isinstance(timestamp, int)
+                            else int(time.time())
+                        ),
+                    )
+                    db.add(item)
+                item.set_data(message)
+
+                chat.envelope = {
+                    **(chat.envelope or {}),
+                    "history": {**(history or {}), "currentId": message["id"]},
+                }
+                chat.updated_at = int(time.time())
+                db.commit()
+                CHAT_SEARCH_INDEX.invalidate(user_id)
+                return message
+        except Exception:
+            return None
+
+    def patch_message_by_chat_id_and_user_id(
+        self, chat_id: str, user_id: str, message_id: str, message: dict
+    ) -> Optional[dict]:
+        try:
+            with get_db() as db:
+                chat = (
+                    db.query(Chat)
+                    .options(lazyload(Chat.messages))
+                    .filter_by(id=chat_id, user_id=user_id)
+                    .first()
+                )
+                if chat is None:
+                    return None
+
+                item = db.get(ChatMessage, (chat_id, message_id))
+                if item is None:
+                    # Not split into chat_message rows yet
+                    history = chat.chat.get("history", {})
+                    if message_id not in history.get("messages", {}):
+                        return None
+
+                    message = {**history["messages"][message_id], **message}
+                    chat.chat = {
+                        **chat.chat,
+                        "history": {
+                            **history,
+                            "messages": {**history["messages"], message_id: message},
+                        },
+                    }
+                else:
+                    message = {**item.data, **message, "id": message_id}
+                    item.set_data(message)
+
+                chat.updated_at = int(time.time())
+                db.commit()
+                CHAT_SEARCH_INDEX.invalidate(user_id)
+                return message
+        except Exception:
+            return None
+
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
             # Get the existing chat to share
@@ -225,7 +538,10 @@ class ChatTable:
     def delete_shared_chat_by_chat_id(self, chat_id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(user_id=f"shared-{chat_id}").delete()
+                query = db.query(Chat).filter_by(user_id=f"shared-{chat_id}")
+                self._delete_messages(db, query)
+                self._delete_chat_tags(db, query)
+                query.delete()
                 db.commit()
 
                 return True
@@ -263,6 +579,17 @@ class ChatTable:
                 chat = db.get(Chat, id)
                 chat.archived = not chat.archived
                 chat.updated_at = int(time.time())
+
+                # Tag counts only include unarchived chats
+                self._update_tag_counts(
+                    db,
+                    chat.user_id,
+                    [
+                        tag_id
+                        for (tag_id,) in db.query(ChatTag.tag_id).filter_by(chat_id=id)
+                    ],
+                    -1 if chat.archived else 1,
+                )
                 db.commit()
                 db.refresh(chat)
                 return ChatModel.model_validate(chat)
@@ -273,6 +600,7 @@ class ChatTable:
         try:
             with get_db() as db:
                 db.query(Chat).filter_by(user_id=user_id).update({"archived": True})
+                db.query(Tag).filter_by(user_id=user_id).update({"chat_count": 0})
                 db.commit()
                 return True
         except Exception:
@@ -351,6 +679,45 @@ class ChatTable:
                 for chat in all_chats
             ]
 
+    @async_db_method
+    async def get_chat_title_id_list_by_user_id_async(
+        self,
+        user_id: str,
+        include_archived: bool = False,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> list[ChatTitleIdResponse]:
+        async with get_async_db() as db:
+            query = (
+                select(Chat.id, Chat.title, Chat.updated_at, Chat.created_at)
+                .filter_by(user_id=user_id)
+                .filter_by(folder_id=None)
+                .filter(or_(Chat.pinned == False, Chat.pinned == None))
+            )
+
+            if not include_archived:
+                query = query.filter_by(archived=False)
+
+            query = query.order_by(Chat.updated_at.desc())
+
+            if skip:
+                query = query.offset(skip)
+            if limit:
+                query = query.limit(limit)
+
+            all_chats = (await db.execute(query)).all()
+            return [
+                ChatTitleIdResponse.model_validate(
+                    {
+                        "id": chat[0],
+                        "title": chat[1],
+                        "updated_at": chat[2],
+                        "created_at": chat[3],
+                    }
+                )
+                for chat in all_chats
+            ]
+
     def get_chat_list_by_chat_ids(
         self, chat_ids: list[str], skip: int = 0, limit: int = 50
     ) -> list[ChatModel]:
@@ -372,6 +739,15 @@ class ChatTable:
         except Exception:
             return None
 
+    @async_db_method
+    async def get_chat_by_id_async(self, id: str) -> Optional[ChatModel]:
+        try:
+            async with get_async_db() as db:
+                chat = await db.get(Chat, id)
+                return ChatModel.model_validate(chat)
+        except Exception:
+            return None
+
     def get_chat_by_share_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
@@ -392,6 +768,19 @@ class ChatTable:
         except Exception:
             return None
 
+    @async_db_method
+    async def get_chat_by_id_and_user_id_async(
+        self, id: str, user_id: str
+    ) -> Optional[ChatModel]:
+        try:
+            async with get_async_db() as db:
+                chat = await db.scalar(
+                    select(Chat).filter_by(id=id, user_id=user_id).limit(1)
+                )
+                return ChatModel.model_validate(chat)
+        except Exception:
+            return None
+
     def get_chats(self, skip: int = 0, limit: int = 50) -> list[ChatModel]:
         with get_db() as db:
             all_chats = (
@@ -437,7 +826,8 @@ class ChatTable:
         limit: int = 60,
     ) -> list[ChatModel]:
         """
-        Filters chats based on a search query using Python, allowing pagination using skip and limit.
+        Filters chats based on a search query through the full-text search index,
+        best match first, allowing pagination using skip and limit.
         """
         search_text = search_text.lower().strip()
 
@@ -457,7 +847,7 @@ class ChatTable:
             word for word in search_text_words if not word.startswith("tag:")
         ]
 
-        search_text = " ".join(search_text_words)
+        search_terms = get_search_terms(" ".join(search_text_words))
 
         with get_db() as db:
             query = db.query(Chat).filter(Chat.user_id == user_id)
@@ -465,111 +855,62 @@ class ChatTable:
             if not include_archived:
                 query = query.filter(Chat.archived == False)
 
-            query = query.order_by(Chat.updated_at.desc())
-
-            # Check if the database dialect is either 'sqlite' or 'postgresql'
-            dialect_name = db.bind.dialect.name
-            if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
+            # Check if there are any tags to filter, it should have all the tags
+            if "none" in tag_ids:
+                query = query.filter(~exists().where(ChatTag.chat_id == Chat.id))
+            elif tag_ids:
                 query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1 
-                                FROM json_each(Chat.chat, '$.messages') AS message 
-                                WHERE LOWER(message.value->>'content') LIKE '%' || :search_text || '%'
-                            )
-                            """
-                        )
-                    ).params(search_text=search_text)
-                )
-
-                # Check if there are any tags to filter, it should have all the tags
-                if "none" in tag_ids:
-                    query = query.filter(
-                        text(
-                            """
-                            NOT EXISTS (
-                                SELECT 1
-                                FROM json_each(Chat.meta, '$.tags') AS tag
+                    and_(
+                        *[
+                            exists().where(
+                                ChatTag.chat_id == Chat.id, ChatTag.tag_id == tag_id
                             )
-                            """
-                        )
-                    )
-                elif tag_ids:
-                    query = query.filter(
-                        and_(
-                            *[
-                                text(
-                                    f"""
-                                    EXISTS (
-                                        SELECT 1
-                                        FROM json_each(Chat.meta, '$.tags') AS tag
-                                        WHERE tag.value = :tag_id_{tag_idx}
-                                    )
-                                    """
-                                ).params(**{f"tag_id_{tag_idx}": tag_id})
-                                for tag_idx, tag_id in enumerate(tag_ids)
-                            ]
-                        )
+                            for tag_id in tag_ids
+                        ]
                     )
+                )
 
-            elif dialect_name == "postgresql":
-                # PostgreSQL relies on proper JSON query for search
-                query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1
-                                FROM json_array_elements(Chat.chat->'messages') AS message
-                                WHERE LOWER(message->>'content') LIKE '%' || :search_text || '%'
-                            )
-                            """
-                        )
-                    ).params(search_text=search_text)
+            search_backend = self.get_search_backend(db)
+            if not search_terms:
+                query = query.order_by(Chat.updated_at.desc())
+
+            elif search_backend in ["fts5", "tsvector"]:
+                # Every term as a word prefix, in the title or in any message
+                # (not necessarily the same one), scores are summed
+                scores = []
+                for idx, term in enumerate(search_terms):
+                    ranked = self._get_term_scores(search_backend, user_id, term, idx)
+                    query = query.join(ranked, ranked.c.chat_id == Chat.id)
+                    scores.append(ranked.c.score)
+
+                # bm25() ranks are lower for better matches, ts_rank() higher
+                score = sum(scores[1:], scores[0])
+                query = query.order_by(
+                    score if search_backend == "fts5" else score.desc(),
+                    Chat.updated_at.desc(),
                 )
 
-                # Check if there are any tags to filter, it should have all the tags
-                if "none" in tag_ids:
-                    query = query.filter(
-                        text(
-                            """
-                            NOT EXISTS (
-                                SELECT 1
-                                FROM json_array_elements_text(Chat.meta->'tags') AS tag
-                            )
-                            """
-                        )
-                    )
-                elif tag_ids:
-                    query = query.filter(
-                        and_(
-                            *[
-                                text(
-                                    f"""
-                                    EXISTS (
-                                        SELECT 1
-                                        FROM json_array_elements_text(Chat.meta->'tags') AS tag
-                                        WHERE tag = :tag_id_{tag_idx}
-                                    )
-                                    """
-                                ).params(**{f"tag_id_{tag_idx}": tag_id})
-                                for tag_idx, tag_id in enumerate(tag_ids)
-                            ]
-                        )
-                    )
             else:
-                raise NotImplementedError(
-                    f"Unsupported dialect: {db.bind.dialect.name}"
-                )
+                chat_ids = CHAT_SEARCH_INDEX.search(user_id, search_terms)
+                matched_ids = {
+                    chat.id
+                    for chat in query.filter(Chat.id.in_(chat_ids)).with_entities(
+                        Chat.id
+                    )
+                }
+                chat_ids = [id for id in chat_ids if id in matched_ids][
+                    skip : skip + limit
+                ]
+
+                chats = {
+                    chat.id: chat
+                    for chat in db.query(Chat).filter(Chat.id.in_(chat_ids)).all()
+                }
+                return [
+                    ChatModel.model_validate(chats[id])
+                    for id in chat_ids
+                    if id in chats
+                ]
 
             # Perform pagination at the SQL level
             all_chats = query.offset(skip).limit(limit).all()
@@ -579,6 +920,51 @@ class ChatTable:
             # Validate and return chats
             return [ChatModel.model_validate(chat) for chat in all_chats]
 
+    def _get_term_scores(self, search_backend: str, user_id: str, term: str, idx: int):
+        # Best score of a term per chat of the user, titles count double
+        if search_backend == "fts5":
+            # The user id is an indexed token, matching it keeps the query
+            # within the user's rows. Only the content column is ranked
+            user_token = "u" + user_id.encode("utf-8").hex()
+            statement = text(
+                f"""
+                SELECT chat_id, MIN(
+                    CASE WHEN message_id = '' THEN 2 ELSE 1 END * rank
+                ) AS score
+                FROM chat_fts
+                WHERE chat_fts MATCH :term_{idx}_match
+                AND rank MATCH 'bm25(0.0, 0.0, 0.0, 1.0)'
+                GROUP BY chat_id
+                """
+            ).bindparams(
+                **{
+                    f"term_{idx}_match": (
+                        f'user_id : "{user_token}" AND content : "{term}"*'
+                    )
+                }
+            )
+        else:
+            statement = text(
+                f"""
+                SELECT chat_id, MAX(rank) AS score FROM (
+                    SELECT chat_message.chat_id, ts_rank(content_tsv, query) AS rank
+                    FROM chat_message
+                    JOIN chat ON chat.id = chat_message.chat_id,
+                    to_tsquery('simple', :term_{idx}_match) AS query
+                    WHERE chat.user_id = :term_{idx}_user_id AND content_tsv @@ query
+                    UNION ALL
+                    SELECT id AS chat_id, 2 * ts_rank(title_tsv, query) AS rank
+                    FROM chat, to_tsquery('simple', :term_{idx}_match) AS query
+                    WHERE user_id = :term_{idx}_user_id AND title_tsv @@ query
+                ) AS matches
+                GROUP BY chat_id
+                """
+            ).bindparams(
+                **{f"term_{idx}_match": f"{term}:*", f"term_{idx}_user_id": user_id}
+            )
+
+        return statement.columns(chat_id=String, score=Float).subquery(f"term_{idx}")
+
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
     ) -> list[ChatModel]:
@@ -624,9 +1010,16 @@ class ChatTable:
 
     def get_chat_tags_by_id_and_user_id(self, id: str, user_id: str) -> list[TagModel]:
         with get_db() as db:
-            chat = db.get(Chat, id)
-            tags = chat.meta.get("tags", [])
-            return [Tags.get_tag_by_name_and_user_id(tag, user_id) for tag in tags]
+            tags = (
+                db.query(Tag)
+                .join(
+                    ChatTag,
+                    and_(ChatTag.tag_id == Tag.id, ChatTag.user_id == Tag.user_id),
+                )
+                .filter(ChatTag.chat_id == id, Tag.user_id == user_id)
+                .all()
+            )
+            return [TagModel.model_validate(tag) for tag in tags]
 
     def get_chat_list_by_user_id_and_tag_name(
         self, user_id: str, tag_name: str, skip: int = 0, limit: int = 50
@@ -635,28 +1028,11 @@ class ChatTable:
             query = db.query(Chat).filter_by(user_id=user_id)
             tag_id = tag_name.replace(" ", "_").lower()
 
-            print(db.bind.dialect.name)
-            if db.bind.dialect.name == "sqlite":
-                # SQLite JSON1 querying for tags within the meta JSON field
-                query = query.filter(
-                    text(
-                        f"EXISTS (SELECT 1 FROM json_each(Chat.meta, '$.tags') WHERE json_each.value = :tag_id)"
-                    )
-                ).params(tag_id=tag_id)
-            elif db.bind.dialect.name == "postgresql":
-                # PostgreSQL JSON query for tags within the meta JSON field (for `json` type)
-                query = query.filter(
-                    text(
-                        "EXISTS (SELECT 1 FROM json_array_elements_text(Chat.meta->'tags') elem WHERE elem = :tag_id)"
-                    )
-                ).params(tag_id=tag_id)
-            else:
-                raise NotImplementedError(
-                    f"Unsupported dialect: {db.bind.dialect.name}"
-                )
+            query = query.filter(
+                exists().where(ChatTag.chat_id == Chat.id, ChatTag.tag_id == tag_id)
+            )
 
             all_chats = query.all()
-            print("all_chats", all_chats)
             return [ChatModel.model_validate(chat) for chat in all_chats]
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
@@ -675,6 +1051,7 @@ class ChatTable:
                         **chat.meta,
                         "tags": list(set(chat.meta.get("tags", []) + [tag_id])),
                     }
+                self._add_chat_tags(db, chat, [tag_id])
 
                 db.commit()
                 db.refresh(chat)
@@ -683,47 +1060,30 @@ class ChatTable:
             return None
 
     def count_chats_by_tag_name_and_user_id(self, tag_name: str, user_id: str) -> int:
-        with get_db() as db:  # Assuming `get_db()` returns a session object
-            query = db.query(Chat).filter_by(user_id=user_id, archived=False)
-
-            # Normalize the tag_name for consistency
-            tag_id = tag_name.replace(" ", "_").lower()
-
-            if db.bind.dialect.name == "sqlite":
-                # SQLite JSON1 support for querying the tags inside the `meta` JSON field
-                query = query.filter(
-                    text(
-                        f"EXISTS (SELECT 1 FROM json_each(Chat.meta, '$.tags') WHERE json_each.value = :tag_id)"
-                    )
-                ).params(tag_id=tag_id)
-
-            elif db.bind.dialect.name == "postgresql":
-                # PostgreSQL JSONB support for querying the tags inside the `meta` JSON field
-                query = query.filter(
-                    text(
-                        "EXISTS (SELECT 1 FROM json_array_elements_text(Chat.meta->'tags') elem WHERE elem = :tag_id)"
-                    )
-                ).params(tag_id=tag_id)
-
-            else:
-                raise NotImplementedError(
-                    f"Unsupported dialect: {db.bind.dialect.name}"
+        # Number of unarchived chats with the tag
+        tag_id = tag_name.replace(" ", "_").lower()
+        with get_db() as db:
+            tag = db.query(Tag).filter_by(id=tag_id, user_id=user_id).first()
+            if tag is not None and tag.chat_count is not None:
+                return tag.chat_count
+
+            return (
+                db.query(ChatTag)
+                .join(Chat, Chat.id == ChatTag.chat_id)
+                .filter(
+                    ChatTag.user_id == user_id,
+                    ChatTag.tag_id == tag_id,
+                    Chat.archived == False,
                 )
-
-            # Get the count of matching records
-            count = query.count()
-
-            # Debugging output for inspection
-            print(f"Count of chats for tag '{tag_name}':", count)
-
-            return count
+                .count()
+            )
 
     def delete_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
     ) -> bool:
         try:
             with get_db() as db:
-                chat = db.get(Chat, id)
+                chat = db.get(Chat, id, options=[lazyload(Chat.messages)])
                 tags = chat.meta.get("tags", [])
                 tag_id = tag_name.replace(" ", "_").lower()
 
@@ -732,6 +1092,7 @@ class ChatTable:
                     **chat.meta,
                     "tags": list(set(tags)),
                 }
+                self._delete_chat_tags(db, db.query(Chat).filter_by(id=id), [tag_id])
                 db.commit()
                 return True
         except Exception:
@@ -740,11 +1101,12 @@ class ChatTable:
     def delete_all_tags_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
-                chat = db.get(Chat, id)
+                chat = db.get(Chat, id, options=[lazyload(Chat.messages)])
                 chat.meta = {
                     **chat.meta,
                     "tags": [],
                 }
+                self._delete_chat_tags(db, db.query(Chat).filter_by(id=id))
                 db.commit()
 
                 return True
@@ -754,7 +1116,10 @@ class ChatTable:
     def delete_chat_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(id=id).delete()
+                query = db.query(Chat).filter_by(id=id)
+                self._delete_messages(db, query)
+                self._delete_chat_tags(db, query)
+                query.delete()
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -764,7 +1129,10 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                query = db.query(Chat).filter_by(id=id, user_id=user_id)
+                self._delete_messages(db, query)
+                self._delete_chat_tags(db, query)
+                query.delete()
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -776,7 +1144,10 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
-                db.query(Chat).filter_by(user_id=user_id).delete()
+                query = db.query(Chat).filter_by(user_id=user_id)
+                self._delete_messages(db, query)
+                self._delete_chat_tags(db, query)
+                query.delete()
                 db.commit()
 
                 return True
@@ -788,7 +1159,10 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
+                query = db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id)
+                self._delete_messages(db, query)
+                self._delete_chat_tags(db, query)
+                query.delete()
                 db.commit()
 
                 return True
@@ -798,15 +1172,85 @@ class ChatTable:
     def delete_shared_chats_by_user_id(self, user_id: str) -> bool:
         try:
             with get_db() as db:
-                chats_by_user = db.query(Chat).filter_by(user_id=user_id).all()
+                chats_by_user = db.query(Chat.id).filter_by(user_id=user_id).all()
                 shared_chat_ids = [f"shared-{chat.id}" for chat in chats_by_user]
 
-                db.query(Chat).filter(Chat.user_id.in_(shared_chat_ids)).delete()
+                query = db.query(Chat).filter(Chat.user_id.in_(shared_chat_ids))
+                self._delete_messages(db, query)
+                self._delete_chat_tags(db, query)
+                query.delete()
                 db.commit()
 
                 return True
         except Exception:
             return False
 
+    def _add_chat_tags(self, db, chat: Chat, tag_ids: list[str]):
+        existing = {
+            tag_id for (tag_id,) in db.query(ChatTag.tag_id).filter_by(chat_id=chat.id)
+        }
+        tag_ids = [
+            tag_id
+            for tag_id in dict.fromkeys(
+                tag_id.replace(" ", "_").lower() for tag_id in tag_ids
+            )
+            if tag_id != "none" and tag_id not in existing
+        ]
+        for tag_id in tag_ids:
+            db.add(
+                ChatTag(
+                    chat_id=chat.id,
+                    tag_id=tag_id,
+                    user_id=chat.user_id,
+                    created_at=int(time.time()),
+                )
+            )
+
+        if not chat.archived:
+            self._update_tag_counts(db, chat.user_id, tag_ids, 1)
+
+    def _delete_chat_tags(self, db, query, tag_ids: Optional[list[str]] = None):
+        chat_tags = db.query(ChatTag).filter(
+            ChatTag.chat_id.in_(query.with_entities(Chat.id).scalar_subquery())
+        )
+        if tag_ids is not None:
+            chat_tags = chat_tags.filter(ChatTag.tag_id.in_(tag_ids))
+
+        for user_id, tag_id, count in (
+            chat_tags.join(Chat, Chat.id == ChatTag.chat_id)
+            .filter(Chat.archived == False)
+            .group_by(ChatTag.user_id, ChatTag.tag_id)
+            .with_entities(ChatTag.user_id, ChatTag.tag_id, func.count())
+        ):
+            self._update_tag_counts(db, user_id, [tag_id], -count)
+
+        chat_tags.delete(synchronize_session=False)
+
+    def _update_tag_counts(self, db, user_id: str, tag_ids: list[str], delta: int):
+        for tag_id in tag_ids:
+            updated = (
+                db.query(Tag)
+                .filter_by(id=tag_id, user_id=user_id)
+                .update(
+                    {"chat_count": func.coalesce(Tag.chat_count, 0) + delta},
+                    synchronize_session=False,
+                )
+            )
+            if not updated and delta > 0:
+                # The tag was removed when its last chat was archived
+                db.add(
+                    Tag(
+                        id=tag_id,
+                        name=" ".join(word.capitalize() for word in tag_id.split("_")),
+                        user_id=user_id,
+                        chat_count=delta,
+                    )
+                )
+
+    def _delete_messages(self, db, query):
+        db.query(ChatMessage).filter(
+            ChatMessage.chat_id.in_(query.with_entities(Chat.id).scalar_subquery())
+        ).delete(synchronize_session=False)
+
 
 Chats = ChatTable()
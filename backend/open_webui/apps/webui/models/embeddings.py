@@ -0,0 +1,102 @@
+import logging
+import time
+from array import array
+
+from open_webui.apps.webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from sqlalchemy import BigInteger, Column, LargeBinary, Text
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# ChunkEmbedding DB Schema
+####################
+
+
+class ChunkEmbedding(Base):
+    __tablename__ = "chunk_embedding"
+
+    # sha256 of engine, model and the embedded chunk text
+    id = Column(Text, primary_key=True)
+    model = Column(Text)
+
+    # float32 little-endian packed vector
+    vector = Column(LargeBinary)
+
+    created_at = Column(BigInteger)
+
+
+def pack_vector(vector: list[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(data: bytes) -> list[float]:
+    vector = array("f")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class ChunkEmbeddingsTable:
+    # Keeps IN (...) lists below SQLite's bound parameter limit
+    BATCH_SIZE = 500
+
+    def get_vectors_by_ids(self, ids: list[str]) -> dict[str, list[float]]:
+        vectors = {}
+        try:
+            with get_db() as db:
+                for i in range(0, len(ids), self.BATCH_SIZE):
+                    for id, vector in (
+                        db.query(ChunkEmbedding.id, ChunkEmbedding.vector)
+                        .filter(ChunkEmbedding.id.in_(ids[i : i + self.BATCH_SIZE]))
+                        .all()
+                    ):
+                        vectors[id] = unpack_vector(vector)
+        except Exception as e:
+            log.exception(e)
+        return vectors
+
+    def insert_new_vectors(self, model: str, vectors: dict[str, list[float]]) -> bool:
+        try:
+            with get_db() as db:
+                ids = list(vectors.keys())
+                existing_ids = set()
+                for i in range(0, len(ids), self.BATCH_SIZE):
+                    existing_ids.update(
+                        id
+                        for (id,) in db.query(ChunkEmbedding.id)
+                        .filter(ChunkEmbedding.id.in_(ids[i : i + self.BATCH_SIZE]))
+                        .all()
+                    )
+
+                created_at = int(time.time())
+                db.add_all(
+                    [
+                        ChunkEmbedding(
+                            id=id,
+                            model=model,
+                            vector=pack_vector(vector),
+                            created_at=created_at,
+                        )
+                        for id, vector in vectors.items()
+                        if id not in existing_ids
+                    ]
+                )
+                db.commit()
+                return True
+        except Exception as e:
+            # Another worker may have stored the same chunk concurrently
+            log.warning(f"Failed to store chunk embeddings: {e}")
+            return False
+
+    def delete_all_chunk_embeddings(self) -> bool:
+        try:
+            with get_db() as db:
+                db.query(ChunkEmbedding).delete()
+                db.commit()
+                return True
+        except Exception:
+            return False
+
+
+ChunkEmbeddings = ChunkEmbeddingsTable()
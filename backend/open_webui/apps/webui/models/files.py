@@ -2,10 +2,16 @@ import logging
 import time
 from typing import Optional
 
-from open_webui.apps.webui.internal.db import Base, JSONField, get_db
+from open_webui.apps.webui.internal.db import (
+    Base,
+    JSONField,
+    async_db_method,
+    get_async_db,
+    get_db,
+)
 from open_webui.env import SRC_LOG_LEVELS
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text, JSON
+from sqlalchemy import BigInteger, Column, String, Text, JSON, select
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -125,6 +131,15 @@ class FilesTable:
             except Exception:
                 return None
 
+    @async_db_method
+    async def get_file_by_id_async(self, id: str) -> Optional[FileModel]:
+        async with get_async_db() as db:
+            try:
+                file = await db.get(File, id)
+                return FileModel.model_validate(file)
+            except Exception:
+                return None
+
     def get_file_metadata_by_id(self, id: str) -> Optional[FileMetadataResponse]:
         with get_db() as db:
             try:
@@ -152,6 +167,18 @@ class FilesTable:
                 .all()
             ]
 
+    @async_db_method
+    async def get_files_by_ids_async(self, ids: list[str]) -> list[FileModel]:
+        async with get_async_db() as db:
+            return [
+                FileModel.model_validate(file)
+                for file in await db.scalars(
+                    select(File)
+                    .filter(File.id.in_(ids))
+                    .order_by(File.updated_at.desc())
+                )
+            ]
+
     def get_file_metadatas_by_ids(self, ids: list[str]) -> list[FileMetadataResponse]:
         with get_db() as db:
             return [
@@ -167,6 +194,25 @@ class FilesTable:
                 .all()
             ]
 
+    @async_db_method
+    async def get_file_metadatas_by_ids_async(
+        self, ids: list[str]
+    ) -> list[FileMetadataResponse]:
+        async with get_async_db() as db:
+            return [
+                FileMetadataResponse(
+                    id=file.id,
+                    meta=file.meta,
+                    created_at=file.created_at,
+                    updated_at=file.updated_at,
+                )
+                for file in await db.scalars(
+                    select(File)
+                    .filter(File.id.in_(ids))
+                    .order_by(File.updated_at.desc())
+                )
+            ]
+
     def get_files_by_user_id(self, user_id: str) -> list[FileModel]:
         with get_db() as db:
             return [
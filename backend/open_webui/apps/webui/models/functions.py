@@ -2,11 +2,18 @@ import logging
 import time
 from typing import Optional
 
-from open_webui.apps.webui.internal.db import Base, JSONField, get_db
+from open_webui.apps.webui.internal.db import (
+    Base,
+    JSONField,
+    async_db_method,
+    get_async_db,
+    get_db,
+)
 from open_webui.apps.webui.models.users import Users
 from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.filter_chain import FILTER_CHAINS
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text
+from sqlalchemy import BigInteger, Boolean, Column, String, Text, func, select
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -100,6 +107,7 @@ class FunctionsTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                FILTER_CHAINS.invalidate()
                 if result:
                     return FunctionModel.model_validate(result)
                 else:
@@ -116,6 +124,26 @@ class FunctionsTable:
         except Exception:
             return None
 
+    @async_db_method
+    async def get_function_by_id_async(self, id: str) -> Optional[FunctionModel]:
+        try:
+            async with get_async_db() as db:
+                function = await db.get(Function, id)
+                return FunctionModel.model_validate(function)
+        except Exception:
+            return None
+
+    def get_functions_version(self) -> tuple:
+        # Changes whenever a function is added, updated or deleted
+        with get_db() as db:
+            return tuple(
+                db.query(
+                    func.count(Function.id),
+                    func.max(Function.updated_at),
+                    func.sum(Function.updated_at),
+                ).one()
+            )
+
     def get_functions(self, active_only=False) -> list[FunctionModel]:
         with get_db() as db:
             if active_only:
@@ -146,6 +174,20 @@ class FunctionsTable:
                     for function in db.query(Function).filter_by(type=type).all()
                 ]
 
+    @async_db_method
+    async def get_functions_by_type_async(
+        self, type: str, active_only=False
+    ) -> list[FunctionModel]:
+        async with get_async_db() as db:
+            query = select(Function).filter_by(type=type)
+            if active_only:
+                query = query.filter_by(is_active=True)
+
+            return [
+                FunctionModel.model_validate(function)
+                for function in await db.scalars(query)
+            ]
+
     def get_global_filter_functions(self) -> list[FunctionModel]:
         with get_db() as db:
             return [
@@ -155,6 +197,18 @@ class FunctionsTable:
                 .all()
             ]
 
+    @async_db_method
+    async def get_global_filter_functions_async(self) -> list[FunctionModel]:
+        async with get_async_db() as db:
+            return [
+                FunctionModel.model_validate(function)
+                for function in await db.scalars(
+                    select(Function).filter_by(
+                        type="filter", is_active=True, is_global=True
+                    )
+                )
+            ]
+
     def get_global_action_functions(self) -> list[FunctionModel]:
         with get_db() as db:
             return [
@@ -164,6 +218,18 @@ class FunctionsTable:
                 .all()
             ]
 
+    @async_db_method
+    async def get_global_action_functions_async(self) -> list[FunctionModel]:
+        async with get_async_db() as db:
+            return [
+                FunctionModel.model_validate(function)
+                for function in await db.scalars(
+                    select(Function).filter_by(
+                        type="action", is_active=True, is_global=True
+                    )
+                )
+            ]
+
     def get_function_valves_by_id(self, id: str) -> Optional[dict]:
         with get_db() as db:
             try:
@@ -173,6 +239,16 @@ class FunctionsTable:
                 print(f"An error occurred: {e}")
                 return None
 
+    @async_db_method
+    async def get_function_valves_by_id_async(self, id: str) -> Optional[dict]:
+        async with get_async_db() as db:
+            try:
+                function = await db.get(Function, id)
+                return function.valves if function.valves else {}
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                return None
+
     def update_function_valves_by_id(
         self, id: str, valves: dict
     ) -> Optional[FunctionValves]:
@@ -182,6 +258,7 @@ class FunctionsTable:
                 function.valves = valves
                 function.updated_at = int(time.time())
                 db.commit()
+                FILTER_CHAINS.invalidate()
                 db.refresh(function)
                 return self.get_function_by_id(id)
             except Exception:
@@ -238,6 +315,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                FILTER_CHAINS.invalidate()
                 return self.get_function_by_id(id)
             except Exception:
                 return None
@@ -252,6 +330,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                FILTER_CHAINS.invalidate()
                 return True
             except Exception:
                 return None
@@ -261,6 +340,7 @@ class FunctionsTable:
             try:
                 db.query(Function).filter_by(id=id).delete()
                 db.commit()
+                FILTER_CHAINS.invalidate()
 
                 return True
             except Exception:
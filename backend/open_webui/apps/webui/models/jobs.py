@@ -0,0 +1,241 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from open_webui.apps.webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, Index, Integer, Text, and_, or_
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# IngestionJob DB Schema
+####################
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_job"
+
+    id = Column(Text, primary_key=True)
+    user_id = Column(Text)
+    file_id = Column(Text)
+    collection_name = Column(Text, nullable=True)
+
+    # pending, processing, completed or failed
+    status = Column(Text)
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+
+    # Epoch after which a pending job may be (re)tried
+    run_at = Column(BigInteger)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (
+        Index("ingestion_job_status_run_at_idx", "status", "run_at"),
+        Index("ingestion_job_file_id_idx", "file_id"),
+    )
+
+
+class IngestionJobModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_id: str
+    file_id: str
+    collection_name: Optional[str] = None
+
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+
+    run_at: int
+    created_at: int
+    updated_at: int
+
+
+class IngestionJobsTable:
+    def insert_new_job(
+        self, user_id: str, file_id: str, collection_name: Optional[str] = None
+    ) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            now = int(time.time())
+            job = IngestionJobModel(
+                **{
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "file_id": file_id,
+                    "collection_name": collection_name,
+                    "status": "pending",
+                    "attempts": 0,
+                    "run_at": now,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+
+            try:
+                result = IngestionJob(**job.model_dump())
+                db.add(result)
+                db.commit()
+                db.refresh(result)
+                return IngestionJobModel.model_validate(result)
+            except Exception as e:
+                log.exception(e)
+                return None
+
+    def get_job_by_id(self, id: str) -> Optional[IngestionJobModel]:
+        try:
+            with get_db() as db:
+                job = db.query(IngestionJob).filter_by(id=id).first()
+                return IngestionJobModel.model_validate(job) if job else None
+        except Exception:
+            return None
+
+    def get_latest_job_by_file_id(self, file_id: str) -> Optional[IngestionJobModel]:
+        try:
+            with get_db() as db:
+                job = (
+                    db.query(IngestionJob)
+                    .filter_by(file_id=file_id)
+                    .order_by(IngestionJob.created_at.desc())
+                    .first()
+                )
+                return IngestionJobModel.model_validate(job) if job else None
+        except Exception:
+            return None
+
+    def has_unfinished_jobs_by_file_id(self, file_id: str) -> bool:
+        with get_db() as db:
+            return (
+                db.query(IngestionJob)
+                .filter(
+                    IngestionJob.file_id == file_id,
+                    IngestionJob.status.in_(["pending", "processing"]),
+                )
+                .first()
+                is not None
+            )
+
+    def claim_next_job(self) -> Optional[IngestionJobModel]:
+        # Claims are a conditional UPDATE so that workers in other processes
+        # never pick up the same job.
+        with get_db() as db:
+            now = int(time.time())
+            candidates = (
+                db.query(IngestionJob)
+                .filter(IngestionJob.status == "pending", IngestionJob.run_at <= now)
+                .order_by(IngestionJob.created_at)
+                .limit(10)
+                .all()
+            )
+
+            for job in candidates:
+                # Jobs for the same file run in the order they were queued, e.g.
+                # a knowledge base add waits for the file's own processing.
+                blocked = (
+                    db.query(IngestionJob.id)
+                    .filter(
+                        IngestionJob.file_id == job.file_id,
+                        IngestionJob.id != job.id,
+                        or_(
+                            IngestionJob.status == "processing",
+                            and_(
+                                IngestionJob.status == "pending",
+                                IngestionJob.created_at < job.created_at,
+                            ),
+                        ),
+                    )
+                    .first()
+                )
+                if blocked:
+                    continue
+
+                claimed = (
+                    db.query(IngestionJob)
+                    .filter_by(id=job.id, status="pending")
+                    .update(
+                        {
+                            "status": "processing",
+                            "attempts": IngestionJob.attempts + 1,
+                            "updated_at": now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+
+                if claimed:
+                    db.refresh(job)
+                    return IngestionJobModel.model_validate(job)
+            return None
+
+    def update_job_status_by_id(
+        self,
+        id: str,
+        status: str,
+        error: Optional[str] = None,
+        run_at: Optional[int] = None,
+    ) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            job = db.query(IngestionJob).filter_by(id=id).first()
+            if not job:
+                return None
+
+            job.status = status
+            job.error = error
+            if run_at is not None:
+                job.run_at = run_at
+            job.updated_at = int(time.time())
+
+            db.commit()
+            db.refresh(job)
+            return IngestionJobModel.model_validate(job)
+
+    def touch_job_by_id(self, id: str) -> bool:
+        # Heartbeat of a running job, keeps it from being requeued as stale
+        with get_db() as db:
+            touched = (
+                db.query(IngestionJob)
+                .filter_by(id=id, status="processing")
+                .update({"updated_at": int(time.time())}, synchronize_session=False)
+            )
+            db.commit()
+            return touched > 0
+
+    def requeue_stale_jobs(self, timeout: int, max_attempts: int) -> int:
+        # Jobs left in processing by a worker that died are retried, unless
+        # they already used their attempts (the job itself may kill workers)
+        with get_db() as db:
+            now = int(time.time())
+            stale = and_(
+                IngestionJob.status == "processing",
+                IngestionJob.updated_at < now - timeout,
+            )
+            db.query(IngestionJob).filter(
+                stale, IngestionJob.attempts >= max_attempts
+            ).update(
+                {
+                    "status": "failed",
+                    "error": "The worker processing the job stopped",
+                    "updated_at": now,
+                },
+                synchronize_session=False,
+            )
+            count = (
+                db.query(IngestionJob)
+                .filter(stale)
+                .update(
+                    {"status": "pending", "run_at": now, "updated_at": now},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            return count
+
+
+IngestionJobs = IngestionJobsTable()
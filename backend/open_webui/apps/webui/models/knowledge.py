@@ -4,7 +4,12 @@ import time
 from typing import Optional
 import uuid
 
-from open_webui.apps.webui.internal.db import Base, get_db
+from open_webui.apps.webui.internal.db import (
+    Base,
+    async_db_method,
+    get_async_db,
+    get_db,
+)
 from open_webui.env import SRC_LOG_LEVELS
 
 from open_webui.apps.webui.models.files import FileMetadataResponse
@@ -12,9 +17,9 @@ from open_webui.apps.webui.models.users import Users, UserResponse
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text, JSON
+from sqlalchemy import BigInteger, Column, String, Text, JSON, select
 
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import ACCESS_CONTROL_INDEX, has_access
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -147,11 +152,14 @@ class KnowledgeTable:
         self, user_id: str, permission: str = "write"
     ) -> list[KnowledgeUserModel]:
         knowledge_bases = self.get_knowledge_bases()
+        user_group_ids = ACCESS_CONTROL_INDEX.get_user_group_ids(user_id)
         return [
             knowledge_base
             for knowledge_base in knowledge_bases
             if knowledge_base.user_id == user_id
-            or has_access(user_id, permission, knowledge_base.access_control)
+            or has_access(
+                user_id, permission, knowledge_base.access_control, user_group_ids
+            )
         ]
 
     def get_knowledge_by_id(self, id: str) -> Optional[KnowledgeModel]:
@@ -162,6 +170,15 @@ class KnowledgeTable:
         except Exception:
             return None
 
+    @async_db_method
+    async def get_knowledge_by_id_async(self, id: str) -> Optional[KnowledgeModel]:
+        try:
+            async with get_async_db() as db:
+                knowledge = await db.scalar(select(Knowledge).filter_by(id=id).limit(1))
+                return KnowledgeModel.model_validate(knowledge) if knowledge else None
+        except Exception:
+            return None
+
     def update_knowledge_by_id(
         self, id: str, form_data: KnowledgeForm, overwrite: bool = False
     ) -> Optional[KnowledgeModel]:
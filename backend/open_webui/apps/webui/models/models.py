@@ -2,7 +2,13 @@ import logging
 import time
 from typing import Optional
 
-from open_webui.apps.webui.internal.db import Base, JSONField, get_db
+from open_webui.apps.webui.internal.db import (
+    Base,
+    JSONField,
+    async_db_method,
+    get_async_db,
+    get_db,
+)
 from open_webui.env import SRC_LOG_LEVELS
 
 from open_webui.apps.webui.models.users import Users, UserResponse
@@ -12,10 +18,10 @@ from pydantic import BaseModel, ConfigDict
 
 from sqlalchemy import or_, and_, func
 from sqlalchemy.dialects import postgresql, sqlite
-from sqlalchemy import BigInteger, Column, Text, JSON, Boolean
+from sqlalchemy import BigInteger, Column, Text, JSON, Boolean, select
 
 
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import ACCESS_CONTROL_INDEX
 
 
 log = logging.getLogger(__name__)
@@ -160,6 +166,7 @@ class ModelsTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                ACCESS_CONTROL_INDEX.invalidate_models()
 
                 if result:
                     return ModelModel.model_validate(result)
@@ -173,6 +180,14 @@ class ModelsTable:
         with get_db() as db:
             return [ModelModel.model_validate(model) for model in db.query(Model).all()]
 
+    @async_db_method
+    async def get_all_models_async(self) -> list[ModelModel]:
+        async with get_async_db() as db:
+            return [
+                ModelModel.model_validate(model)
+                for model in await db.scalars(select(Model))
+            ]
+
     def get_models(self) -> list[ModelUserResponse]:
         with get_db() as db:
             models = []
@@ -198,13 +213,8 @@ class ModelsTable:
     def get_models_by_user_id(
         self, user_id: str, permission: str = "write"
     ) -> list[ModelUserResponse]:
-        models = self.get_models()
-        return [
-            model
-            for model in models
-            if model.user_id == user_id
-            or has_access(user_id, permission, model.access_control)
-        ]
+        model_ids = ACCESS_CONTROL_INDEX.get_accessible_model_ids(user_id, permission)
+        return [model for model in self.get_models() if model.id in model_ids]
 
     def get_model_by_id(self, id: str) -> Optional[ModelModel]:
         try:
@@ -214,6 +224,15 @@ class ModelsTable:
         except Exception:
             return None
 
+    @async_db_method
+    async def get_model_by_id_async(self, id: str) -> Optional[ModelModel]:
+        try:
+            async with get_async_db() as db:
+                model = await db.get(Model, id)
+                return ModelModel.model_validate(model)
+        except Exception:
+            return None
+
     def toggle_model_by_id(self, id: str) -> Optional[ModelModel]:
         with get_db() as db:
             try:
@@ -226,6 +245,7 @@ class ModelsTable:
                     }
                 )
                 db.commit()
+                ACCESS_CONTROL_INDEX.invalidate_models()
 
                 return self.get_model_by_id(id)
             except Exception:
@@ -241,6 +261,7 @@ class ModelsTable:
                     .update(model.model_dump(exclude={"id"}))
                 )
                 db.commit()
+                ACCESS_CONTROL_INDEX.invalidate_models()
 
                 model = db.get(Model, id)
                 db.refresh(model)
@@ -255,6 +276,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).filter_by(id=id).delete()
                 db.commit()
+                ACCESS_CONTROL_INDEX.invalidate_models()
 
                 return True
         except Exception:
@@ -265,6 +287,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).delete()
                 db.commit()
+                ACCESS_CONTROL_INDEX.invalidate_models()
 
                 return True
         except Exception:
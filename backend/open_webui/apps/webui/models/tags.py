@@ -24,6 +24,9 @@ class Tag(Base):
     user_id = Column(String)
     meta = Column(JSON, nullable=True)
 
+    # Number of unarchived chats with the tag, kept up to date by the chat table
+    chat_count = Column(BigInteger, default=0)
+
     # Unique constraint ensuring (id, user_id) is unique, not just the `id` column
     __table_args__ = (PrimaryKeyConstraint("id", "user_id", name="pk_id_user_id"),)
 
@@ -138,6 +138,10 @@ class ToolsTable:
         except Exception:
             return None
 
+    def get_all_tools(self) -> list[ToolModel]:
+        with get_db() as db:
+            return [ToolModel.model_validate(tool) for tool in db.query(Tool).all()]
+
     def get_tools(self) -> list[ToolUserResponse]:
         with get_db() as db:
             tools = []
@@ -1,10 +1,27 @@
+import logging
+import threading
 import time
 from typing import Optional
 
-from open_webui.apps.webui.internal.db import Base, JSONField, get_db
+from open_webui.apps.webui.internal.db import (
+    Base,
+    JSONField,
+    async_db_method,
+    get_async_db,
+    get_db,
+)
 from open_webui.apps.webui.models.chats import Chats
+from open_webui.apps.webui.models.groups import Groups
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    USER_CACHE_TTL,
+    USER_LAST_ACTIVE_FLUSH_INTERVAL,
+)
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text
+from sqlalchemy import BigInteger, Column, String, Text, bindparam, select, update
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
 ####################
 # User DB Schema
@@ -83,6 +100,94 @@ class UserUpdateForm(BaseModel):
 
 
 class UsersTable:
+    def __init__(self, cache_ttl: int = 10, last_active_flush_interval: int = 15):
+        # Users resolved by the auth dependencies: id -> (user, cached at)
+        self.cache_ttl = cache_ttl
+        self.cache: dict[str, tuple[UserModel, float]] = {}
+        self.api_keys: dict[str, str] = {}
+
+        # last_active_at updates waiting to be written: id -> timestamp
+        self.last_active_flush_interval = last_active_flush_interval
+        self.last_active: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def invalidate_cached_user(self, id: str):
+        self.cache.pop(id, None)
+        for api_key, user_id in list(self.api_keys.items()):
+            if user_id == id:
+                self.api_keys.pop(api_key, None)
+
+    def get_cached_user_by_id(self, id: str) -> Optional[UserModel]:
+        entry = self.cache.get(id)
+        if entry is None or time.time() - entry[1] >= self.cache_ttl:
+            user = self.get_user_by_id(id)
+            if user is None:
+                self.cache.pop(id, None)
+                return None
+
+            entry = (user, time.time())
+            if self.cache_ttl > 0:
+                self.cache[id] = entry
+
+        user = entry[0].model_copy()
+        last_active_at = self.last_active.get(id)
+        if last_active_at:
+            user.last_active_at = last_active_at
+        return user
+
+    def get_cached_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
+        id = self.api_keys.get(api_key)
+        if id is not None:
+            user = self.get_cached_user_by_id(id)
+            if user is not None and user.api_key == api_key:
+                return user
+            self.api_keys.pop(api_key, None)
+
+        user = self.get_user_by_api_key(api_key)
+        if user is not None and self.cache_ttl > 0:
+            self.cache[user.id] = (user, time.time())
+            self.api_keys[api_key] = user.id
+        return user
+
+    def touch_user_last_active_by_id(self, id: str):
+        if self.last_active_flush_interval <= 0:
+            with get_db() as db:
+                db.query(User).filter_by(id=id).update(
+                    {"last_active_at": int(time.time())}
+                )
+                db.commit()
+            return
+
+        with self.lock:
+            self.last_active[id] = int(time.time())
+
+    def flush_user_last_active(self):
+        with self.lock:
+            pending, self.last_active = self.last_active, {}
+
+        if not pending:
+            return
+
+        try:
+            with get_db() as db:
+                # Core executemany, users deleted in the meantime are skipped
+                db.execute(
+                    update(User.__table__)
+                    .where(User.__table__.c.id == bindparam("_id"))
+                    .values(last_active_at=bindparam("_last_active_at")),
+                    [
+                        {"_id": id, "_last_active_at": last_active_at}
+                        for id, last_active_at in pending.items()
+                    ],
+                )
+                db.commit()
+        except Exception as e:
+            log.exception(f"Error writing last_active_at for {len(pending)} users: {e}")
+            # Retry with the next flush unless newer activity came in meanwhile
+            with self.lock:
+                for id, last_active_at in pending.items():
+                    self.last_active.setdefault(id, last_active_at)
+
     def insert_new_user(
         self,
         id: str,
@@ -123,6 +228,15 @@ class UsersTable:
         except Exception:
             return None
 
+    @async_db_method
+    async def get_user_by_id_async(self, id: str) -> Optional[UserModel]:
+        try:
+            async with get_async_db() as db:
+                user = await db.get(User, id)
+                return UserModel.model_validate(user)
+        except Exception:
+            return None
+
     def get_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
         try:
             with get_db() as db:
@@ -131,6 +245,15 @@ class UsersTable:
         except Exception:
             return None
 
+    @async_db_method
+    async def get_user_by_api_key_async(self, api_key: str) -> Optional[UserModel]:
+        try:
+            async with get_async_db() as db:
+                user = await db.scalar(select(User).filter_by(api_key=api_key).limit(1))
+                return UserModel.model_validate(user)
+        except Exception:
+            return None
+
     def get_user_by_email(self, email: str) -> Optional[UserModel]:
         try:
             with get_db() as db:
@@ -173,6 +296,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                self.invalidate_cached_user(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -187,6 +311,7 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                self.invalidate_cached_user(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -213,6 +338,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"oauth_sub": oauth_sub})
                 db.commit()
+                self.invalidate_cached_user(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -224,6 +350,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                self.invalidate_cached_user(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -237,10 +364,16 @@ class UsersTable:
             result = Chats.delete_chats_by_user_id(id)
 
             if result:
+                # Remove User from Groups
+                Groups.remove_user_from_all_groups(id)
+
                 with get_db() as db:
                     # Delete User
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
+                self.invalidate_cached_user(id)
+                with self.lock:
+                    self.last_active.pop(id, None)
 
                 return True
             else:
@@ -253,6 +386,7 @@ class UsersTable:
             with get_db() as db:
                 result = db.query(User).filter_by(id=id).update({"api_key": api_key})
                 db.commit()
+                self.invalidate_cached_user(id)
                 return True if result == 1 else False
         except Exception:
             return False
@@ -266,4 +400,7 @@ class UsersTable:
             return None
 
 
-Users = UsersTable()
+Users = UsersTable(
+    cache_ttl=USER_CACHE_TTL,
+    last_active_flush_interval=USER_LAST_ACTIVE_FLUSH_INTERVAL,
+)
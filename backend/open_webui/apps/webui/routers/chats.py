@@ -2,9 +2,11 @@ import json
 import logging
 from typing import Optional
 
+from open_webui.apps.webui.internal.db import unit_of_work
 from open_webui.apps.webui.models.chats import (
     ChatForm,
     ChatImportForm,
+    ChatMessageForm,
     ChatResponse,
     Chats,
     ChatTitleIdResponse,
@@ -41,9 +43,11 @@ async def get_session_user_chat_list(
         limit = 60
         skip = (page - 1) * limit
 
-        return Chats.get_chat_title_id_list_by_user_id(user.id, skip=skip, limit=limit)
+        return await Chats.get_chat_title_id_list_by_user_id_async(
+            user.id, skip=skip, limit=limit
+        )
     else:
-        return Chats.get_chat_title_id_list_by_user_id(user.id)
+        return await Chats.get_chat_title_id_list_by_user_id_async(user.id)
 
 
 ############################
@@ -295,7 +299,7 @@ async def get_shared_chat_by_id(share_id: str, user=Depends(get_verified_user)):
     if user.role == "user" or (user.role == "admin" and not ENABLE_ADMIN_CHAT_ACCESS):
         chat = Chats.get_chat_by_share_id(share_id)
     elif user.role == "admin" and ENABLE_ADMIN_CHAT_ACCESS:
-        chat = Chats.get_chat_by_id(share_id)
+        chat = await Chats.get_chat_by_id_async(share_id)
 
     if chat:
         return ChatResponse(**chat.model_dump())
@@ -340,7 +344,7 @@ async def get_user_chat_list_by_tag_name(
 
 @router.get("/{id}", response_model=Optional[ChatResponse])
 async def get_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
 
     if chat:
         return ChatResponse(**chat.model_dump())
@@ -360,10 +364,10 @@ async def get_chat_by_id(id: str, user=Depends(get_verified_user)):
 async def update_chat_by_id(
     id: str, form_data: ChatForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         updated_chat = {**chat.chat, **form_data.chat}
-        chat = Chats.update_chat_by_id(id, updated_chat)
+        chat = await Chats.update_chat_by_id_async(id, updated_chat)
         return ChatResponse(**chat.model_dump())
     else:
         raise HTTPException(
@@ -372,6 +376,78 @@ async def update_chat_by_id(
         )
 
 
+############################
+# GetChatMessagesById
+############################
+
+
+@router.get("/{id}/messages", response_model=list[dict])
+async def get_chat_messages_by_id(
+    id: str,
+    user=Depends(get_verified_user),
+    skip: int = 0,
+    limit: Optional[int] = None,
+):
+    messages = Chats.get_messages_by_chat_id_and_user_id(id, user.id, skip, limit)
+    if messages is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail=ERROR_MESSAGES.NOT_FOUND
+        )
+
+    return messages
+
+
+############################
+# AddChatMessageById
+############################
+
+
+@router.post("/{id}/messages", response_model=Optional[dict])
+async def add_chat_message_by_id(
+    id: str, form_data: ChatMessageForm, user=Depends(get_verified_user)
+):
+    if "id" not in form_data.message:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.DEFAULT("Message id is required"),
+        )
+
+    message = Chats.append_message_by_chat_id_and_user_id(
+        id, user.id, form_data.message
+    )
+    if message is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
+        )
+
+    return message
+
+
+############################
+# UpdateChatMessageById
+############################
+
+
+@router.post("/{id}/messages/{message_id}", response_model=Optional[dict])
+async def update_chat_message_by_id(
+    id: str,
+    message_id: str,
+    form_data: ChatMessageForm,
+    user=Depends(get_verified_user),
+):
+    message = Chats.patch_message_by_chat_id_and_user_id(
+        id, user.id, message_id, form_data.message
+    )
+    if message is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+
+    return message
+
+
 ############################
 # DeleteChatById
 ############################
@@ -380,12 +456,13 @@ async def update_chat_by_id(
 @router.delete("/{id}", response_model=bool)
 async def delete_chat_by_id(request: Request, id: str, user=Depends(get_verified_user)):
     if user.role == "admin":
-        chat = Chats.get_chat_by_id(id)
-        for tag in chat.meta.get("tags", []):
-            if Chats.count_chats_by_tag_name_and_user_id(tag, user.id) == 1:
-                Tags.delete_tag_by_name_and_user_id(tag, user.id)
+        chat = await Chats.get_chat_by_id_async(id)
+        with unit_of_work():
+            for tag in chat.meta.get("tags", []):
+                if Chats.count_chats_by_tag_name_and_user_id(tag, user.id) == 1:
+                    Tags.delete_tag_by_name_and_user_id(tag, user.id)
 
-        result = Chats.delete_chat_by_id(id)
+            result = Chats.delete_chat_by_id(id)
 
         return result
     else:
@@ -397,12 +474,13 @@ async def delete_chat_by_id(request: Request, id: str, user=Depends(get_verified
                 detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
             )
 
-        chat = Chats.get_chat_by_id(id)
-        for tag in chat.meta.get("tags", []):
-            if Chats.count_chats_by_tag_name_and_user_id(tag, user.id) == 1:
-                Tags.delete_tag_by_name_and_user_id(tag, user.id)
+        chat = await Chats.get_chat_by_id_async(id)
+        with unit_of_work():
+            for tag in chat.meta.get("tags", []):
+                if Chats.count_chats_by_tag_name_and_user_id(tag, user.id) == 1:
+                    Tags.delete_tag_by_name_and_user_id(tag, user.id)
 
-        result = Chats.delete_chat_by_id_and_user_id(id, user.id)
+            result = Chats.delete_chat_by_id_and_user_id(id, user.id)
         return result
 
 
@@ -413,7 +491,7 @@ async def delete_chat_by_id(request: Request, id: str, user=Depends(get_verified
 
 @router.get("/{id}/pinned", response_model=Optional[bool])
 async def get_pinned_status_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         return chat.pinned
     else:
@@ -429,7 +507,7 @@ async def get_pinned_status_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.post("/{id}/pin", response_model=Optional[ChatResponse])
 async def pin_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         chat = Chats.toggle_chat_pinned_by_id(id)
         return chat
@@ -446,7 +524,7 @@ async def pin_chat_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.post("/{id}/clone", response_model=Optional[ChatResponse])
 async def clone_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         updated_chat = {
             **chat.chat,
@@ -470,22 +548,23 @@ async def clone_chat_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.post("/{id}/archive", response_model=Optional[ChatResponse])
 async def archive_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
-        chat = Chats.toggle_chat_archive_by_id(id)
-
-        # Delete tags if chat is archived
-        if chat.archived:
-            for tag_id in chat.meta.get("tags", []):
-                if Chats.count_chats_by_tag_name_and_user_id(tag_id, user.id) == 0:
-                    log.debug(f"deleting tag: {tag_id}")
-                    Tags.delete_tag_by_name_and_user_id(tag_id, user.id)
-        else:
-            for tag_id in chat.meta.get("tags", []):
-                tag = Tags.get_tag_by_name_and_user_id(tag_id, user.id)
-                if tag is None:
-                    log.debug(f"inserting tag: {tag_id}")
-                    tag = Tags.insert_new_tag(tag_id, user.id)
+        with unit_of_work():
+            chat = Chats.toggle_chat_archive_by_id(id)
+
+            # Delete tags if chat is archived
+            if chat.archived:
+                for tag_id in chat.meta.get("tags", []):
+                    if Chats.count_chats_by_tag_name_and_user_id(tag_id, user.id) == 0:
+                        log.debug(f"deleting tag: {tag_id}")
+                        Tags.delete_tag_by_name_and_user_id(tag_id, user.id)
+            else:
+                for tag_id in chat.meta.get("tags", []):
+                    tag = Tags.get_tag_by_name_and_user_id(tag_id, user.id)
+                    if tag is None:
+                        log.debug(f"inserting tag: {tag_id}")
+                        tag = Tags.insert_new_tag(tag_id, user.id)
 
         return ChatResponse(**chat.model_dump())
     else:
@@ -501,7 +580,7 @@ async def archive_chat_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.post("/{id}/share", response_model=Optional[ChatResponse])
 async def share_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         if chat.share_id:
             shared_chat = Chats.update_shared_chat_by_chat_id(chat.id)
@@ -529,7 +608,7 @@ async def share_chat_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.delete("/{id}/share", response_model=Optional[bool])
 async def delete_shared_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         if not chat.share_id:
             return False
@@ -558,7 +637,7 @@ class ChatFolderIdForm(BaseModel):
 async def update_chat_folder_id_by_id(
     id: str, form_data: ChatFolderIdForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         chat = Chats.update_chat_folder_id_by_id_and_user_id(
             id, user.id, form_data.folder_id
@@ -577,7 +656,7 @@ async def update_chat_folder_id_by_id(
 
 @router.get("/{id}/tags", response_model=list[TagModel])
 async def get_chat_tags_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         tags = chat.meta.get("tags", [])
         return Tags.get_tags_by_ids_and_user_id(tags, user.id)
@@ -596,7 +675,7 @@ async def get_chat_tags_by_id(id: str, user=Depends(get_verified_user)):
 async def add_tag_by_id_and_tag_name(
     id: str, form_data: TagForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         tags = chat.meta.get("tags", [])
         tag_id = form_data.name.replace(" ", "_").lower()
@@ -613,7 +692,7 @@ async def add_tag_by_id_and_tag_name(
                 id, user.id, form_data.name
             )
 
-        chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+        chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
         tags = chat.meta.get("tags", [])
         return Tags.get_tags_by_ids_and_user_id(tags, user.id)
     else:
@@ -631,14 +710,14 @@ async def add_tag_by_id_and_tag_name(
 async def delete_tag_by_id_and_tag_name(
     id: str, form_data: TagForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
         Chats.delete_tag_by_id_and_user_id_and_tag_name(id, user.id, form_data.name)
 
         if Chats.count_chats_by_tag_name_and_user_id(form_data.name, user.id) == 0:
             Tags.delete_tag_by_name_and_user_id(form_data.name, user.id)
 
-        chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+        chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
         tags = chat.meta.get("tags", [])
         return Tags.get_tags_by_ids_and_user_id(tags, user.id)
     else:
@@ -654,13 +733,14 @@ async def delete_tag_by_id_and_tag_name(
 
 @router.delete("/{id}/tags/all", response_model=Optional[bool])
 async def delete_all_tags_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.get_chat_by_id_and_user_id_async(id, user.id)
     if chat:
-        Chats.delete_all_tags_by_id_and_user_id(id, user.id)
+        with unit_of_work():
+            Chats.delete_all_tags_by_id_and_user_id(id, user.id)
 
-        for tag in chat.meta.get("tags", []):
-            if Chats.count_chats_by_tag_name_and_user_id(tag, user.id) == 0:
-                Tags.delete_tag_by_name_and_user_id(tag, user.id)
+            for tag in chat.meta.get("tags", []):
+                if Chats.count_chats_by_tag_name_and_user_id(tag, user.id) == 0:
+                    Tags.delete_tag_by_name_and_user_id(tag, user.id)
 
         return True
     else:
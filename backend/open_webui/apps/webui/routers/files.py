@@ -14,9 +14,11 @@ from open_webui.apps.webui.models.files import (
     FileModelResponse,
     Files,
 )
+from open_webui.apps.webui.models.jobs import IngestionJobs
 from open_webui.apps.retrieval.main import process_file, ProcessFileForm
+from open_webui.apps.retrieval.ingestion import INGESTION_WORKERS
 
-from open_webui.config import UPLOAD_DIR
+from open_webui.config import ENABLE_RAG_BACKGROUND_INGESTION, UPLOAD_DIR
 from open_webui.env import SRC_LOG_LEVELS
 from open_webui.constants import ERROR_MESSAGES
 
@@ -67,6 +69,16 @@ def upload_file(file: UploadFile = File(...), user=Depends(get_verified_user)):
             ),
         )
 
+        if ENABLE_RAG_BACKGROUND_INGESTION:
+            # Return right away; progress is reported via "ingestion-events"
+            job = INGESTION_WORKERS.enqueue(user.id, id)
+            return FileModelResponse(
+                **{
+                    **file_item.model_dump(),
+                    "job": job.model_dump() if job else None,
+                }
+            )
+
         try:
             process_file(ProcessFileForm(file_id=id))
             file_item = Files.get_file_by_id(id=id)
@@ -143,7 +155,7 @@ async def delete_all_files(user=Depends(get_admin_user)):
 
 @router.get("/{id}", response_model=Optional[FileModel])
 async def get_file_by_id(id: str, user=Depends(get_verified_user)):
-    file = Files.get_file_by_id(id)
+    file = await Files.get_file_by_id_async(id)
 
     if file and (file.user_id == user.id or user.role == "admin"):
         return file
@@ -154,6 +166,31 @@ async def get_file_by_id(id: str, user=Depends(get_verified_user)):
         )
 
 
+############################
+# Get File Process Status By Id
+############################
+
+
+@router.get("/{id}/process/status")
+async def get_file_process_status_by_id(id: str, user=Depends(get_verified_user)):
+    file = await Files.get_file_by_id_async(id)
+
+    if file and (file.user_id == user.id or user.role == "admin"):
+        job = IngestionJobs.get_latest_job_by_file_id(id)
+        if job:
+            return job
+        # Files processed inline have no job
+        return {
+            "file_id": id,
+            "status": "completed" if file.data else "pending",
+        }
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+
+
 ############################
 # Get File Data Content By Id
 ############################
@@ -161,7 +198,7 @@ async def get_file_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.get("/{id}/data/content")
 async def get_file_data_content_by_id(id: str, user=Depends(get_verified_user)):
-    file = Files.get_file_by_id(id)
+    file = await Files.get_file_by_id_async(id)
 
     if file and (file.user_id == user.id or user.role == "admin"):
         return {"content": file.data.get("content", "")}
@@ -185,12 +222,12 @@ class ContentForm(BaseModel):
 async def update_file_data_content_by_id(
     id: str, form_data: ContentForm, user=Depends(get_verified_user)
 ):
-    file = Files.get_file_by_id(id)
+    file = await Files.get_file_by_id_async(id)
 
     if file and (file.user_id == user.id or user.role == "admin"):
         try:
             process_file(ProcessFileForm(file_id=id, content=form_data.content))
-            file = Files.get_file_by_id(id=id)
+            file = await Files.get_file_by_id_async(id=id)
         except Exception as e:
             log.exception(e)
             log.error(f"Error processing file: {file.id}")
@@ -210,7 +247,7 @@ async def update_file_data_content_by_id(
 
 @router.get("/{id}/content")
 async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
-    file = Files.get_file_by_id(id)
+    file = await Files.get_file_by_id_async(id)
     if file and (file.user_id == user.id or user.role == "admin"):
         try:
             file_path = Storage.get_file(file.path)
@@ -244,7 +281,7 @@ async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.get("/{id}/content/html")
 async def get_html_file_content_by_id(id: str, user=Depends(get_verified_user)):
-    file = Files.get_file_by_id(id)
+    file = await Files.get_file_by_id_async(id)
     if file and (file.user_id == user.id or user.role == "admin"):
         try:
             file_path = Storage.get_file(file.path)
@@ -275,7 +312,7 @@ async def get_html_file_content_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.get("/{id}/content/{file_name}")
 async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
-    file = Files.get_file_by_id(id)
+    file = await Files.get_file_by_id_async(id)
 
     if file and (file.user_id == user.id or user.role == "admin"):
         file_path = file.path
@@ -323,7 +360,7 @@ async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.delete("/{id}")
 async def delete_file_by_id(id: str, user=Depends(get_verified_user)):
-    file = Files.get_file_by_id(id)
+    file = await Files.get_file_by_id_async(id)
     if file and (file.user_id == user.id or user.role == "admin"):
         result = Files.delete_file_by_id(id)
         if result:
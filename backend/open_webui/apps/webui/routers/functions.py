@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path
 from typing import Optional
@@ -12,6 +13,8 @@ from open_webui.apps.webui.utils import load_function_module_by_id, replace_impo
 from open_webui.config import CACHE_DIR
 from open_webui.constants import ERROR_MESSAGES
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from open_webui.utils.function_executor import FUNCTION_EXECUTOR
+from open_webui.utils.model_registry import MODEL_REGISTRY
 from open_webui.utils.utils import get_admin_user, get_verified_user
 
 router = APIRouter()
@@ -36,6 +39,16 @@ async def get_functions(user=Depends(get_admin_user)):
     return Functions.get_functions()
 
 
+############################
+# GetFunctionStats
+############################
+
+
+@router.get("/stats")
+async def get_function_stats(user=Depends(get_admin_user)):
+    return FUNCTION_EXECUTOR.stats()
+
+
 ############################
 # CreateNewFunction
 ############################
@@ -53,11 +66,12 @@ async def create_new_function(
 
     form_data.id = form_data.id.lower()
 
-    function = Functions.get_function_by_id(form_data.id)
+    function = await Functions.get_function_by_id_async(form_data.id)
     if function is None:
         try:
             form_data.content = replace_imports(form_data.content)
-            function_module, function_type, frontmatter = load_function_module_by_id(
+            function_module, function_type, frontmatter = await asyncio.to_thread(
+                load_function_module_by_id,
                 form_data.id,
                 content=form_data.content,
             )
@@ -72,6 +86,7 @@ async def create_new_function(
             function_cache_dir.mkdir(parents=True, exist_ok=True)
 
             if function:
+                MODEL_REGISTRY.invalidate(base=True)
                 return function
             else:
                 raise HTTPException(
@@ -98,7 +113,7 @@ async def create_new_function(
 
 @router.get("/id/{id}", response_model=Optional[FunctionModel])
 async def get_function_by_id(id: str, user=Depends(get_admin_user)):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
 
     if function:
         return function
@@ -116,13 +131,14 @@ async def get_function_by_id(id: str, user=Depends(get_admin_user)):
 
 @router.post("/id/{id}/toggle", response_model=Optional[FunctionModel])
 async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
     if function:
         function = Functions.update_function_by_id(
             id, {"is_active": not function.is_active}
         )
 
         if function:
+            MODEL_REGISTRY.invalidate(base=True)
             return function
         else:
             raise HTTPException(
@@ -143,13 +159,14 @@ async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
 
 @router.post("/id/{id}/toggle/global", response_model=Optional[FunctionModel])
 async def toggle_global_by_id(id: str, user=Depends(get_admin_user)):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
     if function:
         function = Functions.update_function_by_id(
             id, {"is_global": not function.is_global}
         )
 
         if function:
+            MODEL_REGISTRY.invalidate(base=True)
             return function
         else:
             raise HTTPException(
@@ -174,8 +191,8 @@ async def update_function_by_id(
 ):
     try:
         form_data.content = replace_imports(form_data.content)
-        function_module, function_type, frontmatter = load_function_module_by_id(
-            id, content=form_data.content
+        function_module, function_type, frontmatter = await asyncio.to_thread(
+            load_function_module_by_id, id, content=form_data.content
         )
         form_data.meta.manifest = frontmatter
 
@@ -188,6 +205,7 @@ async def update_function_by_id(
         function = Functions.update_function_by_id(id, updated)
 
         if function:
+            MODEL_REGISTRY.invalidate(base=True)
             return function
         else:
             raise HTTPException(
@@ -218,6 +236,8 @@ async def delete_function_by_id(
         if id in FUNCTIONS:
             del FUNCTIONS[id]
 
+        MODEL_REGISTRY.invalidate(base=True)
+
     return result
 
 
@@ -228,10 +248,10 @@ async def delete_function_by_id(
 
 @router.get("/id/{id}/valves", response_model=Optional[dict])
 async def get_function_valves_by_id(id: str, user=Depends(get_admin_user)):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
     if function:
         try:
-            valves = Functions.get_function_valves_by_id(id)
+            valves = await Functions.get_function_valves_by_id_async(id)
             return valves
         except Exception as e:
             raise HTTPException(
@@ -254,12 +274,14 @@ async def get_function_valves_by_id(id: str, user=Depends(get_admin_user)):
 async def get_function_valves_spec_by_id(
     request: Request, id: str, user=Depends(get_admin_user)
 ):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
     if function:
         if id in request.app.state.FUNCTIONS:
             function_module = request.app.state.FUNCTIONS[id]
         else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
+            function_module, function_type, frontmatter = await asyncio.to_thread(
+                load_function_module_by_id, id
+            )
             request.app.state.FUNCTIONS[id] = function_module
 
         if hasattr(function_module, "Valves"):
@@ -282,12 +304,14 @@ async def get_function_valves_spec_by_id(
 async def update_function_valves_by_id(
     request: Request, id: str, form_data: dict, user=Depends(get_admin_user)
 ):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
     if function:
         if id in request.app.state.FUNCTIONS:
             function_module = request.app.state.FUNCTIONS[id]
         else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
+            function_module, function_type, frontmatter = await asyncio.to_thread(
+                load_function_module_by_id, id
+            )
             request.app.state.FUNCTIONS[id] = function_module
 
         if hasattr(function_module, "Valves"):
@@ -297,6 +321,7 @@ async def update_function_valves_by_id(
                 form_data = {k: v for k, v in form_data.items() if v is not None}
                 valves = Valves(**form_data)
                 Functions.update_function_valves_by_id(id, valves.model_dump())
+                MODEL_REGISTRY.invalidate(base=True)
                 return valves.model_dump()
             except Exception as e:
                 print(e)
@@ -324,7 +349,7 @@ async def update_function_valves_by_id(
 
 @router.get("/id/{id}/valves/user", response_model=Optional[dict])
 async def get_function_user_valves_by_id(id: str, user=Depends(get_verified_user)):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
     if function:
         try:
             user_valves = Functions.get_user_valves_by_id_and_user_id(id, user.id)
@@ -345,12 +370,14 @@ async def get_function_user_valves_by_id(id: str, user=Depends(get_verified_user
 async def get_function_user_valves_spec_by_id(
     request: Request, id: str, user=Depends(get_verified_user)
 ):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
     if function:
         if id in request.app.state.FUNCTIONS:
             function_module = request.app.state.FUNCTIONS[id]
         else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
+            function_module, function_type, frontmatter = await asyncio.to_thread(
+                load_function_module_by_id, id
+            )
             request.app.state.FUNCTIONS[id] = function_module
 
         if hasattr(function_module, "UserValves"):
@@ -368,13 +395,15 @@ async def get_function_user_valves_spec_by_id(
 async def update_function_user_valves_by_id(
     request: Request, id: str, form_data: dict, user=Depends(get_verified_user)
 ):
-    function = Functions.get_function_by_id(id)
+    function = await Functions.get_function_by_id_async(id)
 
     if function:
         if id in request.app.state.FUNCTIONS:
             function_module = request.app.state.FUNCTIONS[id]
         else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
+            function_module, function_type, frontmatter = await asyncio.to_thread(
+                load_function_module_by_id, id
+            )
             request.app.state.FUNCTIONS[id] = function_module
 
         if hasattr(function_module, "UserValves"):
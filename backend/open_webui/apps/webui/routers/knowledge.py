@@ -11,10 +11,14 @@ from open_webui.apps.webui.models.knowledge import (
     KnowledgeUserResponse,
 )
 from open_webui.apps.webui.models.files import Files, FileModel
+from open_webui.apps.webui.models.jobs import IngestionJobs
 from open_webui.apps.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.apps.retrieval.bm25 import BM25_INDEX_CACHE
 from open_webui.apps.retrieval.main import process_file, ProcessFileForm
+from open_webui.apps.retrieval.ingestion import INGESTION_WORKERS
 
 
+from open_webui.config import ENABLE_RAG_BACKGROUND_INGESTION
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.utils.utils import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access, has_permission
@@ -47,7 +51,7 @@ async def get_knowledge(user=Depends(get_verified_user)):
     for knowledge_base in knowledge_bases:
         files = []
         if knowledge_base.data:
-            files = Files.get_file_metadatas_by_ids(
+            files = await Files.get_file_metadatas_by_ids_async(
                 knowledge_base.data.get("file_ids", [])
             )
 
@@ -69,7 +73,7 @@ async def get_knowledge(user=Depends(get_verified_user)):
                         id=knowledge_base.id, data=data
                     )
 
-                    files = Files.get_file_metadatas_by_ids(file_ids)
+                    files = await Files.get_file_metadatas_by_ids_async(file_ids)
 
         knowledge_with_files.append(
             KnowledgeUserResponse(
@@ -95,7 +99,7 @@ async def get_knowledge_list(user=Depends(get_verified_user)):
     for knowledge_base in knowledge_bases:
         files = []
         if knowledge_base.data:
-            files = Files.get_file_metadatas_by_ids(
+            files = await Files.get_file_metadatas_by_ids_async(
                 knowledge_base.data.get("file_ids", [])
             )
 
@@ -117,7 +121,7 @@ async def get_knowledge_list(user=Depends(get_verified_user)):
                         id=knowledge_base.id, data=data
                     )
 
-                    files = Files.get_file_metadatas_by_ids(file_ids)
+                    files = await Files.get_file_metadatas_by_ids_async(file_ids)
 
         knowledge_with_files.append(
             KnowledgeUserResponse(
@@ -167,7 +171,7 @@ class KnowledgeFilesResponse(KnowledgeResponse):
 
 @router.get("/{id}", response_model=Optional[KnowledgeFilesResponse])
 async def get_knowledge_by_id(id: str, user=Depends(get_verified_user)):
-    knowledge = Knowledges.get_knowledge_by_id(id=id)
+    knowledge = await Knowledges.get_knowledge_by_id_async(id=id)
 
     if knowledge:
 
@@ -178,7 +182,7 @@ async def get_knowledge_by_id(id: str, user=Depends(get_verified_user)):
         ):
 
             file_ids = knowledge.data.get("file_ids", []) if knowledge.data else []
-            files = Files.get_files_by_ids(file_ids)
+            files = await Files.get_files_by_ids_async(file_ids)
 
             return KnowledgeFilesResponse(
                 **knowledge.model_dump(),
@@ -202,7 +206,7 @@ async def update_knowledge_by_id(
     form_data: KnowledgeForm,
     user=Depends(get_verified_user),
 ):
-    knowledge = Knowledges.get_knowledge_by_id(id=id)
+    knowledge = await Knowledges.get_knowledge_by_id_async(id=id)
     if not knowledge:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -218,7 +222,7 @@ async def update_knowledge_by_id(
     knowledge = Knowledges.update_knowledge_by_id(id=id, form_data=form_data)
     if knowledge:
         file_ids = knowledge.data.get("file_ids", []) if knowledge.data else []
-        files = Files.get_files_by_ids(file_ids)
+        files = await Files.get_files_by_ids_async(file_ids)
 
         return KnowledgeFilesResponse(
             **knowledge.model_dump(),
@@ -266,21 +270,35 @@ def add_file_to_knowledge_by_id(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=ERROR_MESSAGES.NOT_FOUND,
         )
-    if not file.data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=ERROR_MESSAGES.FILE_NOT_PROCESSED,
-        )
 
-    # Add content to the vector database
-    try:
-        process_file(ProcessFileForm(file_id=form_data.file_id, collection_name=id))
-    except Exception as e:
-        log.debug(e)
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e),
-        )
+    if ENABLE_RAG_BACKGROUND_INGESTION:
+        # Files still being processed can be added, the job queued here runs
+        # once the file's own processing job has finished
+        if not file.data and not IngestionJobs.has_unfinished_jobs_by_file_id(
+            form_data.file_id
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.FILE_NOT_PROCESSED,
+            )
+
+        INGESTION_WORKERS.enqueue(user.id, form_data.file_id, collection_name=id)
+    else:
+        if not file.data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.FILE_NOT_PROCESSED,
+            )
+
+        # Add content to the vector database
+        try:
+            process_file(ProcessFileForm(file_id=form_data.file_id, collection_name=id))
+        except Exception as e:
+            log.debug(e)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
 
     if knowledge:
         data = knowledge.data or {}
@@ -346,6 +364,7 @@ def update_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEX_CACHE.delete(knowledge.id, filter={"file_id": form_data.file_id})
 
     # Add content to the vector database
     try:
@@ -408,6 +427,7 @@ def remove_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEX_CACHE.delete(knowledge.id, filter={"file_id": form_data.file_id})
 
     result = VECTOR_DB_CLIENT.query(
         collection_name=knowledge.id,
@@ -457,7 +477,7 @@ def remove_file_from_knowledge_by_id(
 
 @router.delete("/{id}/delete", response_model=bool)
 async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
-    knowledge = Knowledges.get_knowledge_by_id(id=id)
+    knowledge = await Knowledges.get_knowledge_by_id_async(id=id)
     if not knowledge:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -472,6 +492,7 @@ async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEX_CACHE.delete_collection(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -486,7 +507,7 @@ async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.post("/{id}/reset", response_model=Optional[KnowledgeResponse])
 async def reset_knowledge_by_id(id: str, user=Depends(get_verified_user)):
-    knowledge = Knowledges.get_knowledge_by_id(id=id)
+    knowledge = await Knowledges.get_knowledge_by_id_async(id=id)
     if not knowledge:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -501,6 +522,7 @@ async def reset_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEX_CACHE.delete_collection(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -1,12 +1,16 @@
+import hashlib
+import marshal
 import os
 import re
 import subprocess
 import sys
+import threading
+import time
 from importlib import util
 import types
-import tempfile
 import logging
 
+from open_webui.config import CACHE_DIR
 from open_webui.env import SRC_LOG_LEVELS
 from open_webui.apps.webui.models.functions import Functions
 from open_webui.apps.webui.models.tools import Tools
@@ -14,6 +18,16 @@ from open_webui.apps.webui.models.tools import Tools
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
+MODULE_CACHE_DIR = f"{CACHE_DIR}/modules"
+
+# Cache files younger than this may belong to content another worker just
+# saved, and are never removed as orphans
+MODULE_CACHE_ORPHAN_AGE = 3600
+
+# Hashes of the requirement lists installed by this process
+installed_requirements: set[str] = set()
+install_requirements_lock = threading.Lock()
+
 
 def extract_frontmatter(content):
     """
@@ -68,6 +82,55 @@ def replace_imports(content):
     return content
 
 
+def get_module_code(content: str) -> tuple[types.CodeType, str]:
+    """
+    Compiles the source of a function or tool. The source and its marshalled
+    code object are kept in MODULE_CACHE_DIR under the hash of the source, so
+    other workers and restarts load the bytecode instead of compiling again.
+    Returns the code object and the path of the source, used as __file__.
+    """
+    key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    path = os.path.join(MODULE_CACHE_DIR, f"{key}.py")
+    code_path = os.path.join(
+        MODULE_CACHE_DIR, f"{key}.{sys.implementation.cache_tag}.bin"
+    )
+
+    try:
+        with open(code_path, "rb") as f:
+            return marshal.load(f), path
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.warning(f"Ignoring unreadable module cache {code_path}: {e}")
+
+    code = compile(content, path, "exec")
+    try:
+        os.makedirs(MODULE_CACHE_DIR, exist_ok=True)
+        # Written under a temporary name and renamed, so that concurrent workers
+        # never read a partial file
+        for file_path, data in [
+            (path, content.encode("utf-8")),
+            (code_path, marshal.dumps(code)),
+        ]:
+            temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, file_path)
+    except Exception as e:
+        log.warning(f"Could not write module cache {code_path}: {e}")
+    return code, path
+
+
+def exec_module(module_name: str, content: str) -> types.ModuleType:
+    code, path = get_module_code(content)
+
+    module = types.ModuleType(module_name)
+    module.__dict__["__file__"] = path
+    sys.modules[module_name] = module
+    exec(code, module.__dict__)
+    return module
+
+
 def load_tools_module_by_id(toolkit_id, content=None):
 
     if content is None:
@@ -75,31 +138,17 @@ def load_tools_module_by_id(toolkit_id, content=None):
         if not tool:
             raise Exception(f"Toolkit not found: {toolkit_id}")
 
-        content = tool.content
+        content = replace_imports(tool.content)
+        if content != tool.content:
+            Tools.update_tool_by_id(toolkit_id, {"content": content})
 
-        content = replace_imports(content)
-        Tools.update_tool_by_id(toolkit_id, {"content": content})
-    else:
-        frontmatter = extract_frontmatter(content)
-        # Install required packages found within the frontmatter
-        install_frontmatter_requirements(frontmatter.get("requirements", ""))
+    frontmatter = extract_frontmatter(content)
+    # Install required packages found within the frontmatter
+    install_frontmatter_requirements(frontmatter.get("requirements", ""))
 
     module_name = f"tool_{toolkit_id}"
-    module = types.ModuleType(module_name)
-    sys.modules[module_name] = module
-
-    # Create a temporary file and use it to define `__file__` so
-    # that it works as expected from the module's perspective.
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
     try:
-        with open(temp_file.name, "w", encoding="utf-8") as f:
-            f.write(content)
-        module.__dict__["__file__"] = temp_file.name
-
-        # Executing the modified content in the created module's namespace
-        exec(content, module.__dict__)
-        frontmatter = extract_frontmatter(content)
+        module = exec_module(module_name, content)
         log.info(f"Loaded module: {module.__name__}")
 
         # Create and return the object if the class 'Tools' is found in the module
@@ -109,10 +158,8 @@ def load_tools_module_by_id(toolkit_id, content=None):
             raise Exception("No Tools class found in the module")
     except Exception as e:
         log.error(f"Error loading module: {toolkit_id}: {e}")
-        del sys.modules[module_name]  # Clean up
+        sys.modules.pop(module_name, None)  # Clean up
         raise e
-    finally:
-        os.unlink(temp_file.name)
 
 
 def load_function_module_by_id(function_id, content=None):
@@ -120,30 +167,17 @@ def load_function_module_by_id(function_id, content=None):
         function = Functions.get_function_by_id(function_id)
         if not function:
             raise Exception(f"Function not found: {function_id}")
-        content = function.content
 
-        content = replace_imports(content)
-        Functions.update_function_by_id(function_id, {"content": content})
-    else:
-        frontmatter = extract_frontmatter(content)
-        install_frontmatter_requirements(frontmatter.get("requirements", ""))
+        content = replace_imports(function.content)
+        if content != function.content:
+            Functions.update_function_by_id(function_id, {"content": content})
 
-    module_name = f"function_{function_id}"
-    module = types.ModuleType(module_name)
-    sys.modules[module_name] = module
+    frontmatter = extract_frontmatter(content)
+    install_frontmatter_requirements(frontmatter.get("requirements", ""))
 
-    # Create a temporary file and use it to define `__file__` so
-    # that it works as expected from the module's perspective.
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
+    module_name = f"function_{function_id}"
     try:
-        with open(temp_file.name, "w", encoding="utf-8") as f:
-            f.write(content)
-        module.__dict__["__file__"] = temp_file.name
-
-        # Execute the modified content in the created module's namespace
-        exec(content, module.__dict__)
-        frontmatter = extract_frontmatter(content)
+        module = exec_module(module_name, content)
         log.info(f"Loaded module: {module.__name__}")
 
         # Create appropriate object based on available class type in the module
@@ -157,19 +191,116 @@ def load_function_module_by_id(function_id, content=None):
             raise Exception("No Function class found in the module")
     except Exception as e:
         log.error(f"Error loading module: {function_id}: {e}")
-        del sys.modules[module_name]  # Cleanup by removing the module in case of error
+        # Cleanup by removing the module in case of error
+        sys.modules.pop(module_name, None)
 
         Functions.update_function_by_id(function_id, {"is_active": False})
         raise e
-    finally:
-        os.unlink(temp_file.name)
+
+
+def is_requirement_present(req: str) -> bool:
+    """
+    Whether a requirement is satisfied by the packages of this environment.
+    Checked for every process, packages installed at runtime don't outlive
+    the container even when the data directory does.
+    """
+    from importlib import metadata
+
+    from packaging.requirements import InvalidRequirement, Requirement
+
+    try:
+        requirement = Requirement(req)
+        version = metadata.version(requirement.name)
+    except (InvalidRequirement, metadata.PackageNotFoundError):
+        return False
+    return requirement.specifier.contains(version, prereleases=True)
 
 
 def install_frontmatter_requirements(requirements):
+    """
+    Installs the comma separated requirements with pip, skipping the ones
+    already present. Blocks, call the loaders in a thread from async code.
+    """
     if requirements:
-        req_list = [req.strip() for req in requirements.split(",")]
-        for req in req_list:
-            log.info(f"Installing requirement: {req}")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", req])
+        key = hashlib.sha256(requirements.encode("utf-8")).hexdigest()
+        if key in installed_requirements:
+            return
+
+        with install_requirements_lock:
+            if key in installed_requirements:
+                return
+
+            req_list = [req.strip() for req in requirements.split(",")]
+            for req in req_list:
+                if is_requirement_present(req):
+                    continue
+                log.info(f"Installing requirement: {req}")
+                subprocess.check_call([sys.executable, "-m", "pip", "install", req])
+            installed_requirements.add(key)
     else:
         log.info("No requirements found in frontmatter.")
+
+
+def remove_orphaned_module_cache(keys: set[str]):
+    """
+    Removes the cached sources and bytecode whose source hash isn't in keys,
+    and bytecode compiled by other Python versions.
+    """
+    try:
+        names = os.listdir(MODULE_CACHE_DIR)
+    except FileNotFoundError:
+        return
+
+    removed = 0
+    for name in names:
+        key, _, suffix = name.partition(".")
+        if key in keys and suffix in ("py", f"{sys.implementation.cache_tag}.bin"):
+            continue
+
+        path = os.path.join(MODULE_CACHE_DIR, name)
+        try:
+            if time.time() - os.path.getmtime(path) < MODULE_CACHE_ORPHAN_AGE:
+                continue
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f"Could not remove module cache {path}: {e}")
+
+    if removed:
+        log.info(f"Removed {removed} orphaned module cache files")
+
+
+def prewarm_modules():
+    """
+    Installs the requirements of the active functions and of the tools and
+    compiles them into the module cache, so that loading them on first use is
+    only running the cached bytecode. Modules themselves are still loaded
+    lazily. Cache files of sources that no longer exist are removed.
+    """
+    functions = Functions.get_functions()
+    tools = Tools.get_all_tools()
+
+    sources = [
+        (f"function {function.id}", function.content)
+        for function in functions
+        if function.is_active
+    ] + [(f"tool {tool.id}", tool.content) for tool in tools]
+
+    for name, content in sources:
+        try:
+            content = replace_imports(content)
+            frontmatter = extract_frontmatter(content)
+            install_frontmatter_requirements(frontmatter.get("requirements", ""))
+            get_module_code(content)
+        except Exception as e:
+            log.warning(f"Could not prewarm {name}: {e}")
+    log.info(f"Prewarmed {len(sources)} function and tool modules")
+
+    # Inactive functions keep their cache, they may be enabled again
+    keys = {
+        hashlib.sha256(replace_imports(item.content).encode("utf-8")).hexdigest()
+        for item in [*functions, *tools]
+    }
+    remove_orphaned_module_cache(keys)
@@ -1,3 +1,5 @@
+import asyncio
+import copy
 import json
 import logging
 import os
@@ -12,6 +14,7 @@ import requests
 import yaml
 from open_webui.apps.webui.internal.db import Base, get_db
 from open_webui.env import (
+    CONFIG_REFRESH_INTERVAL,
     OPEN_WEBUI_DIR,
     DATA_DIR,
     ENV,
@@ -75,17 +78,56 @@ def load_json_config():
         return json.load(file)
 
 
-def save_to_db(data):
+def save_to_db(data) -> tuple[int, int]:
     with get_db() as db:
         existing_config = db.query(Config).first()
         if not existing_config:
-            new_config = Config(data=data, version=0)
-            db.add(new_config)
+            existing_config = Config(data=data, version=0)
+            db.add(existing_config)
         else:
             existing_config.data = data
+            existing_config.version = (existing_config.version or 0) + 1
             existing_config.updated_at = datetime.now()
             db.add(existing_config)
         db.commit()
+        return (existing_config.id, existing_config.version)
+
+
+def save_value_to_db(config_path: str, value) -> tuple[dict, tuple[int, int]]:
+    # Only the one key is written, on top of the latest stored config so keys
+    # saved by other workers in the meantime are kept. Nothing is written when
+    # the stored value already matches, compared under the row lock rather
+    # than against this worker's copy, which may be stale
+    with get_db() as db:
+        existing_config = (
+            db.query(Config).order_by(Config.id.desc()).with_for_update().first()
+        )
+        data = copy.deepcopy(
+            existing_config.data if existing_config else DEFAULT_CONFIG
+        )
+
+        path_parts = config_path.split(".")
+        sub_config = data
+        for key in path_parts[:-1]:
+            if not isinstance(sub_config.get(key), dict):
+                sub_config[key] = {}
+            sub_config = sub_config[key]
+
+        if existing_config and path_parts[-1] in sub_config:
+            if sub_config[path_parts[-1]] == value:
+                db.rollback()
+                return data, (existing_config.id, existing_config.version)
+        sub_config[path_parts[-1]] = value
+
+        if not existing_config:
+            existing_config = Config(data=data, version=0)
+            db.add(existing_config)
+        else:
+            existing_config.data = data
+            existing_config.version = (existing_config.version or 0) + 1
+            existing_config.updated_at = datetime.now()
+        db.commit()
+        return data, (existing_config.id, existing_config.version)
 
 
 def reset_config():
@@ -159,6 +201,15 @@ def get_config():
         return config_entry.data if config_entry else DEFAULT_CONFIG
 
 
+def get_config_version() -> Optional[tuple[int, int]]:
+    with get_db() as db:
+        config_entry = (
+            db.query(Config.id, Config.version).order_by(Config.id.desc()).first()
+        )
+        return tuple(config_entry) if config_entry else None
+
+
+CONFIG_VERSION = get_config_version()
 CONFIG_DATA = get_config()
 
 
@@ -176,22 +227,48 @@ def get_config_value(config_path: str):
 PERSISTENT_CONFIG_REGISTRY = []
 
 
-def save_config(config):
+def apply_config(config, version: Optional[tuple[int, int]]):
     global CONFIG_DATA
-    global PERSISTENT_CONFIG_REGISTRY
-    try:
-        save_to_db(config)
-        CONFIG_DATA = config
+    global CONFIG_VERSION
+    CONFIG_DATA = config
+    CONFIG_VERSION = version
+
+    # Trigger updates on all registered PersistentConfig entries
+    for config_item in PERSISTENT_CONFIG_REGISTRY:
+        config_item.update()
+
 
-        # Trigger updates on all registered PersistentConfig entries
-        for config_item in PERSISTENT_CONFIG_REGISTRY:
-            config_item.update()
+def save_config(config):
+    try:
+        version = save_to_db(config)
+        apply_config(config, version)
     except Exception as e:
         log.exception(e)
         return False
     return True
 
 
+def get_config_update() -> Optional[tuple[dict, Optional[tuple[int, int]]]]:
+    # The version is checked first, the config itself is only read on a change
+    version = get_config_version()
+    if version == CONFIG_VERSION:
+        return None
+    return get_config(), version
+
+
+async def periodic_config_refresh():
+    while True:
+        await asyncio.sleep(CONFIG_REFRESH_INTERVAL)
+        try:
+            update = await asyncio.to_thread(get_config_update)
+            if update is not None:
+                # Applied on the event loop so requests never see half of it
+                log.info("Config changed in another worker, reloading")
+                apply_config(*update)
+        except Exception as e:
+            log.exception(f"Error refreshing config: {e}")
+
+
 T = TypeVar("T")
 
 
@@ -203,7 +280,7 @@ class PersistentConfig(Generic[T]):
         self.config_value = get_config_value(config_path)
         if self.config_value is not None:
             log.info(f"'{env_name}' loaded from the latest database entry")
-            self.value = self.config_value
+            self.value = copy.deepcopy(self.config_value)
         else:
             self.value = env_value
 
@@ -227,20 +304,15 @@ class PersistentConfig(Generic[T]):
 
     def update(self):
         new_value = get_config_value(self.config_path)
-        if new_value is not None:
-            self.value = new_value
+        if new_value is not None and new_value != self.value:
+            # A copy, so changes made in place are seen as changes by save()
+            self.value = copy.deepcopy(new_value)
             log.info(f"Updated {self.env_name} to new value {self.value}")
+        self.config_value = new_value
 
     def save(self):
         log.info(f"Saving '{self.env_name}' to the database")
-        path_parts = self.config_path.split(".")
-        sub_config = CONFIG_DATA
-        for key in path_parts[:-1]:
-            if key not in sub_config:
-                sub_config[key] = {}
-            sub_config = sub_config[key]
-        sub_config[path_parts[-1]] = self.value
-        save_to_db(CONFIG_DATA)
+        apply_config(*save_value_to_db(self.config_path, self.value))
         self.config_value = self.value
 
 
@@ -620,6 +692,24 @@ OLLAMA_API_CONFIGS = PersistentConfig(
     {},
 )
 
+# random, least_outstanding, ewma, weighted (per URL "weight" in OLLAMA_API_CONFIGS) or sticky (per chat)
+OLLAMA_BALANCER_STRATEGY = os.environ.get(
+    "OLLAMA_BALANCER_STRATEGY", "least_outstanding"
+)
+OLLAMA_BALANCER_EWMA_ALPHA = float(os.environ.get("OLLAMA_BALANCER_EWMA_ALPHA", "0.3"))
+# Backends with the model already loaded are preferred until each has this many requests in flight
+OLLAMA_BALANCER_SPILL_THRESHOLD = int(
+    os.environ.get("OLLAMA_BALANCER_SPILL_THRESHOLD", "4")
+)
+
+# Seconds between /api/ps health checks of every backend (0 disables)
+OLLAMA_HEALTH_CHECK_INTERVAL = int(os.environ.get("OLLAMA_HEALTH_CHECK_INTERVAL", "10"))
+# Backends failing this many times in a row are skipped for OLLAMA_EJECTION_TIME seconds
+OLLAMA_MAX_CONSECUTIVE_FAILURES = int(
+    os.environ.get("OLLAMA_MAX_CONSECUTIVE_FAILURES", "3")
+)
+OLLAMA_EJECTION_TIME = int(os.environ.get("OLLAMA_EJECTION_TIME", "30"))
+
 ####################################
 # OPENAI_API
 ####################################
@@ -1085,6 +1175,21 @@ ENABLE_RAG_HYBRID_SEARCH = PersistentConfig(
     os.environ.get("ENABLE_RAG_HYBRID_SEARCH", "").lower() == "true",
 )
 
+# Number of per-collection BM25 indexes kept in memory for hybrid search (0 disables caching)
+RAG_BM25_INDEX_CACHE_SIZE = int(os.environ.get("RAG_BM25_INDEX_CACHE_SIZE", "32"))
+# Seconds before a cached BM25 index is rebuilt, bounds staleness across workers (0 disables)
+RAG_BM25_INDEX_CACHE_TTL = int(os.environ.get("RAG_BM25_INDEX_CACHE_TTL", "3600"))
+
+# Maximum number of collection/query lookups run in parallel for a single retrieval
+RAG_RETRIEVAL_CONCURRENT_REQUESTS = int(
+    os.environ.get("RAG_RETRIEVAL_CONCURRENT_REQUESTS", "8")
+)
+
+# Maximum number of chat retrievals a worker runs at once, further requests are queued
+RAG_RETRIEVAL_MAX_CONCURRENCY = int(
+    os.environ.get("RAG_RETRIEVAL_MAX_CONCURRENCY", "4")
+)
+
 RAG_FILE_MAX_COUNT = PersistentConfig(
     "RAG_FILE_MAX_COUNT",
     "rag.file.max_count",
@@ -1147,6 +1252,49 @@ RAG_EMBEDDING_BATCH_SIZE = PersistentConfig(
     ),
 )
 
+# Reuse stored vectors for chunks whose text was already embedded with the same engine and model
+ENABLE_RAG_CHUNK_EMBEDDING_STORE = (
+    os.environ.get("ENABLE_RAG_CHUNK_EMBEDDING_STORE", "True").lower() == "true"
+)
+
+# Query embedding cache, keyed by engine, model and text hash (0 disables the in-process LRU)
+RAG_EMBEDDING_CACHE_SIZE = int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "1024"))
+RAG_EMBEDDING_CACHE_TTL = int(os.environ.get("RAG_EMBEDDING_CACHE_TTL", "3600"))
+# Optional Redis URL to share cached query embeddings across workers
+RAG_EMBEDDING_CACHE_REDIS_URL = os.environ.get("RAG_EMBEDDING_CACHE_REDIS_URL", "")
+
+# Remote (Ollama/OpenAI) embedding requests: batches in flight, retries on 429/5xx
+RAG_EMBEDDING_MAX_CONCURRENCY = int(
+    os.environ.get("RAG_EMBEDDING_MAX_CONCURRENCY", "4")
+)
+RAG_EMBEDDING_MAX_RETRIES = int(os.environ.get("RAG_EMBEDDING_MAX_RETRIES", "3"))
+RAG_EMBEDDING_RETRY_BACKOFF = float(
+    os.environ.get("RAG_EMBEDDING_RETRY_BACKOFF", "0.5")
+)
+RAG_EMBEDDING_REQUEST_TIMEOUT = int(
+    os.environ.get("RAG_EMBEDDING_REQUEST_TIMEOUT", "300")
+)
+
+# Process uploaded files through a persistent background job queue instead of inline
+ENABLE_RAG_BACKGROUND_INGESTION = (
+    os.environ.get("ENABLE_RAG_BACKGROUND_INGESTION", "False").lower() == "true"
+)
+RAG_INGESTION_WORKERS = int(os.environ.get("RAG_INGESTION_WORKERS", "2"))
+RAG_INGESTION_MAX_ATTEMPTS = int(os.environ.get("RAG_INGESTION_MAX_ATTEMPTS", "3"))
+# Base delay in seconds before a failed job is retried, doubled on every attempt
+RAG_INGESTION_RETRY_BACKOFF = int(os.environ.get("RAG_INGESTION_RETRY_BACKOFF", "5"))
+# Jobs left processing for longer than this (e.g. after a crash) are requeued
+RAG_INGESTION_JOB_TIMEOUT = int(os.environ.get("RAG_INGESTION_JOB_TIMEOUT", "3600"))
+
+# Split, embed and insert documents in overlapping batches instead of all at once
+ENABLE_RAG_PIPELINED_INGESTION = (
+    os.environ.get("ENABLE_RAG_PIPELINED_INGESTION", "False").lower() == "true"
+)
+# Chunks per pipeline batch, bounds the chunks and vectors held in memory
+RAG_INGESTION_PIPELINE_BATCH_SIZE = int(
+    os.environ.get("RAG_INGESTION_PIPELINE_BATCH_SIZE", "256")
+)
+
 RAG_RERANKING_MODEL = PersistentConfig(
     "RAG_RERANKING_MODEL",
     "rag.reranking_model",
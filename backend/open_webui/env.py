@@ -269,6 +269,10 @@ DATABASE_URL = os.environ.get("DATABASE_URL", f"sqlite:///{DATA_DIR}/webui.db")
 if "postgres://" in DATABASE_URL:
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://")
 
+# Async driver URL for the async table methods, derived from DATABASE_URL
+# (aiosqlite, asyncpg, aiomysql) when empty
+DATABASE_ASYNC_URL = os.environ.get("DATABASE_ASYNC_URL", "")
+
 DATABASE_POOL_SIZE = os.environ.get("DATABASE_POOL_SIZE", 0)
 
 if DATABASE_POOL_SIZE == "":
@@ -362,6 +366,54 @@ WEBSOCKET_MANAGER = os.environ.get("WEBSOCKET_MANAGER", "")
 
 WEBSOCKET_REDIS_URL = os.environ.get("WEBSOCKET_REDIS_URL", REDIS_URL)
 
+# Seconds between background refreshes of the model list (0 disables)
+MODEL_REGISTRY_REFRESH_INTERVAL = int(
+    os.environ.get("MODEL_REGISTRY_REFRESH_INTERVAL", "10")
+)
+# Redis used to tell other workers to refresh their model list, shared with
+# websockets when those already go through Redis
+MODEL_REGISTRY_REDIS_URL = os.environ.get(
+    "MODEL_REGISTRY_REDIS_URL",
+    WEBSOCKET_REDIS_URL if WEBSOCKET_MANAGER == "redis" else "",
+)
+
+# Seconds between checks for configuration saved by other workers (0 disables)
+CONFIG_REFRESH_INTERVAL = int(os.environ.get("CONFIG_REFRESH_INTERVAL", "5"))
+
+# Seconds an authenticated user is served from memory before being reloaded
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "10"))
+# Seconds between batched writes of users' last_active_at (0 writes right away)
+USER_LAST_ACTIVE_FLUSH_INTERVAL = int(
+    os.environ.get("USER_LAST_ACTIVE_FLUSH_INTERVAL", "15")
+)
+
+# Upper bound in seconds on how stale the in-memory group and model access
+# index may get when another worker changed them
+ACCESS_CONTROL_INDEX_TTL = int(os.environ.get("ACCESS_CONTROL_INDEX_TTL", "10"))
+
+# Seconds a user's in-memory chat search index is kept, only used on databases
+# without SQLite FTS5 or Postgres full-text search
+CHAT_SEARCH_INDEX_TTL = int(os.environ.get("CHAT_SEARCH_INDEX_TTL", "60"))
+
+# Seconds between checks whether another worker changed functions or their
+# valves, compiled filter chains are only rebuilt when something changed
+FILTER_CHAIN_POLL_INTERVAL = int(os.environ.get("FILTER_CHAIN_POLL_INTERVAL", "10"))
+
+# Threads running the synchronous code of pipes, filters, actions and tools, how
+# many synchronous calls one function may run at once and the seconds after which
+# a call fails (0 disables the timeout). Calls of one function share its module,
+# so allowing more than 1 (or 0, as many as there are threads) is only safe for
+# functions whose code is thread-safe.
+FUNCTION_EXECUTOR_MAX_WORKERS = int(
+    os.environ.get("FUNCTION_EXECUTOR_MAX_WORKERS", "16")
+)
+FUNCTION_MAX_CONCURRENCY = int(os.environ.get("FUNCTION_MAX_CONCURRENCY", "1"))
+FUNCTION_TIMEOUT = int(os.environ.get("FUNCTION_TIMEOUT", "0"))
+
+# Milliseconds chunks of an Ollama stream converted to the OpenAI format are held
+# back so that tiny ones go out together (0 sends each upstream read right away)
+OLLAMA_STREAM_FLUSH_INTERVAL = int(os.environ.get("OLLAMA_STREAM_FLUSH_INTERVAL", "0"))
+
 AIOHTTP_CLIENT_TIMEOUT = os.environ.get("AIOHTTP_CLIENT_TIMEOUT", "")
 
 if AIOHTTP_CLIENT_TIMEOUT == "":
@@ -386,6 +438,18 @@ else:
     except Exception:
         AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST = 3
 
+# Pooled upstream sessions, one per Ollama/OpenAI base URL (0 means no limit)
+AIOHTTP_CLIENT_POOL_LIMIT = int(os.environ.get("AIOHTTP_CLIENT_POOL_LIMIT", "100"))
+AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST = int(
+    os.environ.get("AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST", "0")
+)
+AIOHTTP_CLIENT_DNS_CACHE_TTL = int(
+    os.environ.get("AIOHTTP_CLIENT_DNS_CACHE_TTL", "300")
+)
+AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = int(
+    os.environ.get("AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "30")
+)
+
 ####################################
 # OFFLINE_MODE
 ####################################
@@ -11,7 +11,6 @@ import random
 from contextlib import asynccontextmanager
 from typing import Optional
 
-from aiocache import cached
 import aiohttp
 import requests
 from fastapi import (
@@ -30,14 +29,17 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from sqlalchemy import text
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.responses import Response, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from open_webui.apps.audio.main import app as audio_app
 from open_webui.apps.images.main import app as images_app
+from open_webui.apps.ollama.balancer import OLLAMA_BALANCER
 from open_webui.apps.ollama.main import (
     app as ollama_app,
+    get_ollama_backends,
     get_all_models as get_ollama_models,
     generate_chat_completion as generate_ollama_chat_completion,
     GenerateChatCompletionForm,
@@ -49,7 +51,11 @@ from open_webui.apps.openai.main import (
     get_all_models_responses as get_openai_models_responses,
 )
 from open_webui.apps.retrieval.main import app as retrieval_app
-from open_webui.apps.retrieval.utils import get_sources_from_files
+from open_webui.apps.retrieval.ingestion import INGESTION_WORKERS
+from open_webui.apps.retrieval.utils import (
+    RETRIEVAL_LIMITER,
+    get_sources_from_files_async,
+)
 
 
 from open_webui.apps.socket.main import (
@@ -58,7 +64,7 @@ from open_webui.apps.socket.main import (
     get_event_call,
     get_event_emitter,
 )
-from open_webui.apps.webui.internal.db import Session
+from open_webui.apps.webui.internal.db import DB_POOL_METRICS, get_db
 from open_webui.apps.webui.main import (
     app as webui_app,
     generate_function_chat_completion,
@@ -67,7 +73,7 @@ from open_webui.apps.webui.main import (
 from open_webui.apps.webui.models.functions import Functions
 from open_webui.apps.webui.models.models import Models
 from open_webui.apps.webui.models.users import UserModel, Users
-from open_webui.apps.webui.utils import load_function_module_by_id
+from open_webui.apps.webui.utils import load_function_module_by_id, prewarm_modules
 from open_webui.config import (
     CACHE_DIR,
     CORS_ALLOW_ORIGIN,
@@ -76,6 +82,7 @@ from open_webui.config import (
     ENABLE_ADMIN_EXPORT,
     ENABLE_OLLAMA_API,
     ENABLE_OPENAI_API,
+    ENABLE_RAG_BACKGROUND_INGESTION,
     ENABLE_TAGS_GENERATION,
     ENV,
     FRONTEND_BUILD_DIR,
@@ -94,11 +101,13 @@ from open_webui.config import (
     WEBUI_AUTH,
     WEBUI_NAME,
     AppConfig,
+    periodic_config_refresh,
     reset_config,
 )
 from open_webui.constants import TASKS
 from open_webui.env import (
     CHANGELOG,
+    CONFIG_REFRESH_INTERVAL,
     GLOBAL_LOG_LEVEL,
     SAFE_MODE,
     SRC_LOG_LEVELS,
@@ -111,6 +120,8 @@ from open_webui.env import (
     RESET_CONFIG_ON_START,
     OFFLINE_MODE,
 )
+from open_webui.utils.filter_chain import FILTER_CHAINS
+from open_webui.utils.function_executor import FUNCTION_EXECUTOR
 from open_webui.utils.misc import (
     add_or_update_system_message,
     get_last_user_message,
@@ -123,6 +134,8 @@ from open_webui.utils.response import (
     convert_streaming_response_ollama_to_openai,
 )
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
+from open_webui.utils.session_pool import SESSION_POOL
+from open_webui.utils.model_registry import MODEL_REGISTRY
 from open_webui.utils.task import (
     rag_template,
     title_generation_template,
@@ -139,8 +152,9 @@ from open_webui.utils.utils import (
     get_current_user,
     get_http_authorization_cred,
     get_verified_user,
+    periodic_user_last_active_flush,
 )
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import ACCESS_CONTROL_INDEX, has_access
 
 if SAFE_MODE:
     print("SAFE MODE ENABLED")
@@ -185,8 +199,25 @@ async def lifespan(app: FastAPI):
         reset_config()
 
     asyncio.create_task(periodic_usage_pool_cleanup())
+    if CONFIG_REFRESH_INTERVAL > 0:
+        asyncio.create_task(periodic_config_refresh())
+    if Users.last_active_flush_interval > 0:
+        asyncio.create_task(periodic_user_last_active_flush())
+    if ENABLE_RAG_BACKGROUND_INGESTION:
+        INGESTION_WORKERS.start()
+    OLLAMA_BALANCER.start(get_ollama_backends)
+    MODEL_REGISTRY.start(get_all_base_models, compose_models)
+    asyncio.create_task(asyncio.to_thread(prewarm_modules))
     yield
 
+    await MODEL_REGISTRY.stop()
+    await OLLAMA_BALANCER.stop()
+    await INGESTION_WORKERS.stop()
+    RETRIEVAL_LIMITER.shutdown()
+    FUNCTION_EXECUTOR.shutdown()
+    await SESSION_POOL.close()
+    Users.flush_user_last_active()
+
 
 app = FastAPI(
     docs_url="/docs" if ENV == "dev" else None,
@@ -226,95 +257,18 @@ app.state.config.TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE = (
 ##################################
 
 
-def get_filter_function_ids(model):
-    def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None and hasattr(function, "valves"):
-            # TODO: Fix FunctionModel
-            return (function.valves if function.valves else {}).get("priority", 0)
-        return 0
-
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
-    if "info" in model and "meta" in model["info"]:
-        filter_ids.extend(model["info"]["meta"].get("filterIds", []))
-        filter_ids = list(set(filter_ids))
-
-    enabled_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
-
-    filter_ids = [
-        filter_id for filter_id in filter_ids if filter_id in enabled_filter_ids
-    ]
-
-    filter_ids.sort(key=get_priority)
-    return filter_ids
-
-
-async def chat_completion_filter_functions_handler(body, model, extra_params):
-    skip_files = None
-
-    filter_ids = get_filter_function_ids(model)
-    for filter_id in filter_ids:
-        filter = Functions.get_function_by_id(filter_id)
-        if not filter:
-            continue
-
-        if filter_id in webui_app.state.FUNCTIONS:
-            function_module = webui_app.state.FUNCTIONS[filter_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(filter_id)
-            webui_app.state.FUNCTIONS[filter_id] = function_module
-
-        # Check if the function has a file_handler variable
-        if hasattr(function_module, "file_handler"):
-            skip_files = function_module.file_handler
-
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
-
-        if not hasattr(function_module, "inlet"):
-            continue
+async def chat_completion_filter_functions_handler(body, model, user, extra_params):
+    chain = await FILTER_CHAINS.get_chain(model)
+    params = {**extra_params, "__model__": model}
 
+    for filter in chain.get_filters("inlet"):
         try:
-            inlet = function_module.inlet
-
-            # Get the signature of the function
-            sig = inspect.signature(inlet)
-            params = {"body": body} | {
-                k: v
-                for k, v in {
-                    **extra_params,
-                    "__model__": model,
-                    "__id__": filter_id,
-                }.items()
-                if k in sig.parameters
-            }
-
-            if "__user__" in params and hasattr(function_module, "UserValves"):
-                try:
-                    params["__user__"]["valves"] = function_module.UserValves(
-                        **Functions.get_user_valves_by_id_and_user_id(
-                            filter_id, params["__user__"]["id"]
-                        )
-                    )
-                except Exception as e:
-                    print(e)
-
-            if inspect.iscoroutinefunction(inlet):
-                body = await inlet(**params)
-            else:
-                body = inlet(**params)
-
+            body = await filter.call("inlet", body, params, user)
         except Exception as e:
             print(f"Error: {e}")
             raise e
 
-    if skip_files and "files" in body.get("metadata", {}):
+    if chain.skip_files and "files" in body.get("metadata", {}):
         del body["metadata"]["files"]
 
     return body, {}
@@ -391,7 +345,8 @@ async def chat_completion_tools_handler(
         app.state.config.TASK_MODEL_EXTERNAL,
         models,
     )
-    tools = get_tools(
+    tools = await asyncio.to_thread(
+        get_tools,
         webui_app,
         tool_ids,
         user,
@@ -426,7 +381,9 @@ async def chat_completion_tools_handler(
         raise e
 
     try:
-        response = await generate_chat_completions(form_data=payload, user=user)
+        response = await generate_chat_completions(
+            form_data=payload, user=user, models=models
+        )
         log.debug(f"{response=}")
         content = await get_content_from_response(response)
         log.debug(f"{content=}")
@@ -549,7 +506,7 @@ async def chat_completion_files_handler(
         if len(queries) == 0:
             queries = [get_last_user_message(body["messages"])]
 
-        sources = get_sources_from_files(
+        sources = await get_sources_from_files_async(
             files=files,
             queries=queries,
             embedding_function=retrieval_app.state.EMBEDDING_FUNCTION,
@@ -563,238 +520,6 @@ async def chat_completion_files_handler(
     return body, {"sources": sources}
 
 
-def is_chat_completion_request(request):
-    return request.method == "POST" and any(
-        endpoint in request.url.path
-        for endpoint in ["/ollama/api/chat", "/chat/completions"]
-    )
-
-
-async def get_body_and_model_and_user(request, models):
-    # Read the original request body
-    body = await request.body()
-    body_str = body.decode("utf-8")
-    body = json.loads(body_str) if body_str else {}
-
-    model_id = body["model"]
-    if model_id not in models:
-        raise Exception("Model not found")
-    model = models[model_id]
-
-    user = get_current_user(
-        request,
-        get_http_authorization_cred(request.headers.get("Authorization")),
-    )
-
-    return body, model, user
-
-
-class ChatCompletionMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if not is_chat_completion_request(request):
-            return await call_next(request)
-        log.debug(f"request.url.path: {request.url.path}")
-
-        model_list = await get_all_models()
-        models = {model["id"]: model for model in model_list}
-
-        try:
-            body, model, user = await get_body_and_model_and_user(request, models)
-        except Exception as e:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={"detail": str(e)},
-            )
-
-        model_info = Models.get_model_by_id(model["id"])
-        if user.role == "user":
-            if model.get("arena"):
-                if not has_access(
-                    user.id,
-                    type="read",
-                    access_control=model.get("info", {})
-                    .get("meta", {})
-                    .get("access_control", {}),
-                ):
-                    raise HTTPException(
-                        status_code=403,
-                        detail="Model not found",
-                    )
-            else:
-                if not model_info:
-                    return JSONResponse(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        content={"detail": "Model not found"},
-                    )
-                elif not (
-                    user.id == model_info.user_id
-                    or has_access(
-                        user.id, type="read", access_control=model_info.access_control
-                    )
-                ):
-                    return JSONResponse(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        content={"detail": "User does not have access to the model"},
-                    )
-
-        metadata = {
-            "chat_id": body.pop("chat_id", None),
-            "message_id": body.pop("id", None),
-            "session_id": body.pop("session_id", None),
-            "tool_ids": body.get("tool_ids", None),
-            "files": body.get("files", None),
-        }
-        body["metadata"] = metadata
-
-        extra_params = {
-            "__event_emitter__": get_event_emitter(metadata),
-            "__event_call__": get_event_call(metadata),
-            "__user__": {
-                "id": user.id,
-                "email": user.email,
-                "name": user.name,
-                "role": user.role,
-            },
-            "__metadata__": metadata,
-        }
-
-        # Initialize data_items to store additional data to be sent to the client
-        # Initialize contexts and citation
-        data_items = []
-        sources = []
-
-        try:
-            body, flags = await chat_completion_filter_functions_handler(
-                body, model, extra_params
-            )
-        except Exception as e:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={"detail": str(e)},
-            )
-
-        tool_ids = body.pop("tool_ids", None)
-        files = body.pop("files", None)
-
-        metadata = {
-            **metadata,
-            "tool_ids": tool_ids,
-            "files": files,
-        }
-        body["metadata"] = metadata
-
-        try:
-            body, flags = await chat_completion_tools_handler(
-                body, user, models, extra_params
-            )
-            sources.extend(flags.get("sources", []))
-        except Exception as e:
-            log.exception(e)
-
-        try:
-            body, flags = await chat_completion_files_handler(body, user)
-            sources.extend(flags.get("sources", []))
-        except Exception as e:
-            log.exception(e)
-
-        # If context is not empty, insert it into the messages
-        if len(sources) > 0:
-            context_string = ""
-            for source_idx, source in enumerate(sources):
-                source_id = source.get("source", {}).get("name", "")
-
-                if "document" in source:
-                    for doc_idx, doc_context in enumerate(source["document"]):
-                        metadata = source.get("metadata")
-                        doc_source_id = None
-
-                        if metadata:
-                            doc_source_id = metadata[doc_idx].get("source", source_id)
-
-                        if source_id:
-                            context_string += f"<source><source_id>{doc_source_id if doc_source_id is not None else source_id}</source_id><source_context>{doc_context}</source_context></source>\n"
-                        else:
-                            # If there is no source_id, then do not include the source_id tag
-                            context_string += f"<source><source_context>{doc_context}</source_context></source>\n"
-
-            context_string = context_string.strip()
-            prompt = get_last_user_message(body["messages"])
-
-            if prompt is None:
-                raise Exception("No user message found")
-            if (
-                retrieval_app.state.config.RELEVANCE_THRESHOLD == 0
-                and context_string.strip() == ""
-            ):
-                log.debug(
-                    f"With a 0 relevancy threshold for RAG, the context cannot be empty"
-                )
-
-            # Workaround for Ollama 2.0+ system prompt issue
-            # TODO: replace with add_or_update_system_message
-            if model["owned_by"] == "ollama":
-                body["messages"] = prepend_to_first_user_message_content(
-                    rag_template(
-                        retrieval_app.state.config.RAG_TEMPLATE, context_string, prompt
-                    ),
-                    body["messages"],
-                )
-            else:
-                body["messages"] = add_or_update_system_message(
-                    rag_template(
-                        retrieval_app.state.config.RAG_TEMPLATE, context_string, prompt
-                    ),
-                    body["messages"],
-                )
-
-        # If there are citations, add them to the data_items
-        sources = [
-            source for source in sources if source.get("source", {}).get("name", "")
-        ]
-        if len(sources) > 0:
-            data_items.append({"sources": sources})
-
-        modified_body_bytes = json.dumps(body).encode("utf-8")
-        # Replace the request body with the modified one
-        request._body = modified_body_bytes
-        # Set custom header to ensure content-length matches new body length
-        request.headers.__dict__["_list"] = [
-            (b"content-length", str(len(modified_body_bytes)).encode("utf-8")),
-            *[(k, v) for k, v in request.headers.raw if k.lower() != b"content-length"],
-        ]
-
-        response = await call_next(request)
-        if not isinstance(response, StreamingResponse):
-            return response
-
-        content_type = response.headers["Content-Type"]
-        is_openai = "text/event-stream" in content_type
-        is_ollama = "application/x-ndjson" in content_type
-        if not is_openai and not is_ollama:
-            return response
-
-        def wrap_item(item):
-            return f"data: {item}\n\n" if is_openai else f"{item}\n"
-
-        async def stream_wrapper(original_generator, data_items):
-            for item in data_items:
-                yield wrap_item(json.dumps(item))
-
-            async for data in original_generator:
-                yield data
-
-        return StreamingResponse(
-            stream_wrapper(response.body_iterator, data_items),
-            headers=dict(response.headers),
-        )
-
-    async def _receive(self, body: bytes):
-        return {"type": "http.request", "body": body, "more_body": False}
-
-
-app.add_middleware(ChatCompletionMiddleware)
-
-
 ##################################
 #
 # Pipeline Middleware
@@ -866,98 +591,319 @@ def filter_pipeline(payload, user, models):
     return payload
 
 
-class PipelineMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if not is_chat_completion_request(request):
-            return await call_next(request)
+##################################
+#
+# Chat Completion Middleware
+#
+##################################
+
 
-        log.debug(f"request.url.path: {request.url.path}")
+class ChatCompletionContext(BaseModel):
+    body: dict
+    user: UserModel
+    model: dict
+    models: dict
 
-        # Read the original request body
-        body = await request.body()
-        # Decode body to string
-        body_str = body.decode("utf-8")
-        # Parse string to JSON
-        data = json.loads(body_str) if body_str else {}
 
-        try:
-            user = get_current_user(
-                request,
-                get_http_authorization_cred(request.headers["Authorization"]),
-            )
-        except KeyError as e:
-            if len(e.args) > 1:
-                return JSONResponse(
-                    status_code=e.args[0],
-                    content={"detail": e.args[1]},
+def is_chat_completion_request(scope):
+    return (
+        scope["type"] == "http"
+        and scope["method"] == "POST"
+        and any(
+            endpoint in scope["path"]
+            for endpoint in ["/ollama/api/chat", "/chat/completions"]
+        )
+    )
+
+
+async def process_chat_payload(request: Request) -> tuple[ChatCompletionContext, list]:
+    authorization = request.headers.get("Authorization")
+    try:
+        user = get_current_user(
+            request,
+            get_http_authorization_cred(authorization) if authorization else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+    body = await request.body()
+    try:
+        body = json.loads(body) if body else {}
+        model_id = body["model"]
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid request body"
+        )
+
+    model_list = await get_all_models()
+    models = {model["id"]: model for model in model_list}
+    if model_id not in models:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Model not found"
+        )
+    model = models[model_id]
+
+    if user.role == "user":
+        if model.get("arena"):
+            if not has_access(
+                user.id,
+                type="read",
+                access_control=model.get("info", {})
+                .get("meta", {})
+                .get("access_control", {}),
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Model not found",
                 )
-            else:
-                return JSONResponse(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    content={"detail": "Not authenticated"},
+        else:
+            if not ACCESS_CONTROL_INDEX.get_model(model_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Model not found",
                 )
-        except HTTPException as e:
-            return JSONResponse(
-                status_code=e.status_code,
-                content={"detail": e.detail},
+            elif model_id not in ACCESS_CONTROL_INDEX.get_accessible_model_ids(user.id):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="User does not have access to the model",
+                )
+
+    try:
+        body = filter_pipeline(body, user, models)
+    except Exception as e:
+        if len(e.args) > 1:
+            raise HTTPException(status_code=e.args[0], detail=e.args[1])
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    metadata = {
+        "chat_id": body.pop("chat_id", None),
+        "message_id": body.pop("id", None),
+        "session_id": body.pop("session_id", None),
+        "tool_ids": body.get("tool_ids", None),
+        "files": body.get("files", None),
+    }
+    body["metadata"] = metadata
+
+    extra_params = {
+        "__event_emitter__": get_event_emitter(metadata),
+        "__event_call__": get_event_call(metadata),
+        "__user__": {
+            "id": user.id,
+            "email": user.email,
+            "name": user.name,
+            "role": user.role,
+        },
+        "__metadata__": metadata,
+    }
+
+    # Initialize data_items to store additional data to be sent to the client
+    # Initialize contexts and citation
+    data_items = []
+    sources = []
+
+    try:
+        body, flags = await chat_completion_filter_functions_handler(
+            body, model, user, extra_params
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    tool_ids = body.pop("tool_ids", None)
+    files = body.pop("files", None)
+
+    metadata = {
+        **metadata,
+        "tool_ids": tool_ids,
+        "files": files,
+    }
+    body["metadata"] = metadata
+
+    try:
+        body, flags = await chat_completion_tools_handler(
+            body, user, models, extra_params
+        )
+        sources.extend(flags.get("sources", []))
+    except Exception as e:
+        log.exception(e)
+
+    try:
+        body, flags = await chat_completion_files_handler(body, user)
+        sources.extend(flags.get("sources", []))
+    except Exception as e:
+        log.exception(e)
+
+    # If context is not empty, insert it into the messages
+    if len(sources) > 0:
+        context_string = ""
+        for source_idx, source in enumerate(sources):
+            source_id = source.get("source", {}).get("name", "")
+
+            if "document" in source:
+                for doc_idx, doc_context in enumerate(source["document"]):
+                    metadata = source.get("metadata")
+                    doc_source_id = None
+
+                    if metadata:
+                        doc_source_id = metadata[doc_idx].get("source", source_id)
+
+                    if source_id:
+                        context_string += f"<source><source_id>{doc_source_id if doc_source_id is not None else source_id}</source_id><source_context>{doc_context}</source_context></source>\n"
+                    else:
+                        # If there is no source_id, then do not include the source_id tag
+                        context_string += f"<source><source_context>{doc_context}</source_context></source>\n"
+
+        context_string = context_string.strip()
+        prompt = get_last_user_message(body["messages"])
+
+        if prompt is None:
+            raise Exception("No user message found")
+        if (
+            retrieval_app.state.config.RELEVANCE_THRESHOLD == 0
+            and context_string.strip() == ""
+        ):
+            log.debug(
+                f"With a 0 relevancy threshold for RAG, the context cannot be empty"
             )
 
-        model_list = await get_all_models()
-        models = {model["id"]: model for model in model_list}
+        # Workaround for Ollama 2.0+ system prompt issue
+        # TODO: replace with add_or_update_system_message
+        if model["owned_by"] == "ollama":
+            body["messages"] = prepend_to_first_user_message_content(
+                rag_template(
+                    retrieval_app.state.config.RAG_TEMPLATE, context_string, prompt
+                ),
+                body["messages"],
+            )
+        else:
+            body["messages"] = add_or_update_system_message(
+                rag_template(
+                    retrieval_app.state.config.RAG_TEMPLATE, context_string, prompt
+                ),
+                body["messages"],
+            )
+
+    # If there are citations, add them to the data_items
+    sources = [source for source in sources if source.get("source", {}).get("name", "")]
+    if len(sources) > 0:
+        data_items.append({"sources": sources})
+
+    context = ChatCompletionContext(body=body, user=user, model=model, models=models)
+    return context, data_items
+
+
+class ChatCompletionMiddleware:
+    """
+    Pre-processes chat completion requests in a single pass: the body is parsed,
+    the user and model are resolved once, then pipeline inlet filters, filter
+    functions, tools and file retrieval are applied. The result is handed down as
+    request.state.chat_completion, and sub-apps that read the body themselves get
+    it re-encoded. Responses pass through untouched, only the sources found here
+    are sent ahead of the first chunk of a stream.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not is_chat_completion_request(scope):
+            await self.app(scope, receive, send)
+            return
+        log.debug(f"request.url.path: {scope['path']}")
 
         try:
-            data = filter_pipeline(data, user, models)
-        except Exception as e:
-            if len(e.args) > 1:
-                return JSONResponse(
-                    status_code=e.args[0],
-                    content={"detail": e.args[1]},
-                )
-            else:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content={"detail": str(e)},
-                )
+            context, data_items = await process_chat_payload(Request(scope, receive))
+        except HTTPException as e:
+            response = JSONResponse(
+                status_code=e.status_code, content={"detail": e.detail}
+            )
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["chat_completion"] = context
+
+        # The body is only encoded if something downstream actually reads it
+        body = None
+
+        async def receive_body():
+            nonlocal body
+            if body is None:
+                body = json.dumps(context.body).encode("utf-8")
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        # The original content-length no longer matches, the body is read until
+        # more_body is False anyway
+        scope = {
+            **scope,
+            "headers": [
+                (k, v) for k, v in scope["headers"] if k.lower() != b"content-length"
+            ],
+        }
 
-        modified_body_bytes = json.dumps(data).encode("utf-8")
-        # Replace the request body with the modified one
-        request._body = modified_body_bytes
-        # Set custom header to ensure content-length matches new body length
-        request.headers.__dict__["_list"] = [
-            (b"content-length", str(len(modified_body_bytes)).encode("utf-8")),
-            *[(k, v) for k, v in request.headers.raw if k.lower() != b"content-length"],
-        ]
+        if not data_items:
+            await self.app(scope, receive_body, send)
+            return
+
+        wrap_item = None
+
+        async def send_with_sources(message):
+            nonlocal wrap_item, data_items
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-length" in headers:
+                    data_items = []
+                elif "text/event-stream" in content_type:
+                    wrap_item = lambda item: f"data: {item}\n\n"
+                elif "application/x-ndjson" in content_type:
+                    wrap_item = lambda item: f"{item}\n"
+                else:
+                    data_items = []
+            elif message["type"] == "http.response.body" and data_items:
+                for item in data_items:
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": wrap_item(json.dumps(item)).encode("utf-8"),
+                            "more_body": True,
+                        }
+                    )
+                data_items = []
+            await send(message)
 
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive_body, send_with_sources)
 
-    async def _receive(self, body: bytes):
-        return {"type": "http.request", "body": body, "more_body": False}
 
+app.add_middleware(ChatCompletionMiddleware)
 
-app.add_middleware(PipelineMiddleware)
 
+from urllib.parse import urlencode, parse_qs
 
-from urllib.parse import urlencode, parse_qs, urlparse
 
+class RedirectMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-class RedirectMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         # Check if the request is a GET request
-        if request.method == "GET":
-            path = request.url.path
-            query_params = dict(parse_qs(urlparse(str(request.url)).query))
+        if scope["type"] == "http" and scope["method"] == "GET":
+            path = scope["path"]
+            query_params = parse_qs(scope["query_string"].decode("latin-1"))
 
             # Check for the specific watch path and the presence of 'v' parameter
             if path.endswith("/watch") and "v" in query_params:
                 video_id = query_params["v"][0]  # Extract the first 'v' parameter
                 encoded_video_id = urlencode({"youtube": video_id})
                 redirect_url = f"/?{encoded_video_id}"
-                return RedirectResponse(url=redirect_url)
+                response = RedirectResponse(url=redirect_url)
+                await response(scope, receive, send)
+                return
 
         # Proceed with the normal flow of other requests
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
 
 
 # Add the middleware to the app
@@ -975,48 +921,75 @@ app.add_middleware(
 app.add_middleware(SecurityHeadersMiddleware)
 
 
-@app.middleware("http")
-async def commit_session_after_request(request: Request, call_next):
-    response = await call_next(request)
-    # log.debug("Commit session after request")
-    Session.commit()
-    return response
-
-
-@app.middleware("http")
-async def check_url(request: Request, call_next):
-    start_time = int(time.time())
-    request.state.enable_api_key = webui_app.state.config.ENABLE_API_KEY
-    response = await call_next(request)
-    process_time = int(time.time()) - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
-
-
-@app.middleware("http")
-async def update_embedding_function(request: Request, call_next):
-    response = await call_next(request)
-    if "/embedding/update" in request.url.path:
-        webui_app.state.EMBEDDING_FUNCTION = retrieval_app.state.EMBEDDING_FUNCTION
-    return response
-
-
-@app.middleware("http")
-async def inspect_websocket(request: Request, call_next):
-    if (
-        "/ws/socket.io" in request.url.path
-        and request.query_params.get("transport") == "websocket"
-    ):
-        upgrade = (request.headers.get("Upgrade") or "").lower()
-        connection = (request.headers.get("Connection") or "").lower().split(",")
-        # Check that there's the correct headers for an upgrade, else reject the connection
-        # This is to work around this upstream issue: https://github.com/miguelgrinberg/python-engineio/issues/367
-        if upgrade != "websocket" or "upgrade" not in connection:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={"detail": "Invalid WebSocket upgrade request"},
-            )
-    return await call_next(request)
+# The middlewares below are plain ASGI, unlike BaseHTTPMiddleware they don't
+# add a task and a queue hop to every chunk of a streamed response
+
+
+class CheckUrlMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = int(time.time())
+        scope.setdefault("state", {})[
+            "enable_api_key"
+        ] = webui_app.state.config.ENABLE_API_KEY
+
+        async def send_with_process_time(message):
+            if message["type"] == "http.response.start":
+                process_time = int(time.time()) - start_time
+                MutableHeaders(scope=message)["X-Process-Time"] = str(process_time)
+            await send(message)
+
+        await self.app(scope, receive, send_with_process_time)
+
+
+app.add_middleware(CheckUrlMiddleware)
+
+
+class UpdateEmbeddingFunctionMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.app(scope, receive, send)
+        if scope["type"] == "http" and "/embedding/update" in scope["path"]:
+            webui_app.state.EMBEDDING_FUNCTION = retrieval_app.state.EMBEDDING_FUNCTION
+
+
+app.add_middleware(UpdateEmbeddingFunctionMiddleware)
+
+
+class InspectWebSocketMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and "/ws/socket.io" in scope["path"]:
+            request = Request(scope)
+            if request.query_params.get("transport") == "websocket":
+                upgrade = (request.headers.get("Upgrade") or "").lower()
+                connection = (
+                    (request.headers.get("Connection") or "").lower().split(",")
+                )
+                # Check that there's the correct headers for an upgrade, else reject the connection
+                # This is to work around this upstream issue: https://github.com/miguelgrinberg/python-engineio/issues/367
+                if upgrade != "websocket" or "upgrade" not in connection:
+                    response = JSONResponse(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        content={"detail": "Invalid WebSocket upgrade request"},
+                    )
+                    await response(scope, receive, send)
+                    return
+
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(InspectWebSocketMiddleware)
 
 
 app.mount("/ws", socket_app)
@@ -1037,12 +1010,13 @@ async def get_all_base_models():
     openai_models = []
     ollama_models = []
 
+    # MODEL_REGISTRY caches the result, skip the proxies' short lived caches
     if app.state.config.ENABLE_OPENAI_API:
-        openai_models = await get_openai_models()
+        openai_models = await get_openai_models(cache_read=False)
         openai_models = openai_models["data"]
 
     if app.state.config.ENABLE_OLLAMA_API:
-        ollama_models = await get_ollama_models()
+        ollama_models = await get_ollama_models(cache_read=False)
         ollama_models = [
             {
                 "id": model["model"],
@@ -1061,23 +1035,28 @@ async def get_all_base_models():
     return models
 
 
-@cached(ttl=3)
 async def get_all_models():
-    models = await get_all_base_models()
+    return await MODEL_REGISTRY.get_models()
+
+
+async def compose_models(models: list) -> list:
+    # Applies custom models and actions to the base models, see MODEL_REGISTRY
 
     # If there are no models, return an empty list
     if len([model for model in models if not model.get("arena", False)]) == 0:
         return []
 
     global_action_ids = [
-        function.id for function in Functions.get_global_action_functions()
+        function.id for function in await Functions.get_global_action_functions_async()
     ]
     enabled_action_ids = [
         function.id
-        for function in Functions.get_functions_by_type("action", active_only=True)
+        for function in await Functions.get_functions_by_type_async(
+            "action", active_only=True
+        )
     ]
 
-    custom_models = Models.get_all_models()
+    custom_models = await Models.get_all_models_async()
     for custom_model in custom_models:
         if custom_model.base_model_id is None:
             for model in models:
@@ -1161,12 +1140,15 @@ async def get_all_models():
                 }
             ]
 
-    def get_function_module_by_id(function_id):
+    async def get_function_module_by_id(function_id):
         if function_id in webui_app.state.FUNCTIONS:
             function_module = webui_app.state.FUNCTIONS[function_id]
         else:
-            function_module, _, _ = load_function_module_by_id(function_id)
+            function_module, _, _ = await asyncio.to_thread(
+                load_function_module_by_id, function_id
+            )
             webui_app.state.FUNCTIONS[function_id] = function_module
+        return function_module
 
     for model in models:
         action_ids = [
@@ -1177,15 +1159,15 @@ async def get_all_models():
 
         model["actions"] = []
         for action_id in action_ids:
-            action_function = Functions.get_function_by_id(action_id)
+            action_function = await Functions.get_function_by_id_async(action_id)
             if action_function is None:
                 raise Exception(f"Action not found: {action_id}")
 
-            function_module = get_function_module_by_id(action_id)
+            function_module = await get_function_module_by_id(action_id)
             model["actions"].extend(
                 get_action_items_from_module(action_function, function_module)
             )
-    log.debug(f"get_all_models() returned {len(models)} models")
+    log.debug(f"compose_models() returned {len(models)} models")
 
     return models
 
@@ -1211,6 +1193,7 @@ async def get_models(user=Depends(get_verified_user)):
 
     # Filter out models that the user does not have access to
     if user.role == "user":
+        model_ids = ACCESS_CONTROL_INDEX.get_accessible_model_ids(user.id)
         filtered_models = []
         for model in models:
             if model.get("arena"):
@@ -1224,12 +1207,8 @@ async def get_models(user=Depends(get_verified_user)):
                     filtered_models.append(model)
                 continue
 
-            model_info = Models.get_model_by_id(model["id"])
-            if model_info:
-                if user.id == model_info.user_id or has_access(
-                    user.id, type="read", access_control=model_info.access_control
-                ):
-                    filtered_models.append(model)
+            if model["id"] in model_ids:
+                filtered_models.append(model)
         models = filtered_models
 
     log.debug(
@@ -1249,11 +1228,26 @@ async def get_base_models(user=Depends(get_admin_user)):
 
 
 @app.post("/api/chat/completions")
+async def chat_completions(request: Request, user=Depends(get_verified_user)):
+    context = getattr(request.state, "chat_completion", None)
+    if context is None:
+        return await generate_chat_completions(await request.json(), user)
+
+    # Access was already checked when the request was pre-processed
+    return await generate_chat_completions(
+        context.body, user, bypass_filter=True, models=context.models
+    )
+
+
 async def generate_chat_completions(
-    form_data: dict, user=Depends(get_verified_user), bypass_filter: bool = False
+    form_data: dict,
+    user: UserModel,
+    bypass_filter: bool = False,
+    models: Optional[dict] = None,
 ):
-    model_list = await get_all_models()
-    models = {model["id"]: model for model in model_list}
+    if models is None:
+        model_list = await get_all_models()
+        models = {model["id"]: model for model in model_list}
 
     model_id = form_data["model"]
     if model_id not in models:
@@ -1279,18 +1273,12 @@ async def generate_chat_completions(
                     detail="Model not found",
                 )
         else:
-            model_info = Models.get_model_by_id(model_id)
-            if not model_info:
+            if not ACCESS_CONTROL_INDEX.get_model(model_id):
                 raise HTTPException(
                     status_code=404,
                     detail="Model not found",
                 )
-            elif not (
-                user.id == model_info.user_id
-                or has_access(
-                    user.id, type="read", access_control=model_info.access_control
-                )
-            ):
+            elif model_id not in ACCESS_CONTROL_INDEX.get_accessible_model_ids(user.id):
                 raise HTTPException(
                     status_code=403,
                     detail="Model not found",
@@ -1302,7 +1290,7 @@ async def generate_chat_completions(
         if model_ids and filter_mode == "exclude":
             model_ids = [
                 model["id"]
-                for model in await get_all_models()
+                for model in models.values()
                 if model.get("owned_by") != "arena" and model["id"] not in model_ids
             ]
 
@@ -1312,7 +1300,7 @@ async def generate_chat_completions(
         else:
             model_ids = [
                 model["id"]
-                for model in await get_all_models()
+                for model in models.values()
                 if model.get("owned_by") != "arena"
             ]
             selected_model_id = random.choice(model_ids)
@@ -1327,7 +1315,7 @@ async def generate_chat_completions(
                     yield chunk
 
             response = await generate_chat_completions(
-                form_data, user, bypass_filter=True
+                form_data, user, bypass_filter=True, models=models
             )
             return StreamingResponse(
                 stream_wrapper(response.body_iterator), media_type="text/event-stream"
@@ -1335,7 +1323,9 @@ async def generate_chat_completions(
         else:
             return {
                 **(
-                    await generate_chat_completions(form_data, user, bypass_filter=True)
+                    await generate_chat_completions(
+                        form_data, user, bypass_filter=True, models=models
+                    )
                 ),
                 "selected_model_id": selected_model_id,
             }
@@ -1444,93 +1434,22 @@ async def chat_completed(form_data: dict, user=Depends(get_verified_user)):
         }
     )
 
-    def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None and hasattr(function, "valves"):
-            # TODO: Fix FunctionModel to include vavles
-            return (function.valves if function.valves else {}).get("priority", 0)
-        return 0
-
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
-    if "info" in model and "meta" in model["info"]:
-        filter_ids.extend(model["info"]["meta"].get("filterIds", []))
-        filter_ids = list(set(filter_ids))
-
-    enabled_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
-    filter_ids = [
-        filter_id for filter_id in filter_ids if filter_id in enabled_filter_ids
-    ]
-
-    # Sort filter_ids by priority, using the get_priority function
-    filter_ids.sort(key=get_priority)
-
-    for filter_id in filter_ids:
-        filter = Functions.get_function_by_id(filter_id)
-        if not filter:
-            continue
-
-        if filter_id in webui_app.state.FUNCTIONS:
-            function_module = webui_app.state.FUNCTIONS[filter_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(filter_id)
-            webui_app.state.FUNCTIONS[filter_id] = function_module
-
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
+    params = {
+        "__model__": model,
+        "__event_emitter__": __event_emitter__,
+        "__event_call__": __event_call__,
+        "__user__": {
+            "id": user.id,
+            "email": user.email,
+            "name": user.name,
+            "role": user.role,
+        },
+    }
 
-        if not hasattr(function_module, "outlet"):
-            continue
+    chain = await FILTER_CHAINS.get_chain(model)
+    for filter in chain.get_filters("outlet"):
         try:
-            outlet = function_module.outlet
-
-            # Get the signature of the function
-            sig = inspect.signature(outlet)
-            params = {"body": data}
-
-            # Extra parameters to be passed to the function
-            extra_params = {
-                "__model__": model,
-                "__id__": filter_id,
-                "__event_emitter__": __event_emitter__,
-                "__event_call__": __event_call__,
-            }
-
-            # Add extra params in contained in function signature
-            for key, value in extra_params.items():
-                if key in sig.parameters:
-                    params[key] = value
-
-            if "__user__" in sig.parameters:
-                __user__ = {
-                    "id": user.id,
-                    "email": user.email,
-                    "name": user.name,
-                    "role": user.role,
-                }
-
-                try:
-                    if hasattr(function_module, "UserValves"):
-                        __user__["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, user.id
-                            )
-                        )
-                except Exception as e:
-                    print(e)
-
-                params = {**params, "__user__": __user__}
-
-            if inspect.iscoroutinefunction(outlet):
-                data = await outlet(**params)
-            else:
-                data = outlet(**params)
-
+            data = await filter.call("outlet", data, params, user)
         except Exception as e:
             print(f"Error: {e}")
             return JSONResponse(
@@ -1548,7 +1467,7 @@ async def chat_action(action_id: str, form_data: dict, user=Depends(get_verified
     else:
         sub_action_id = None
 
-    action = Functions.get_function_by_id(action_id)
+    action = await Functions.get_function_by_id_async(action_id)
     if not action:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1586,11 +1505,13 @@ async def chat_action(action_id: str, form_data: dict, user=Depends(get_verified
     if action_id in webui_app.state.FUNCTIONS:
         function_module = webui_app.state.FUNCTIONS[action_id]
     else:
-        function_module, _, _ = load_function_module_by_id(action_id)
+        function_module, _, _ = await asyncio.to_thread(
+            load_function_module_by_id, action_id
+        )
         webui_app.state.FUNCTIONS[action_id] = function_module
 
     if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-        valves = Functions.get_function_valves_by_id(action_id)
+        valves = await Functions.get_function_valves_by_id_async(action_id)
         function_module.valves = function_module.Valves(**(valves if valves else {}))
 
     if hasattr(function_module, "action"):
@@ -1634,10 +1555,7 @@ async def chat_action(action_id: str, form_data: dict, user=Depends(get_verified
 
                 params = {**params, "__user__": __user__}
 
-            if inspect.iscoroutinefunction(action):
-                data = await action(**params)
-            else:
-                data = action(**params)
+            data = await FUNCTION_EXECUTOR.call(action_id, action, **params)
 
         except Exception as e:
             print(f"Error: {e}")
@@ -2186,6 +2104,7 @@ async def upload_pipeline(
 
         r.raise_for_status()
         data = r.json()
+        MODEL_REGISTRY.invalidate(base=True)
 
         return {**data}
     except Exception as e:
@@ -2234,6 +2153,7 @@ async def add_pipeline(form_data: AddPipelineForm, user=Depends(get_admin_user))
 
         r.raise_for_status()
         data = r.json()
+        MODEL_REGISTRY.invalidate(base=True)
 
         return {**data}
     except Exception as e:
@@ -2276,6 +2196,7 @@ async def delete_pipeline(form_data: DeletePipelineForm, user=Depends(get_admin_
 
         r.raise_for_status()
         data = r.json()
+        MODEL_REGISTRY.invalidate(base=True)
 
         return {**data}
     except Exception as e:
@@ -2426,6 +2347,7 @@ async def update_pipeline_valves(
 
         r.raise_for_status()
         data = r.json()
+        MODEL_REGISTRY.invalidate(base=True)
 
         return {**data}
     except Exception as e:
@@ -2469,7 +2391,7 @@ async def get_app_config(request: Request):
                 detail="Invalid token",
             )
         if data is not None and "id" in data:
-            user = Users.get_user_by_id(data["id"])
+            user = await Users.get_user_by_id_async(data["id"])
 
     onboarding = False
     if user is None:
@@ -2534,6 +2456,17 @@ async def get_app_config(request: Request):
     }
 
 
+@app.get("/api/connections/stats")
+async def get_connection_pool_stats(user=Depends(get_admin_user)):
+    return {
+        "sessions": SESSION_POOL.stats(),
+        "ollama_balancer": OLLAMA_BALANCER.stats(),
+        "database": {
+            name: metrics.stats() for name, metrics in DB_POOL_METRICS.items()
+        },
+    }
+
+
 # TODO: webhook endpoint should be under config endpoints
 
 
@@ -2670,7 +2603,8 @@ async def healthcheck():
 
 @app.get("/health/db")
 async def healthcheck_with_db():
-    Session.execute(text("SELECT 1;")).all()
+    with get_db() as db:
+        db.execute(text("SELECT 1;")).all()
     return {"status": True}
 
 
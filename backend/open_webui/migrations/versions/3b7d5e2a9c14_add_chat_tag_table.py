@@ -0,0 +1,93 @@
+"""Add chat tag table
+
+Revision ID: 3b7d5e2a9c14
+Revises: e91f3a6c0d27
+Create Date: 2024-11-27 10:00:00.000000
+
+"""
+
+import json
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+revision = "3b7d5e2a9c14"
+down_revision = "e91f3a6c0d27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    chat_tag = op.create_table(
+        "chat_tag",
+        sa.Column("chat_id", sa.Text(), nullable=False),
+        sa.Column("tag_id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "tag_id"),
+    )
+    op.create_index("chat_tag_user_id_tag_id_idx", "chat_tag", ["user_id", "tag_id"])
+    op.add_column(
+        "tag",
+        sa.Column("chat_count", sa.BigInteger(), nullable=True, server_default="0"),
+    )
+
+    # Copy the tags out of the chat.meta JSON column
+    chat = table(
+        "chat",
+        column("id", sa.Text()),
+        column("user_id", sa.Text()),
+        column("archived", sa.Boolean()),
+        column("meta", sa.JSON()),
+    )
+    tag = table(
+        "tag",
+        column("id", sa.Text()),
+        column("user_id", sa.Text()),
+        column("chat_count", sa.BigInteger()),
+    )
+
+    conn = op.get_bind()
+    now = int(time.time())
+    rows = []
+    counts = {}
+    for chat_id, user_id, archived, meta in conn.execute(
+        sa.select(chat.c.id, chat.c.user_id, chat.c.archived, chat.c.meta)
+    ):
+        if isinstance(meta, str):
+            meta = json.loads(meta)
+
+        tag_ids = dict.fromkeys(
+            tag_id.replace(" ", "_").lower()
+            for tag_id in (meta or {}).get("tags", [])
+            if isinstance(tag_id, str)
+        )
+        for tag_id in tag_ids:
+            rows.append(
+                {
+                    "chat_id": chat_id,
+                    "tag_id": tag_id,
+                    "user_id": user_id,
+                    "created_at": now,
+                }
+            )
+            if not archived:
+                counts[(user_id, tag_id)] = counts.get((user_id, tag_id), 0) + 1
+
+    if rows:
+        op.bulk_insert(chat_tag, rows)
+
+    for (user_id, tag_id), count in counts.items():
+        conn.execute(
+            tag.update()
+            .where(tag.c.id == tag_id, tag.c.user_id == user_id)
+            .values(chat_count=count)
+        )
+
+
+def downgrade():
+    op.drop_column("tag", "chat_count")
+    op.drop_index("chat_tag_user_id_tag_id_idx", table_name="chat_tag")
+    op.drop_table("chat_tag")
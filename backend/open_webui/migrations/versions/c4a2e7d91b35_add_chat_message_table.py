@@ -0,0 +1,161 @@
+"""Add chat message table
+
+Revision ID: c4a2e7d91b35
+Revises: 8d1c6b3e4f20
+Create Date: 2024-11-25 10:00:00.000000
+
+"""
+
+import json
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+revision = "c4a2e7d91b35"
+down_revision = "8d1c6b3e4f20"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 100
+
+chat = table(
+    "chat",
+    column("id", sa.Text()),
+    column("chat", sa.JSON()),
+)
+
+
+def get_batches(conn):
+    ids = [row[0] for row in conn.execute(sa.select(chat.c.id))]
+    for i in range(0, len(ids), BATCH_SIZE):
+        yield conn.execute(
+            sa.select(chat.c.id, chat.c.chat).where(
+                chat.c.id.in_(ids[i : i + BATCH_SIZE])
+            )
+        ).all()
+
+
+def upgrade():
+    chat_message = op.create_table(
+        "chat_message",
+        sa.Column("chat_id", sa.Text(), nullable=False),
+        sa.Column("id", sa.Text(), nullable=False),
+        sa.Column("parent_id", sa.Text(), nullable=True),
+        sa.Column("role", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("position", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "id"),
+    )
+    op.create_index(
+        "chat_message_chat_id_position_idx", "chat_message", ["chat_id", "position"]
+    )
+
+    # Move history.messages of every chat into chat_message, the chat column
+    # keeps the rest of the document
+    conn = op.get_bind()
+    now = int(time.time())
+    for batch in get_batches(conn):
+        rows = []
+        for chat_id, data in batch:
+            if isinstance(data, str):
+                data = json.loads(data)
+
+            history = (data or {}).get("history")
+            if not isinstance(history, dict) or not isinstance(
+                history.get("messages"), dict
+            ):
+                continue
+
+            for position, (id, message) in enumerate(history["messages"].items()):
+                content = message.get("content")
+                timestamp = message.get("timestamp")
+                rows.append(
+                    {
+                        "chat_id": chat_id,
+                        "id": id,
+                        "parent_id": message.get("parentId"),
+                        "role": message.get("role"),
+                        "content": (
+                            content
+                            if isinstance(content, str) or content is None
+                            else json.dumps(content)
+                        ),
+                        "data": message,
+                        "position": position,
+                        "created_at": timestamp if isinstance(timestamp, int) else now,
+                        "updated_at": now,
+                    }
+                )
+
+            conn.execute(
+                chat.update()
+                .where(chat.c.id == chat_id)
+                .values(
+                    chat={
+                        **{k: v for k, v in data.items() if k != "messages"},
+                        "history": {
+                            k: v for k, v in history.items() if k != "messages"
+                        },
+                    }
+                )
+            )
+
+        if rows:
+            op.bulk_insert(chat_message, rows)
+
+
+def downgrade():
+    chat_message = table(
+        "chat_message",
+        column("chat_id", sa.Text()),
+        column("id", sa.Text()),
+        column("data", sa.JSON()),
+        column("position", sa.BigInteger()),
+    )
+
+    conn = op.get_bind()
+    for batch in get_batches(conn):
+        for chat_id, data in batch:
+            if isinstance(data, str):
+                data = json.loads(data)
+
+            history = (data or {}).get("history")
+            if not isinstance(history, dict) or "messages" in history:
+                continue
+
+            messages = {}
+            for id, message in conn.execute(
+                sa.select(chat_message.c.id, chat_message.c.data)
+                .where(chat_message.c.chat_id == chat_id)
+                .order_by(chat_message.c.position)
+            ):
+                messages[id] = (
+                    json.loads(message) if isinstance(message, str) else message
+                )
+
+            # The selected branch, from the root down to the current message
+            message_list = []
+            message_id = history.get("currentId")
+            while message_id in messages and len(message_list) < len(messages):
+                message_list.insert(0, messages[message_id])
+                message_id = messages[message_id].get("parentId")
+
+            conn.execute(
+                chat.update()
+                .where(chat.c.id == chat_id)
+                .values(
+                    chat={
+                        **data,
+                        "history": {**history, "messages": messages},
+                        "messages": message_list,
+                    }
+                )
+            )
+
+    op.drop_index("chat_message_chat_id_position_idx", table_name="chat_message")
+    op.drop_table("chat_message")
@@ -0,0 +1,162 @@
+"""Add chat search index
+
+Revision ID: e91f3a6c0d27
+Revises: c4a2e7d91b35
+Create Date: 2024-11-26 10:00:00.000000
+
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "e91f3a6c0d27"
+down_revision = "c4a2e7d91b35"
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger(__name__)
+
+# chat_fts holds one row per message and one per chat title (message_id ''),
+# with the chat's user id indexed as a single token ('u' and its hex) so a
+# search only reads the postings of the user's own rows. chat_fts_row maps
+# them back to their fts rowid for updates and deletes
+SQLITE_UPGRADE = [
+    """
+    CREATE TABLE chat_fts_row (
+        chat_id TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        fts_rowid INTEGER NOT NULL,
+        PRIMARY KEY (chat_id, message_id)
+    )
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_insert AFTER INSERT ON chat_message BEGIN
+        INSERT INTO chat_fts (user_id, chat_id, message_id, content)
+        VALUES (
+            (SELECT 'u' || hex(user_id) FROM chat WHERE id = new.chat_id),
+            new.chat_id,
+            new.id,
+            new.content
+        );
+        INSERT INTO chat_fts_row (chat_id, message_id, fts_rowid)
+        VALUES (new.chat_id, new.id, last_insert_rowid());
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_update AFTER UPDATE OF content ON chat_message BEGIN
+        UPDATE chat_fts SET content = new.content WHERE rowid = (
+            SELECT fts_rowid FROM chat_fts_row
+            WHERE chat_id = old.chat_id AND message_id = old.id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_delete AFTER DELETE ON chat_message BEGIN
+        DELETE FROM chat_fts WHERE rowid = (
+            SELECT fts_rowid FROM chat_fts_row
+            WHERE chat_id = old.chat_id AND message_id = old.id
+        );
+        DELETE FROM chat_fts_row WHERE chat_id = old.chat_id AND message_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER chat_fts_insert AFTER INSERT ON chat BEGIN
+        INSERT INTO chat_fts (user_id, chat_id, message_id, content)
+        VALUES ('u' || hex(new.user_id), new.id, '', new.title);
+        INSERT INTO chat_fts_row (chat_id, message_id, fts_rowid)
+        VALUES (new.id, '', last_insert_rowid());
+    END
+    """,
+    """
+    CREATE TRIGGER chat_fts_update AFTER UPDATE OF title ON chat BEGIN
+        UPDATE chat_fts SET content = new.title WHERE rowid = (
+            SELECT fts_rowid FROM chat_fts_row
+            WHERE chat_id = old.id AND message_id = ''
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER chat_fts_delete AFTER DELETE ON chat BEGIN
+        DELETE FROM chat_fts WHERE rowid = (
+            SELECT fts_rowid FROM chat_fts_row
+            WHERE chat_id = old.id AND message_id = ''
+        );
+        DELETE FROM chat_fts_row WHERE chat_id = old.id AND message_id = '';
+    END
+    """,
+    """
+    INSERT INTO chat_fts (user_id, chat_id, message_id, content)
+    SELECT 'u' || hex(chat.user_id), chat_message.chat_id, chat_message.id,
+        chat_message.content
+    FROM chat_message JOIN chat ON chat.id = chat_message.chat_id
+    """,
+    """
+    INSERT INTO chat_fts (user_id, chat_id, message_id, content)
+    SELECT 'u' || hex(user_id), id, '', title FROM chat
+    """,
+    """
+    INSERT INTO chat_fts_row (chat_id, message_id, fts_rowid)
+    SELECT chat_id, message_id, rowid FROM chat_fts
+    """,
+]
+
+# Input is capped to stay below the 1MB tsvector limit
+POSTGRESQL_UPGRADE = [
+    """
+    ALTER TABLE chat_message ADD COLUMN content_tsv tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', left(coalesce(content, ''), 262144))
+    ) STORED
+    """,
+    "CREATE INDEX chat_message_content_tsv_idx ON chat_message USING GIN (content_tsv)",
+    """
+    ALTER TABLE chat ADD COLUMN title_tsv tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', coalesce(title, ''))
+    ) STORED
+    """,
+    "CREATE INDEX chat_title_tsv_idx ON chat USING GIN (title_tsv)",
+]
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == "sqlite":
+        try:
+            op.execute(
+                "CREATE VIRTUAL TABLE chat_fts USING fts5("
+                "user_id, chat_id UNINDEXED, message_id UNINDEXED, content, "
+                "prefix='2 3')"
+            )
+        except sa.exc.OperationalError as e:
+            log.warning(f"SQLite without FTS5, chats are searched in memory: {e}")
+            return
+
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+    elif conn.dialect.name == "postgresql":
+        for statement in POSTGRESQL_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == "sqlite":
+        for trigger in [
+            "chat_message_fts_insert",
+            "chat_message_fts_update",
+            "chat_message_fts_delete",
+            "chat_fts_insert",
+            "chat_fts_update",
+            "chat_fts_delete",
+        ]:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS chat_fts_row")
+        op.execute("DROP TABLE IF EXISTS chat_fts")
+
+    elif conn.dialect.name == "postgresql":
+        op.drop_index("chat_title_tsv_idx", table_name="chat")
+        op.drop_column("chat", "title_tsv")
+        op.drop_index("chat_message_content_tsv_idx", table_name="chat_message")
+        op.drop_column("chat_message", "content_tsv")
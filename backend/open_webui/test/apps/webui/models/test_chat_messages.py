@@ -0,0 +1,265 @@
+import json
+
+from test.util.abstract_integration_test import AbstractPostgresTest
+
+
+def get_history(current_id="2"):
+    return {
+        "currentId": current_id,
+        "messages": {
+            "1": {
+                "id": "1",
+                "parentId": None,
+                "childrenIds": ["2"],
+                "role": "user",
+                "content": "How do I sort a list in python?",
+                "timestamp": 1700000000,
+            },
+            "2": {
+                "id": "2",
+                "parentId": "1",
+                "childrenIds": [],
+                "role": "assistant",
+                "content": "Use sorted(items).",
+                "timestamp": 1700000001,
+            },
+        },
+    }
+
+
+def get_alembic_config():
+    from alembic.config import Config
+    from open_webui.env import OPEN_WEBUI_DIR
+
+    alembic_cfg = Config(OPEN_WEBUI_DIR / "alembic.ini")
+    alembic_cfg.set_main_option("script_location", str(OPEN_WEBUI_DIR / "migrations"))
+    return alembic_cfg
+
+
+class TestChatMessages(AbstractPostgresTest):
+    BASE_PATH = "/api/v1/chats"
+
+    def setup_method(self):
+        super().setup_method()
+        from open_webui.apps.webui.models.chats import ChatForm, Chats
+
+        self.chats = Chats
+        self.chat = self.chats.insert_new_chat(
+            "2",
+            ChatForm(
+                chat={"title": "Sorting", "models": ["m"], "history": get_history()}
+            ),
+        )
+
+    def get_message_rows(self, chat_id):
+        from open_webui.apps.webui.internal.db import get_db
+        from open_webui.apps.webui.models.chats import ChatMessage
+
+        with get_db() as db:
+            return {
+                message.id: message
+                for message in db.query(ChatMessage).filter_by(chat_id=chat_id).all()
+            }
+
+    def test_chat_round_trip(self):
+        chat = self.chats.get_chat_by_id(self.chat.id).chat
+
+        assert chat["title"] == "Sorting"
+        assert chat["models"] == ["m"]
+        assert chat["history"] == get_history()
+        assert [message["id"] for message in chat["messages"]] == ["1", "2"]
+
+        rows = self.get_message_rows(self.chat.id)
+        assert set(rows) == {"1", "2"}
+        assert rows["2"].parent_id == "1"
+        assert rows["2"].role == "assistant"
+        assert rows["2"].content == "Use sorted(items)."
+        assert rows["1"].position < rows["2"].position
+
+    def test_update_chat_writes_changed_messages(self):
+        from open_webui.apps.webui.internal.db import get_db
+        from open_webui.apps.webui.models.chats import ChatMessage
+
+        with get_db() as db:
+            db.query(ChatMessage).filter_by(chat_id=self.chat.id).update(
+                {"updated_at": 0}
+            )
+            db.commit()
+
+        history = get_history(current_id="3")
+        history["messages"]["2"]["content"] = "Use items.sort()."
+        history["messages"]["2"]["childrenIds"] = ["3"]
+        history["messages"]["3"] = {
+            "id": "3",
+            "parentId": "2",
+            "childrenIds": [],
+            "role": "user",
+            "content": "Thanks",
+        }
+        self.chats.update_chat_by_id(
+            self.chat.id, {"title": "Sorting", "history": history}
+        )
+
+        rows = self.get_message_rows(self.chat.id)
+        assert set(rows) == {"1", "2", "3"}
+        assert rows["1"].updated_at == 0
+        assert rows["2"].updated_at > 0
+        assert rows["2"].content == "Use items.sort()."
+        assert rows["3"].position > rows["2"].position
+
+        # Messages missing from the history are deleted
+        del history["messages"]["3"]
+        history["messages"]["2"]["childrenIds"] = []
+        history["currentId"] = "2"
+        self.chats.update_chat_by_id(
+            self.chat.id, {"title": "Sorting", "history": history}
+        )
+
+        assert set(self.get_message_rows(self.chat.id)) == {"1", "2"}
+        assert self.chats.get_chat_by_id(self.chat.id).chat["history"] == history
+
+    def test_append_message(self):
+        message = {
+            "id": "3",
+            "parentId": "2",
+            "childrenIds": [],
+            "role": "user",
+            "content": "And in reverse?",
+        }
+        assert (
+            self.chats.append_message_by_chat_id_and_user_id(self.chat.id, "2", message)
+            == message
+        )
+
+        chat = self.chats.get_chat_by_id(self.chat.id).chat
+        assert chat["history"]["currentId"] == "3"
+        assert chat["history"]["messages"]["2"]["childrenIds"] == ["3"]
+        assert [message["id"] for message in chat["messages"]] == ["1", "2", "3"]
+
+        # Appending the same message again doesn't duplicate the child
+        self.chats.append_message_by_chat_id_and_user_id(self.chat.id, "2", message)
+        chat = self.chats.get_chat_by_id(self.chat.id).chat
+        assert chat["history"]["messages"]["2"]["childrenIds"] == ["3"]
+        assert len(chat["history"]["messages"]) == 3
+
+        # Other users can't append
+        assert (
+            self.chats.append_message_by_chat_id_and_user_id(
+                self.chat.id, "3", {**message, "id": "4"}
+            )
+            is None
+        )
+
+    def test_patch_message(self):
+        message = self.chats.patch_message_by_chat_id_and_user_id(
+            self.chat.id, "2", "2", {"content": "Use sorted(items, reverse=True)."}
+        )
+        assert message["content"] == "Use sorted(items, reverse=True)."
+        assert message["parentId"] == "1"
+
+        chat = self.chats.get_chat_by_id(self.chat.id).chat
+        assert chat["history"]["messages"]["2"] == message
+        assert self.get_message_rows(self.chat.id)["2"].content == message["content"]
+
+        assert (
+            self.chats.patch_message_by_chat_id_and_user_id(
+                self.chat.id, "2", "unknown", {"content": ""}
+            )
+            is None
+        )
+
+    def test_get_messages_paging(self):
+        for idx in range(3, 8):
+            self.chats.append_message_by_chat_id_and_user_id(
+                self.chat.id,
+                "2",
+                {"id": str(idx), "parentId": str(idx - 1), "content": str(idx)},
+            )
+
+        messages = self.chats.get_messages_by_chat_id_and_user_id(self.chat.id, "2")
+        assert [message["id"] for message in messages] == [
+            str(idx) for idx in range(1, 8)
+        ]
+
+        messages = self.chats.get_messages_by_chat_id_and_user_id(
+            self.chat.id, "2", skip=2, limit=3
+        )
+        assert [message["id"] for message in messages] == ["3", "4", "5"]
+
+        assert self.chats.get_messages_by_chat_id_and_user_id(self.chat.id, "3") is None
+
+    def test_delete_chat_deletes_messages_and_tags(self):
+        from open_webui.apps.webui.internal.db import get_db
+        from open_webui.apps.webui.models.chats import ChatTag
+
+        self.chats.add_chat_tag_by_id_and_user_id_and_tag_name(
+            self.chat.id, "2", "Python"
+        )
+        assert self.chats.count_chats_by_tag_name_and_user_id("Python", "2") == 1
+
+        assert self.chats.delete_chat_by_id_and_user_id(self.chat.id, "2")
+
+        assert self.get_message_rows(self.chat.id) == {}
+        with get_db() as db:
+            assert db.query(ChatTag).filter_by(chat_id=self.chat.id).count() == 0
+        assert self.chats.count_chats_by_tag_name_and_user_id("Python", "2") == 0
+
+    def test_chat_message_migration(self):
+        from alembic import command
+        from open_webui.apps.webui.internal.db import get_db
+        from sqlalchemy import text
+
+        alembic_cfg = get_alembic_config()
+
+        # Back to the single chat document
+        command.downgrade(alembic_cfg, "8d1c6b3e4f20")
+        with get_db() as db:
+            chat = db.execute(
+                text("SELECT chat FROM chat WHERE id = :id"), {"id": self.chat.id}
+            ).scalar()
+        chat = chat if isinstance(chat, dict) else json.loads(chat)
+        assert chat["history"] == get_history()
+        assert [message["id"] for message in chat["messages"]] == ["1", "2"]
+
+        # And split into chat_message rows again
+        command.upgrade(alembic_cfg, "head")
+        self.chats.search_backend = None
+
+        rows = self.get_message_rows(self.chat.id)
+        assert set(rows) == {"1", "2"}
+        assert rows["1"].position < rows["2"].position
+        assert self.chats.get_chat_by_id(self.chat.id).chat["history"] == (
+            get_history()
+        )
+
+    def test_search_terms_across_title_and_messages(self):
+        from open_webui.apps.webui.models.chats import ChatForm
+
+        # "sorting" is only in a message, "python" only in the title
+        other = self.chats.insert_new_chat(
+            "2",
+            ChatForm(chat={"title": "Python", "history": get_history()}),
+        )
+        self.chats.update_chat_by_id(
+            other.id,
+            {
+                "title": "Python tips",
+                "history": {
+                    "currentId": "1",
+                    "messages": {"1": {"id": "1", "content": "Sorting dicts"}},
+                },
+            },
+        )
+        # Chats of other users are never returned
+        self.chats.insert_new_chat(
+            "3",
+            ChatForm(chat={"title": "Python sorting", "history": get_history()}),
+        )
+
+        chats = self.chats.get_chats_by_user_id_and_search_text("2", "python sort")
+        assert {chat.id for chat in chats} == {self.chat.id, other.id}
+
+        chats = self.chats.get_chats_by_user_id_and_search_text("2", "dicts python")
+        assert [chat.id for chat in chats] == [other.id]
+
+        assert self.chats.get_chats_by_user_id_and_search_text("2", "python java") == []
@@ -0,0 +1,90 @@
+"""
+Throughput of the Ollama to OpenAI stream conversion, in tokens per second.
+
+    cd backend && PYTHONPATH=. python open_webui/test/benchmarks/ollama_stream.py
+
+Converts a stream of one token per line, read line by line and in reads of
+--read-size bytes, with orjson and with the json module.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from open_webui.utils import response
+
+
+class MockStreamingResponse:
+    def __init__(self, reads: list[bytes]):
+        self.reads = reads
+
+    @property
+    def body_iterator(self):
+        async def iterate():
+            for read in self.reads:
+                yield read
+
+        return iterate()
+
+
+def get_lines(tokens: int) -> list[bytes]:
+    lines = [
+        json.dumps(
+            {
+                "model": "llama3",
+                "created_at": "2024-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": f" token{idx} é"},
+                "done": False,
+            }
+        ).encode("utf-8")
+        + b"\n"
+        for idx in range(tokens)
+    ]
+    lines.append(
+        json.dumps(
+            {"model": "llama3", "message": {"content": ""}, "done": True}
+        ).encode("utf-8")
+        + b"\n"
+    )
+    return lines
+
+
+async def measure(reads: list[bytes], tokens: int, repeat: int) -> float:
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        async for _ in response.convert_streaming_response_ollama_to_openai(
+            MockStreamingResponse(reads), flush_interval=0
+        ):
+            pass
+        best = max(best, tokens / (time.perf_counter() - start))
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=50_000)
+    parser.add_argument("--read-size", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = get_lines(args.tokens)
+    data = b"".join(lines)
+    packed = [
+        data[idx : idx + args.read_size] for idx in range(0, len(data), args.read_size)
+    ]
+
+    orjson = response.orjson
+    for name, module in [("orjson", orjson), ("json", None)]:
+        if name == "orjson" and orjson is None:
+            continue
+        response.orjson = module
+        for reads_name, reads in [("line reads", lines), ("packed reads", packed)]:
+            rate = await measure(reads, args.tokens, args.repeat)
+            print(f"{name:7} {reads_name:13} {rate:12,.0f} tokens/s")
+    response.orjson = orjson
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -148,6 +148,8 @@ class AbstractPostgresTest(AbstractIntegrationTest):
         tables = [
             "auth",
             "chat",
+            "chat_message",
+            "chat_tag",
             "chatidtag",
             "document",
             "memory",
@@ -0,0 +1,137 @@
+import asyncio
+import json
+from typing import Optional
+
+from open_webui.utils.response import convert_streaming_response_ollama_to_openai
+
+
+class MockStreamingResponse:
+    def __init__(self, reads: list[bytes], delays: Optional[list[float]] = None):
+        self.reads = reads
+        self.delays = delays or [0] * len(reads)
+
+    @property
+    def body_iterator(self):
+        async def iterate():
+            for read, delay in zip(self.reads, self.delays):
+                if delay:
+                    await asyncio.sleep(delay)
+                yield read
+
+        return iterate()
+
+
+def get_lines(contents: list[str]) -> list[bytes]:
+    lines = [
+        json.dumps(
+            {
+                "model": "llama3",
+                "message": {"role": "assistant", "content": content},
+                "done": False,
+            }
+        ).encode("utf-8")
+        + b"\n"
+        for content in contents
+    ]
+    lines.append(
+        json.dumps(
+            {"model": "llama3", "message": {"content": ""}, "done": True}
+        ).encode("utf-8")
+        + b"\n"
+    )
+    return lines
+
+
+def convert(reads: list[bytes], **kwargs) -> list[bytes]:
+    async def collect():
+        return [
+            chunk
+            async for chunk in convert_streaming_response_ollama_to_openai(
+                MockStreamingResponse(reads), **kwargs
+            )
+        ]
+
+    return asyncio.run(collect())
+
+
+def get_events(chunks: list[bytes]) -> list[str]:
+    events = []
+    for chunk in chunks:
+        for event in chunk.decode("utf-8").split("\n\n"):
+            if event:
+                assert event.startswith("data: ")
+                events.append(event[len("data: ") :])
+    return events
+
+
+def get_content(chunks: list[bytes]) -> str:
+    return "".join(
+        json.loads(event)["choices"][0].get("delta", {}).get("content", "")
+        for event in get_events(chunks)[:-2]
+    )
+
+
+CONTENTS = ["Hello", " wörld", " ✓", " 👋"]
+
+
+def test_one_chunk_per_read():
+    chunks = convert(get_lines(CONTENTS))
+    assert len(chunks) == len(CONTENTS) + 2
+    assert get_content(chunks) == "".join(CONTENTS)
+
+
+def test_packed_reads():
+    chunks = convert([b"".join(get_lines(CONTENTS))])
+    # All lines of a read go out as one chunk
+    assert len(chunks) == 3
+    assert get_content(chunks) == "".join(CONTENTS)
+
+
+def test_split_reads():
+    data = b"".join(get_lines(CONTENTS))
+    # Splits lines and the multi-byte characters in them
+    for size in [1, 2, 3, 7]:
+        reads = [data[i : i + size] for i in range(0, len(data), size)]
+        assert get_content(convert(reads)) == "".join(CONTENTS)
+
+
+def test_chunks_share_one_id():
+    events = get_events(convert(get_lines(CONTENTS)))
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert len({chunk["id"] for chunk in chunks}) == 1
+    assert {chunk["model"] for chunk in chunks} == {"llama3"}
+    assert {chunk["object"] for chunk in chunks} == {"chat.completion.chunk"}
+
+
+def test_stop_and_done():
+    events = get_events(convert(get_lines(CONTENTS)))
+    stop = json.loads(events[-2])
+    assert stop["choices"][0]["finish_reason"] == "stop"
+    assert "delta" not in stop["choices"][0]
+    assert events[-1] == "[DONE]"
+
+    # Without a trailing newline the last line is still read
+    data = b"".join(get_lines(CONTENTS)).rstrip(b"\n")
+    assert get_content(convert([data])) == "".join(CONTENTS)
+
+
+def test_flush_interval():
+    lines = get_lines(CONTENTS)
+
+    # Reads within the interval are coalesced
+    chunks = convert(lines, flush_interval=10_000)
+    assert len(chunks) == 3
+    assert get_content(chunks) == "".join(CONTENTS)
+
+    # Held back content is sent when the interval ends, not with the next read
+    async def first_chunk_time():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # The second line only arrives after half a second
+        async for _ in convert_streaming_response_ollama_to_openai(
+            MockStreamingResponse(lines, [0] + [0.5] * (len(lines) - 1)),
+            flush_interval=50,
+        ):
+            return loop.time() - start
+
+    assert asyncio.run(first_chunk_time()) < 0.4
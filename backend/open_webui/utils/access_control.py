@@ -1,6 +1,136 @@
-from typing import Optional, Union, List, Dict, Any
-from open_webui.apps.webui.models.groups import Groups
 import json
+import threading
+import time
+from typing import Optional, Union, List, Dict, Any
+
+from open_webui.env import ACCESS_CONTROL_INDEX_TTL
+
+
+class AccessControlIndex:
+    """
+    In-memory view of group memberships and model grants used by access checks,
+    so filtering a model list is a set lookup instead of a group query per model.
+
+    The group and model snapshots are rebuilt on the first read after a write
+    (the group and model tables invalidate them), and at the latest every
+    ACCESS_CONTROL_INDEX_TTL seconds to pick up writes made by other workers.
+    """
+
+    def __init__(self, ttl: int = 10):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+        # (groups by id, group ids by user id, loaded at)
+        self.groups: Optional[tuple[dict, dict[str, set[str]], float]] = None
+        self.groups_version = 0
+
+        # (models by id, loaded at)
+        self.models: Optional[tuple[dict, float]] = None
+        self.models_version = 0
+
+        # (user id, permission) -> (groups, models, ids of the accessible models)
+        self.accessible_model_ids: dict[tuple[str, str], tuple] = {}
+
+    def is_fresh(self, snapshot: Optional[tuple]) -> bool:
+        return snapshot is not None and time.time() - snapshot[-1] < self.ttl
+
+    def get_groups_snapshot(self) -> tuple[dict, dict[str, set[str]], float]:
+        snapshot = self.groups
+        if self.is_fresh(snapshot):
+            return snapshot
+
+        from open_webui.apps.webui.models.groups import Groups
+
+        with self.lock:
+            snapshot = self.groups
+            if self.is_fresh(snapshot):
+                return snapshot
+
+            version = self.groups_version
+            groups = Groups.get_groups()
+
+            user_group_ids = {}
+            for group in groups:
+                for user_id in group.user_ids:
+                    user_group_ids.setdefault(user_id, set()).add(group.id)
+
+            snapshot = (
+                {group.id: group for group in groups},
+                user_group_ids,
+                time.time(),
+            )
+            # Don't keep a snapshot that raced with a write
+            if version == self.groups_version:
+                self.groups = snapshot
+                self.accessible_model_ids = {}
+            return snapshot
+
+    def get_models_snapshot(self) -> tuple[dict, float]:
+        snapshot = self.models
+        if self.is_fresh(snapshot):
+            return snapshot
+
+        from open_webui.apps.webui.models.models import Models
+
+        with self.lock:
+            snapshot = self.models
+            if self.is_fresh(snapshot):
+                return snapshot
+
+            version = self.models_version
+            snapshot = (
+                {model.id: model for model in Models.get_all_models()},
+                time.time(),
+            )
+            if version == self.models_version:
+                self.models = snapshot
+                self.accessible_model_ids = {}
+            return snapshot
+
+    def get_user_group_ids(self, user_id: str) -> set[str]:
+        return self.get_groups_snapshot()[1].get(user_id, set())
+
+    def get_user_groups(self, user_id: str) -> list:
+        groups, user_group_ids, _ = self.get_groups_snapshot()
+        return [groups[id] for id in user_group_ids.get(user_id, set())]
+
+    def get_model(self, id: str):
+        return self.get_models_snapshot()[0].get(id)
+
+    def get_accessible_model_ids(
+        self, user_id: str, permission: str = "read"
+    ) -> set[str]:
+        groups = self.get_groups_snapshot()
+        models = self.get_models_snapshot()
+
+        # Entries are tied to the snapshots they were computed from, so one
+        # racing with an invalidation is never served afterwards
+        key = (user_id, permission)
+        entry = self.accessible_model_ids.get(key)
+        if entry and entry[0] is groups and entry[1] is models:
+            return entry[2]
+
+        user_group_ids = groups[1].get(user_id, set())
+        model_ids = {
+            id
+            for id, model in models[0].items()
+            if model.user_id == user_id
+            or has_access(user_id, permission, model.access_control, user_group_ids)
+        }
+        self.accessible_model_ids[key] = (groups, models, model_ids)
+        return model_ids
+
+    def invalidate_groups(self):
+        # Not under the lock, writers shouldn't wait for a reload in progress
+        self.groups_version += 1
+        self.groups = None
+
+    def invalidate_models(self):
+        self.models_version += 1
+        self.models = None
+
+
+ACCESS_CONTROL_INDEX = AccessControlIndex(ttl=ACCESS_CONTROL_INDEX_TTL)
 
 
 def get_permissions(
@@ -29,7 +159,7 @@ def get_permissions(
                     permissions[key] = permissions[key] or value
         return permissions
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = ACCESS_CONTROL_INDEX.get_user_groups(user_id)
 
     # deep copy default permissions to avoid modifying the original dict
     permissions = json.loads(json.dumps(default_permissions))
@@ -65,7 +195,7 @@ def has_permission(
     permission_hierarchy = permission_key.split(".")
 
     # Retrieve user group permissions
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = ACCESS_CONTROL_INDEX.get_user_groups(user_id)
 
     for group in user_groups:
         group_permissions = group.permissions
@@ -80,16 +210,20 @@ def has_access(
     user_id: str,
     type: str = "write",
     access_control: Optional[dict] = None,
+    user_group_ids: Optional[set[str]] = None,
 ) -> bool:
     if access_control is None:
         return type == "read"
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
-    user_group_ids = [group.id for group in user_groups]
     permission_access = access_control.get(type, {})
-    permitted_group_ids = permission_access.get("group_ids", [])
     permitted_user_ids = permission_access.get("user_ids", [])
+    if user_id in permitted_user_ids:
+        return True
+
+    permitted_group_ids = permission_access.get("group_ids", [])
+    if not permitted_group_ids:
+        return False
 
-    return user_id in permitted_user_ids or any(
-        group_id in permitted_group_ids for group_id in user_group_ids
-    )
+    if user_group_ids is None:
+        user_group_ids = ACCESS_CONTROL_INDEX.get_user_group_ids(user_id)
+    return not user_group_ids.isdisjoint(permitted_group_ids)
@@ -0,0 +1,117 @@
+import bisect
+import math
+import re
+import time
+from collections import Counter
+
+from open_webui.env import CHAT_SEARCH_INDEX_TTL
+
+TERM_PATTERN = re.compile(r"\w+")
+
+
+def get_search_terms(text: str) -> list[str]:
+    return list(dict.fromkeys(TERM_PATTERN.findall(text.lower())))
+
+
+class ChatSearchIndex:
+    """
+    In-memory inverted index over the chat titles and messages of a user, the
+    chat search fallback for databases without SQLite FTS5 or Postgres
+    full-text search.
+
+    A user's index is built on their first search and dropped whenever one of
+    their chats is written, or CHAT_SEARCH_INDEX_TTL seconds after it was built
+    to pick up writes made by other workers.
+    """
+
+    def __init__(self, ttl: int = 60):
+        self.ttl = ttl
+
+        # user id -> (postings: term -> {chat id: weight}, sorted terms,
+        # number of chats, loaded at)
+        self.indexes: dict[str, tuple[dict, list[str], int, float]] = {}
+        self.versions: dict[str, int] = {}
+
+    def load(self, user_id: str) -> tuple[dict, list[str], int, float]:
+        from open_webui.apps.webui.internal.db import get_db
+        from open_webui.apps.webui.models.chats import Chat, ChatMessage
+
+        postings = {}
+
+        def add(chat_id: str, text: str, weight: int):
+            for term, count in Counter(TERM_PATTERN.findall(text.lower())).items():
+                weights = postings.setdefault(term, {})
+                weights[chat_id] = weights.get(chat_id, 0) + count * weight
+
+        with get_db() as db:
+            chat_count = 0
+            for chat_id, title in db.query(Chat.id, Chat.title).filter_by(
+                user_id=user_id
+            ):
+                add(chat_id, title or "", 2)
+                chat_count += 1
+
+            for chat_id, content in (
+                db.query(ChatMessage.chat_id, ChatMessage.content)
+                .join(Chat, Chat.id == ChatMessage.chat_id)
+                .filter(Chat.user_id == user_id)
+            ):
+                add(chat_id, content or "", 1)
+
+        return (postings, sorted(postings), chat_count, time.time())
+
+    def get_index(self, user_id: str) -> tuple[dict, list[str], int, float]:
+        index = self.indexes.get(user_id)
+        if index is not None and time.time() - index[-1] < self.ttl:
+            return index
+
+        version = self.versions.get(user_id, 0)
+        index = self.load(user_id)
+
+        for id, entry in list(self.indexes.items()):
+            if time.time() - entry[-1] >= self.ttl:
+                self.indexes.pop(id, None)
+        # Don't keep an index that raced with a write
+        if self.versions.get(user_id, 0) == version:
+            self.indexes[user_id] = index
+        return index
+
+    def search(self, user_id: str, terms: list[str]) -> list[str]:
+        """
+        Ids of the user's chats containing every term (as a word prefix), best
+        match first.
+        """
+        postings, vocabulary, chat_count, _ = self.get_index(user_id)
+
+        scores = None
+        for term in terms:
+            term_scores = {}
+            i = bisect.bisect_left(vocabulary, term)
+            while i < len(vocabulary) and vocabulary[i].startswith(term):
+                weights = postings[vocabulary[i]]
+                idf = math.log(1 + chat_count / len(weights))
+                for chat_id, weight in weights.items():
+                    term_scores[chat_id] = (
+                        term_scores.get(chat_id, 0) + (1 + math.log(weight)) * idf
+                    )
+                i += 1
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    chat_id: score + term_scores[chat_id]
+                    for chat_id, score in scores.items()
+                    if chat_id in term_scores
+                }
+            if not scores:
+                return []
+
+        return sorted(scores, key=scores.get, reverse=True) if scores else []
+
+    def invalidate(self, user_id: str):
+        self.versions[user_id] = self.versions.get(user_id, 0) + 1
+        self.indexes.pop(user_id, None)
+
+
+CHAT_SEARCH_INDEX = ChatSearchIndex(ttl=CHAT_SEARCH_INDEX_TTL)
@@ -0,0 +1,175 @@
+import asyncio
+import inspect
+import time
+from typing import Optional
+
+from open_webui.env import FILTER_CHAIN_POLL_INTERVAL
+from open_webui.utils.function_executor import FUNCTION_EXECUTOR
+
+
+class FilterFunction:
+    """
+    A loaded filter function with its valves applied, and the parameter names
+    of its inlet and outlet so calling them needs no introspection.
+    """
+
+    HOOKS = ("inlet", "outlet")
+
+    def __init__(self, id: str, module, valves: Optional[dict] = None):
+        self.id = id
+        self.module = module
+        self.file_handler = getattr(module, "file_handler", None)
+        self.UserValves = getattr(module, "UserValves", None)
+
+        if hasattr(module, "valves") and hasattr(module, "Valves"):
+            module.valves = module.Valves(**(valves if valves else {}))
+        self.priority = (valves if valves else {}).get("priority", 0)
+
+        # hook name -> (callable, parameter names)
+        self.hooks: dict[str, tuple] = {}
+        for name in self.HOOKS:
+            hook = getattr(module, name, None)
+            if hook is not None:
+                self.hooks[name] = (hook, frozenset(inspect.signature(hook).parameters))
+
+    def get_user_valves(self, user):
+        settings = user.settings.model_dump() if user.settings else {}
+        valves = settings.get("functions", {}).get("valves", {}).get(self.id, {})
+        return self.UserValves(**valves)
+
+    async def call(self, name: str, body: dict, params: dict, user=None):
+        hook, parameters = self.hooks[name]
+
+        kwargs = {"body": body} | {
+            k: v for k, v in {**params, "__id__": self.id}.items() if k in parameters
+        }
+
+        if "__user__" in kwargs and self.UserValves is not None and user is not None:
+            try:
+                kwargs["__user__"] = {
+                    **kwargs["__user__"],
+                    "valves": self.get_user_valves(user),
+                }
+            except Exception as e:
+                print(e)
+
+        return await FUNCTION_EXECUTOR.call(self.id, hook, **kwargs)
+
+
+class FilterChain:
+    def __init__(self, filters: list[FilterFunction]):
+        self.filters = filters
+
+        # The last filter declaring a file_handler decides
+        self.skip_files = None
+        for filter in filters:
+            if filter.file_handler is not None:
+                self.skip_files = filter.file_handler
+
+    def get_filters(self, hook: str) -> list[FilterFunction]:
+        return [filter for filter in self.filters if hook in filter.hooks]
+
+
+class FilterChainCache:
+    """
+    Filter chains compiled per set of model filter ids: the active global
+    filters plus the model's own, loaded and sorted by their priority valve,
+    with the valves applied to the modules. Running a chain is one call per
+    filter and no database queries.
+
+    Writes to functions invalidate all chains (the functions table calls
+    invalidate). Writes made by other workers are picked up by comparing the
+    version of the functions table, one cheap query at most every
+    poll_interval seconds, so chains are only recompiled when a function
+    actually changed. Compiling (module loads, database queries) and polling
+    run in a thread, never on the event loop.
+    """
+
+    def __init__(self, poll_interval: int = 10):
+        self.poll_interval = poll_interval
+        self.lock: Optional[asyncio.Lock] = None
+
+        # frozenset of model filter ids -> chain
+        self.chains: dict[frozenset, FilterChain] = {}
+        self.version = 0
+
+        self.functions_version = None
+        self.polled_at = 0.0
+
+        # function id -> loaded module, shared with the functions router
+        self.modules: Optional[dict] = None
+
+    def get_module(self, function_id: str):
+        from open_webui.apps.webui.utils import load_function_module_by_id
+
+        if function_id in self.modules:
+            return self.modules[function_id]
+
+        function_module, _, _ = load_function_module_by_id(function_id)
+        self.modules[function_id] = function_module
+        return function_module
+
+    def compile(self, filter_ids: frozenset) -> FilterChain:
+        from open_webui.apps.webui.models.functions import Functions
+
+        functions = Functions.get_functions_by_type("filter", active_only=True)
+        ids = [
+            function.id
+            for function in functions
+            if function.is_global or function.id in filter_ids
+        ]
+
+        filters = [
+            FilterFunction(
+                id, self.get_module(id), Functions.get_function_valves_by_id(id)
+            )
+            for id in ids
+        ]
+
+        filters.sort(key=lambda filter: filter.priority)
+        return FilterChain(filters)
+
+    async def poll(self):
+        from open_webui.apps.webui.models.functions import Functions
+
+        if time.monotonic() - self.polled_at < self.poll_interval:
+            return
+        self.polled_at = time.monotonic()
+
+        functions_version = await asyncio.to_thread(Functions.get_functions_version)
+        if functions_version != self.functions_version:
+            if self.functions_version is not None:
+                self.invalidate()
+            self.functions_version = functions_version
+
+    async def get_chain(self, model: dict) -> FilterChain:
+        meta = (model.get("info") or {}).get("meta") or {}
+        key = frozenset(meta.get("filterIds") or [])
+
+        await self.poll()
+        chain = self.chains.get(key)
+        if chain is not None:
+            return chain
+
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            chain = self.chains.get(key)
+            if chain is not None:
+                return chain
+
+            version = self.version
+            chain = await asyncio.to_thread(self.compile, key)
+            # Don't keep a chain that raced with a write
+            if version == self.version:
+                self.chains[key] = chain
+            return chain
+
+    def invalidate(self):
+        # Not under the lock, writers shouldn't wait for a compile in progress
+        self.version += 1
+        self.chains = {}
+
+
+FILTER_CHAINS = FilterChainCache(poll_interval=FILTER_CHAIN_POLL_INTERVAL)
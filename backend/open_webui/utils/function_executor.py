@@ -0,0 +1,183 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Iterator
+
+from open_webui.env import (
+    FUNCTION_EXECUTOR_MAX_WORKERS,
+    FUNCTION_MAX_CONCURRENCY,
+    FUNCTION_TIMEOUT,
+)
+
+
+class FunctionStats:
+    def __init__(self):
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+
+    def record(self, run_time: float, failed: bool):
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+        self.total_run_time += run_time
+        self.max_run_time = max(self.max_run_time, run_time)
+
+    def model_dump(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "avg_run_time": self.total_run_time / finished if finished else 0.0,
+            "max_run_time": self.max_run_time,
+        }
+
+
+class FunctionExecutor:
+    """
+    Runs the hooks of pipes, filters, actions and tools. Synchronous ones are
+    sent to a bounded thread pool so slow user code (a blocking HTTP call in a
+    tool, say) doesn't stall the streams served by the event loop.
+
+    All calls of a function run against the same module instance (its valves,
+    clients and any state it keeps). Synchronous calls of one function id are
+    therefore limited to max_concurrency at once, 1 by default, so they never
+    race each other on that state; 0 lifts the limit to the pool size for
+    deployments whose functions are known to be thread-safe. Coroutines run on
+    the event loop and aren't limited, they don't run in parallel with each
+    other.
+
+    Calls taking longer than timeout seconds (0 disables) fail with a
+    TimeoutError. A synchronous call that timed out keeps its slot until its
+    thread actually returns, threads can't be interrupted. stats() reports the
+    queue depth and run times per function id, a streamed response counts as
+    one call.
+    """
+
+    def __init__(self, max_workers: int, max_concurrency: int = 0, timeout: int = 0):
+        self.max_workers = max(1, max_workers)
+        self.max_concurrency = max_concurrency if max_concurrency > 0 else None
+        self.timeout = timeout if timeout > 0 else None
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="function"
+        )
+
+        self.semaphores: dict[str, asyncio.Semaphore] = {}
+        self.stats_by_id: dict[str, FunctionStats] = {}
+
+    def get_stats(self, function_id: str) -> FunctionStats:
+        stats = self.stats_by_id.get(function_id)
+        if stats is None:
+            stats = self.stats_by_id[function_id] = FunctionStats()
+        return stats
+
+    async def acquire(self, function_id: str, stats: FunctionStats):
+        if self.max_concurrency is None:
+            return None
+
+        semaphore = self.semaphores.get(function_id)
+        if semaphore is None:
+            semaphore = self.semaphores[function_id] = asyncio.Semaphore(
+                self.max_concurrency
+            )
+
+        stats.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        return semaphore
+
+    async def call(self, function_id: str, func, *args, **kwargs):
+        return await self.run(function_id, True, func, *args, **kwargs)
+
+    async def run(self, function_id: str, record: bool, func, *args, **kwargs):
+        stats = self.get_stats(function_id)
+        is_coroutine = inspect.iscoroutinefunction(func)
+        semaphore = None if is_coroutine else await self.acquire(function_id, stats)
+
+        started_at = time.perf_counter()
+        stats.running += 1
+
+        def done(future):
+            stats.running -= 1
+            if record:
+                stats.record(
+                    time.perf_counter() - started_at,
+                    future.cancelled() or future.exception() is not None,
+                )
+            if semaphore is not None:
+                semaphore.release()
+
+        if is_coroutine:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            waiter = future
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+            # Threads can't be stopped, the slot is only freed once they return
+            waiter = asyncio.shield(future)
+        future.add_done_callback(done)
+
+        try:
+            return await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            stats.timed_out += 1
+            raise TimeoutError(
+                f"Function {function_id} timed out after {self.timeout} seconds"
+            )
+
+    async def iterate(self, function_id: str, iterator: Iterator) -> AsyncIterator:
+        """
+        Iterates a synchronous generator, each step runs in the pool. The whole
+        iteration is recorded as one call, with the time spent in the steps.
+        """
+        stats = self.get_stats(function_id)
+        run_time = 0.0
+        failed = False
+
+        end = object()
+        try:
+            while True:
+                started_at = time.perf_counter()
+                try:
+                    item = await self.run(function_id, False, next, iterator, end)
+                finally:
+                    run_time += time.perf_counter() - started_at
+                if item is end:
+                    return
+                yield item
+        except Exception:
+            failed = True
+            raise
+        finally:
+            stats.record(run_time, failed)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency or self.max_workers,
+            "timeout": self.timeout,
+            "functions": {
+                function_id: stats.model_dump()
+                for function_id, stats in self.stats_by_id.items()
+            },
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+FUNCTION_EXECUTOR = FunctionExecutor(
+    FUNCTION_EXECUTOR_MAX_WORKERS, FUNCTION_MAX_CONCURRENCY, FUNCTION_TIMEOUT
+)
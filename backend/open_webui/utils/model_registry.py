@@ -0,0 +1,166 @@
+import asyncio
+import copy
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from open_webui.env import (
+    MODEL_REGISTRY_REDIS_URL,
+    MODEL_REGISTRY_REFRESH_INTERVAL,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class ModelRegistry:
+    """
+    Holds the merged model list served by get_all_models.
+
+    The list is rebuilt in the background every MODEL_REGISTRY_REFRESH_INTERVAL
+    seconds, and right after a request changed models, functions or
+    connections (invalidate), which also tells the other workers through
+    Redis. Invalidations are scheduled rather than awaited, so admin requests
+    don't wait on upstream servers, and invalidations arriving while a refresh
+    runs are coalesced into one more refresh. Readers get the current snapshot
+    without locking or waiting on upstream servers; only the very first read
+    of a worker waits for a load.
+
+    Refreshing happens in two stages: the base models (Ollama, OpenAI, pipes
+    and arena models, which may need network calls) and the composition with
+    the custom models and actions stored in the database. Changes to custom
+    models only redo the second stage.
+    """
+
+    CHANNEL = "open-webui:model-registry"
+
+    def __init__(self, refresh_interval: int = 10, redis_url: Optional[str] = None):
+        self.refresh_interval = refresh_interval
+        self.redis_url = redis_url
+        self.id = str(uuid.uuid4())
+
+        self.load_base_models: Optional[Callable[[], Awaitable[list]]] = None
+        self.compose_models: Optional[Callable[[list], Awaitable[list]]] = None
+
+        self.base_models: Optional[list] = None
+        self.models: Optional[list] = None
+        self.version = 0
+
+        self.lock = asyncio.Lock()
+        self.redis = None
+        self.tasks: list[asyncio.Task] = []
+
+        # None, or whether the scheduled refresh must reload the base models
+        self.pending_base: Optional[bool] = None
+        self.invalidation: Optional[asyncio.Task] = None
+
+    async def get_models(self) -> list:
+        models = self.models
+        if models is None:
+            await self.refresh(base=self.base_models is None)
+            models = self.models
+        return models
+
+    async def refresh(self, base: bool = True):
+        async with self.lock:
+            if base or self.base_models is None:
+                self.base_models = await self.load_base_models()
+
+            # Composition mutates the model dicts, keep the base list pristine
+            models = await self.compose_models(copy.deepcopy(self.base_models))
+
+            # Swapped in one assignment so readers never see a partial list
+            self.models = models
+            self.version += 1
+
+    def invalidate(self, base: bool = False) -> asyncio.Task:
+        self.pending_base = bool(self.pending_base) or base
+        if self.invalidation is None or self.invalidation.done():
+            self.invalidation = asyncio.create_task(self.run_invalidations())
+        return self.invalidation
+
+    async def run_invalidations(self):
+        while self.pending_base is not None:
+            base, self.pending_base = self.pending_base, None
+            try:
+                await self.refresh(base=base)
+            except Exception as e:
+                log.exception(f"Model registry: refresh failed: {e}")
+
+            if self.redis is not None:
+                try:
+                    await self.redis.publish(
+                        self.CHANNEL, json.dumps({"origin": self.id, "base": base})
+                    )
+                except Exception as e:
+                    log.warning(
+                        f"Model registry: failed to broadcast invalidation: {e}"
+                    )
+
+    async def refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh(base=True)
+            except Exception as e:
+                # Keep serving the previous snapshot
+                log.exception(f"Model registry: refresh failed: {e}")
+
+    async def listen(self):
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+
+                try:
+                    data = json.loads(message["data"])
+                    if data.get("origin") == self.id:
+                        continue
+                    await self.refresh(base=data.get("base", False))
+                except Exception as e:
+                    log.exception(f"Model registry: remote refresh failed: {e}")
+        finally:
+            await pubsub.unsubscribe(self.CHANNEL)
+
+    def start(
+        self,
+        load_base_models: Callable[[], Awaitable[list]],
+        compose_models: Callable[[list], Awaitable[list]],
+    ):
+        self.load_base_models = load_base_models
+        self.compose_models = compose_models
+
+        if self.refresh_interval > 0:
+            self.tasks.append(asyncio.create_task(self.refresh_loop()))
+
+        if self.redis_url:
+            import redis.asyncio
+
+            self.redis = redis.asyncio.Redis.from_url(
+                self.redis_url, decode_responses=True
+            )
+            self.tasks.append(asyncio.create_task(self.listen()))
+
+    async def stop(self):
+        if self.invalidation is not None:
+            self.tasks.append(self.invalidation)
+            self.invalidation = None
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+
+MODEL_REGISTRY = ModelRegistry(
+    refresh_interval=MODEL_REGISTRY_REFRESH_INTERVAL,
+    redis_url=MODEL_REGISTRY_REDIS_URL,
+)
@@ -180,4 +180,8 @@ def convert_payload_openai_to_ollama(openai_payload: dict) -> dict:
     if ollama_options:
         ollama_payload["options"] = ollama_options
 
+    # Not sent upstream, but used to route the chat to an Ollama backend
+    if "metadata" in openai_payload:
+        ollama_payload["metadata"] = openai_payload["metadata"]
+
     return ollama_payload
@@ -1,9 +1,27 @@
+import asyncio
 import json
+import time
+from typing import Callable, Optional
+
+from open_webui.env import OLLAMA_STREAM_FLUSH_INTERVAL
 from open_webui.utils.misc import (
     openai_chat_chunk_message_template,
     openai_chat_completion_message_template,
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_loads(data: bytes):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_dumps(data) -> bytes:
+    return orjson.dumps(data) if orjson else json.dumps(data).encode("utf-8")
+
 
 def convert_response_ollama_to_openai(ollama_response: dict) -> dict:
     model = ollama_response.get("model", "ollama")
@@ -13,19 +31,125 @@ def convert_response_ollama_to_openai(ollama_response: dict) -> dict:
     return response
 
 
-async def convert_streaming_response_ollama_to_openai(ollama_streaming_response):
-    async for data in ollama_streaming_response.body_iterator:
-        data = json.loads(data)
+class OpenAIChunkEncoder:
+    """
+    Encodes the chunks of one chat completion stream. The id, creation time and
+    model are fixed for the stream, so the chunk is split into bytes before and
+    after the content once and only the content is encoded per chunk.
+    """
+
+    CONTENT_PLACEHOLDER = "\0content\0"
+
+    def __init__(self, model: str):
+        template = openai_chat_chunk_message_template(model, self.CONTENT_PLACEHOLDER)
+        self.prefix, self.suffix = f"data: {json.dumps(template)}\n\n".encode(
+            "utf-8"
+        ).split(json.dumps(self.CONTENT_PLACEHOLDER).encode("utf-8"))
+
+        del template["choices"][0]["delta"]
+        template["choices"][0]["finish_reason"] = "stop"
+        self.stop = f"data: {json.dumps(template)}\n\n".encode("utf-8")
+
+    def encode(self, content: str) -> bytes:
+        return self.prefix + json_dumps(content) + self.suffix
+
+
+async def read_with_timeout(body_iterator, get_timeout: Callable):
+    """
+    Yields the reads of body_iterator, and None when get_timeout() seconds
+    (None waits for the read) pass without one, so that held back content can
+    be sent while upstream is quiet.
+    """
+    iterator = body_iterator.__aiter__()
+    next_read = None
+    try:
+        while True:
+            if next_read is None:
+                next_read = asyncio.ensure_future(iterator.__anext__())
+
+            done, _ = await asyncio.wait({next_read}, timeout=get_timeout())
+            if not done:
+                yield None
+                continue
+
+            read, next_read = next_read, None
+            try:
+                yield read.result()
+            except StopAsyncIteration:
+                return
+    finally:
+        if next_read is not None:
+            next_read.cancel()
+
+
+async def convert_streaming_response_ollama_to_openai(
+    ollama_streaming_response, flush_interval: int = OLLAMA_STREAM_FLUSH_INTERVAL
+):
+    """
+    Converts an Ollama NDJSON chat stream into OpenAI chat completion chunks.
+    Lines may be split across or packed into upstream reads, the content of all
+    lines in one read (and with flush_interval in milliseconds, of all reads
+    within that interval) is sent as a single chunk. Held back content is sent
+    when the interval ends, even if no further read arrives by then.
+    """
+    encoder = None
+    buffer = b""
+    pending = []
+    flushed_at = time.monotonic()
+
+    def read_line(line: bytes):
+        nonlocal encoder
+        data = json_loads(line)
+        if encoder is None:
+            encoder = OpenAIChunkEncoder(data.get("model", "ollama"))
+
+        content = data.get("message", {}).get("content", "")
+        if content:
+            pending.append(content)
+
+    def flush() -> bytes:
+        nonlocal flushed_at
+        flushed_at = time.monotonic()
+        content = "".join(pending)
+        pending.clear()
+        return encoder.encode(content)
+
+    def get_timeout() -> Optional[float]:
+        if not pending:
+            return None
+        return max(0, flush_interval / 1000 - (time.monotonic() - flushed_at))
+
+    reads = ollama_streaming_response.body_iterator
+    if flush_interval > 0:
+        reads = read_with_timeout(reads, get_timeout)
+
+    async for data in reads:
+        if data is None:
+            # The interval ended without a read
+            if pending:
+                yield flush()
+            continue
+
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        lines = (buffer + data).split(b"\n")
+        buffer = lines.pop()
 
-        model = data.get("model", "ollama")
-        message_content = data.get("message", {}).get("content", "")
-        done = data.get("done", False)
+        for line in lines:
+            if line.strip():
+                read_line(line)
 
-        data = openai_chat_chunk_message_template(
-            model, message_content if not done else None
-        )
+        if pending and (
+            flush_interval <= 0
+            or (time.monotonic() - flushed_at) * 1000 >= flush_interval
+        ):
+            yield flush()
 
-        line = f"data: {json.dumps(data)}\n\n"
-        yield line
+    if buffer.strip():
+        read_line(buffer)
+    if pending:
+        yield flush()
+    if encoder is not None:
+        yield encoder.stop
 
-    yield "data: [DONE]\n\n"
+    yield b"data: [DONE]\n\n"
@@ -0,0 +1,101 @@
+import logging
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from open_webui.env import (
+    AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_LIMIT,
+    AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class ClientSessionPool:
+    """
+    Application lifetime aiohttp sessions, one per upstream base URL, so chat
+    and model requests reuse warm keep-alive connections (and cached DNS)
+    instead of opening a new connector for every call.
+
+    Callers pass per-request timeouts and release responses rather than
+    closing sessions; sessions are closed once on shutdown.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        ttl_dns_cache: int = 300,
+        keepalive_timeout: int = 30,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+
+        self.sessions: dict[str, aiohttp.ClientSession] = {}
+        self.requests: dict[str, int] = {}
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        parsed_url = urlparse(url)
+        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+        session = self.sessions.get(base_url)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            session = aiohttp.ClientSession(connector=connector, trust_env=True)
+            self.sessions[base_url] = session
+            log.debug(f"Created pooled session for {base_url}")
+
+        self.requests[base_url] = self.requests.get(base_url, 0) + 1
+        return session
+
+    async def close(self):
+        sessions = list(self.sessions.values())
+        self.sessions = {}
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception as e:
+                log.warning(f"Error closing pooled session: {e}")
+
+    def stats(self) -> dict:
+        stats = {}
+        for base_url, session in self.sessions.items():
+            connector = session.connector
+            stats[base_url] = {
+                "requests": self.requests.get(base_url, 0),
+                "limit": self.limit,
+                "limit_per_host": self.limit_per_host,
+                # aiohttp doesn't expose these publicly
+                "active": len(getattr(connector, "_acquired", ())),
+                "idle": sum(
+                    len(conns) for conns in getattr(connector, "_conns", {}).values()
+                ),
+                "closed": session.closed,
+            }
+        return stats
+
+
+async def cleanup_response(response: Optional[aiohttp.ClientResponse]):
+    # Returns the connection to the pool (or drops it if the body wasn't read)
+    if response:
+        response.release()
+
+
+SESSION_POOL = ClientSessionPool(
+    limit=AIOHTTP_CLIENT_POOL_LIMIT,
+    limit_per_host=AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST,
+    ttl_dns_cache=AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    keepalive_timeout=AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+)